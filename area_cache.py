@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 13:41:07 2026
+Prosessfelles cache for hentede og klassifiserte bygninger og veger.
+
+Alle Streamlit-sesjoner i samme prosess deler cachen. Data hentes og caches per
+fliser (tiles) på et fast rutenett, nøklet på datakilde og dataversjon, slik at
+flere brukere som ser på samme anlegg deler én henting og én kopi i minnet.
+Samtidige forespørsler etter samme flis venter på den som allerede hentes.
+"""
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+from shapely.geometry import box
+
+from get_matrikkel_data import get_matrikkel_data, DEFAULT_BACKEND
+from get_veg_data import get_veg_data
+from classify_buildings import classify_buildings
+import metrics
+import timing
+
+TILE_SIZE = float(os.environ.get("FOXTROT_TILE_M", 1000))
+CACHE_MB = float(os.environ.get("FOXTROT_CACHE_MB", 512))
+GEOMETRY_BYTES = 120  # rough per-row cost of a shapely geometry object
+
+
+def _nbytes(df):
+    return int(df.memory_usage(deep=True, index=True).sum()) + GEOMETRY_BYTES * len(df)
+
+
+class AreaCache:
+    """Thread-safe LRU cache with a memory ceiling, hit/miss counters and shared in-flight computations."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0  # requests that waited for another session's in-flight fetch
+        self.evictions = 0
+        self._data = OrderedDict()  # key -> (value, nbytes)
+        self._inflight = {}  # key -> Future
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        """Returns the cached value for key, computing it at most once across threads."""
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key][0]
+            fut = self._inflight.get(key)
+            owner = fut is None
+            if owner:
+                self.misses += 1
+                fut = Future()
+                self._inflight[key] = fut
+            else:
+                self.shared += 1
+
+        if not owner:
+            return fut.result()
+
+        try:
+            value = compute()
+        except BaseException as err:
+            with self._lock:
+                del self._inflight[key]
+            fut.set_exception(err)
+            raise
+
+        with self._lock:
+            del self._inflight[key]
+            # Empty frames are what the fetchers return on upstream errors: do not cache
+            if value is not None and not value.empty:
+                size = _nbytes(value)
+                self._data[key] = (value, size)
+                self.nbytes += size
+                self._evict()
+        fut.set_result(value)
+        return value
+
+    def _evict(self):
+        while self.nbytes > self.max_bytes and len(self._data) > 1:
+            _, (_, size) = self._data.popitem(last=False)
+            self.nbytes -= size
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "nbytes": self.nbytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "shared": self.shared,
+                "evictions": self.evictions,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.nbytes = 0
+
+
+SHARED_CACHE = AreaCache(int(CACHE_MB * 2 ** 20))
+# Tile fetches from all sessions (and qd_service.py) share this pool, so its size bounds
+# the number of concurrent WFS/NVDB calls from the process
+TILE_WORKERS = 8
+_tile_pool = ThreadPoolExecutor(max_workers=TILE_WORKERS, thread_name_prefix="tile")
+
+
+def _cache_metrics():
+    st = SHARED_CACHE.stats()
+    return [
+        ("foxtrot_cache_requests_total", "counter", "Oppslag i flis-cachen etter utfall.",
+         [({"utfall": k}, st[k]) for k in ("hits", "misses", "shared")]),
+        ("foxtrot_cache_evictions_total", "counter", "Fliser kastet ut av cachen.", [({}, st["evictions"])]),
+        ("foxtrot_cache_bytes", "gauge", "Omtrentlig minnebruk i cachen.", [({}, st["nbytes"])]),
+        ("foxtrot_cache_entries", "gauge", "Antall fliser i cachen.", [({}, st["entries"])]),
+    ]
+
+
+metrics.REGISTRY.register_collector(_cache_metrics)
+
+
+def data_version(backend):
+    """Version stamp for a data source; cached tiles from another version are never reused."""
+    if backend == "lokal":
+        from matrikkel_index import index_version
+        return index_version()
+    return date.today().isoformat()  # live services: refresh daily
+
+
+def tiles_for_bbox(bbox_tuple, tile_size=TILE_SIZE):
+    """(ix, iy) of all tiles touching bbox_tuple."""
+    minx, miny, maxx, maxy = bbox_tuple
+    ix = range(int(np.floor(minx / tile_size)), int(np.floor(maxx / tile_size)) + 1)
+    iy = range(int(np.floor(miny / tile_size)), int(np.floor(maxy / tile_size)) + 1)
+    return [(i, j) for j in iy for i in ix]
+
+
+def tile_bbox(ix, iy, tile_size=TILE_SIZE):
+    return (ix * tile_size, iy * tile_size, (ix + 1) * tile_size, (iy + 1) * tile_size)
+
+
+def _building_tile(ix, iy, backend, version):
+    def compute():
+        minx, miny, maxx, maxy = tile_bbox(ix, iy)
+        gdf = get_matrikkel_data((minx, miny, maxx, maxy), backend=backend)
+        if gdf.empty:
+            return gdf
+        # Half-open tile so a building on a tile edge is only counted once
+        x, y = gdf.geometry.x, gdf.geometry.y
+        gdf = gdf[(x >= minx) & (x < maxx) & (y >= miny) & (y < maxy)]
+        return classify_buildings(gdf[["bygningstype", "geometry"]].copy())
+
+    return SHARED_CACHE.get_or_compute(("bygg", backend, version, TILE_SIZE, ix, iy), compute)
+
+
+def _road_tile(ix, iy, version):
+    def compute():
+        minx, miny, maxx, maxy = tile_bbox(ix, iy)
+        return get_veg_data({"minx": minx, "miny": miny, "maxx": maxx, "maxy": maxy})
+
+    return SHARED_CACHE.get_or_compute(("veg", version, TILE_SIZE, ix, iy), compute)
+
+
+def get_buildings(bbox_tuple, backend=None):
+    """Classified buildings inside bbox_tuple, assembled from shared cached tiles."""
+    backend = backend or DEFAULT_BACKEND
+    version = data_version(backend)
+    tiles = tiles_for_bbox(bbox_tuple)
+    fetch = timing.bind(lambda t: _building_tile(*t, backend, version))
+    parts = [p for p in _tile_pool.map(fetch, tiles) if not p.empty]
+    if not parts:
+        return gpd.GeoDataFrame()
+
+    gdf = pd.concat(parts, ignore_index=True)
+    minx, miny, maxx, maxy = bbox_tuple
+    x, y = gdf.geometry.x, gdf.geometry.y
+    return gdf[(x >= minx) & (x <= maxx) & (y >= miny) & (y <= maxy)].reset_index(drop=True)
+
+
+def tile_distance(ix, iy, center, tile_size=TILE_SIZE):
+    """Shortest distance from center to any point in tile (ix, iy); 0 for the tile containing it."""
+    minx, miny, maxx, maxy = tile_bbox(ix, iy, tile_size)
+    cx, cy = center
+    return float(np.hypot(max(minx - cx, 0, cx - maxx), max(miny - cy, 0, cy - maxy)))
+
+
+def iter_buildings(bbox_tuple, center, radius=None, backend=None):
+    """
+    Classified buildings inside bbox_tuple, one tile at a time.
+    Tiles are started nearest center first, and tiles entirely farther away than radius
+    are skipped. Yields (tiles done, tiles total, GeoDataFrame) as each tile finishes,
+    using the same shared cache as get_buildings.
+    """
+    backend = backend or DEFAULT_BACKEND
+    version = data_version(backend)
+    tiles = [(tile_distance(*t, center), t) for t in tiles_for_bbox(bbox_tuple)]
+    tiles = [t for d, t in sorted(tiles) if radius is None or d <= radius]
+    fetch = timing.bind(_building_tile)
+    futures = [_tile_pool.submit(fetch, *t, backend, version) for t in tiles]
+
+    minx, miny, maxx, maxy = bbox_tuple
+    for done, fut in enumerate(as_completed(futures), start=1):
+        part = fut.result()
+        if not part.empty:
+            x, y = part.geometry.x, part.geometry.y
+            part = part[(x >= minx) & (x <= maxx) & (y >= miny) & (y <= maxy)].reset_index(drop=True)
+        yield done, len(futures), part
+
+
+def get_roads(bbox_tuple):
+    """Road segments touching bbox_tuple, assembled from shared cached tiles."""
+    version = data_version("nvdb")
+    tiles = tiles_for_bbox(bbox_tuple)
+    fetch = timing.bind(lambda t: _road_tile(*t, version))
+    parts = [p for p in _tile_pool.map(fetch, tiles) if not p.empty]
+    if not parts:
+        return gpd.GeoDataFrame()
+
+    veg = pd.concat(parts, ignore_index=True)
+    # NVDB returns whole segments, so segments crossing a tile edge appear in several tiles
+    veg = veg[~veg.geometry.to_wkb().duplicated()]
+    return veg[veg.intersects(box(*bbox_tuple))].reset_index(drop=True)
@@ -0,0 +1 @@
+"""Benchmarks for beregningskjeden, se bench_pipeline.py."""
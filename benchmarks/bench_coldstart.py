@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 25 10:22:06 2026
+Måling av importtid ved kald start for inngangsskriptet og hver side.
+
+For hvert skript samles importene på toppnivå (importer inne i funksjoner og
+grener er utsatt og telles ikke), og de kjøres i en fersk prosess med
+``python -X importtime``. Utskriften brytes ned per modul, totalen sammenlignes
+med budsjettet og resultatet legges til i history_coldstart.jsonl.
+
+Bruk (fra rotmappen):
+    python -m benchmarks.bench_coldstart
+    python -m benchmarks.bench_coldstart --budget-ms 1500 --top 15 pages/1_Input.py
+"""
+import argparse
+import ast
+import datetime
+import json
+import platform
+import subprocess
+import sys
+from pathlib import Path
+
+from benchmarks.bench_pipeline import git_commit
+
+ROOT = Path(__file__).resolve().parents[1]
+HISTORY = Path(__file__).with_name("history_coldstart.jsonl")
+DEFAULT_BUDGET_MS = 2_000
+# streamlit is loaded by the server before any script runs, so it is not part of a page's cost
+PRELOADED = ("streamlit",)
+
+
+def default_scripts():
+    return [ROOT / "streamlit_app.py", ROOT / "Hjem.py"] + sorted((ROOT / "pages").glob("*.py"))
+
+
+def top_level_imports(path):
+    """Import statements executed when the script starts, as source lines."""
+    tree = ast.parse(Path(path).read_text(encoding="utf-8"))
+    lines = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            lines += [f"import {a.name}" for a in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.level == 0:
+            lines.append(f"import {node.module}")
+    return lines
+
+
+def parse_importtime(stderr):
+    """[(module, self_us, cumulative_us, depth)] from ``-X importtime`` output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cum_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip()) - 1) // 2  # 0 for modules the script imports itself
+        rows.append((name.strip(), int(self_us), int(cum_us), depth))
+    return rows
+
+
+def measure(path, preload=PRELOADED):
+    """Imports a script's top-level modules in a fresh interpreter; returns (total ms, rows, error)."""
+    pre = "".join(f"import {m}\n" for m in preload)
+    code = "\n".join(top_level_imports(path))
+    # Modules imported by the preload are cached, so only what the script adds is timed
+    program = f"import sys\n{pre}print('---', file=sys.stderr, flush=True)\n{code}\n"
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", program], cwd=ROOT,
+                          capture_output=True, text=True)
+    stderr = proc.stderr.split("---\n", 1)[-1]
+    rows = parse_importtime(stderr)
+    total_us = sum(cum for _, _, cum, depth in rows if depth == 0)
+    error = None
+    if proc.returncode != 0:
+        error = (stderr.strip().splitlines() or ["unknown error"])[-1]
+    return total_us / 1000, rows, error
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importtid ved kald start per side (python -X importtime).")
+    parser.add_argument("scripts", nargs="*", type=Path, help="skript å måle (standard: streamlit_app.py, Hjem.py og pages/)")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help="største tillatte importtid per skript (ms)")
+    parser.add_argument("--top", type=int, default=10, help="antall tyngste moduler som vises per skript")
+    parser.add_argument("--history", type=Path, default=HISTORY)
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+
+    scripts = [p.resolve() for p in args.scripts] or default_scripts()
+    results = []
+    over_budget = []
+    for path in scripts:
+        name = path.relative_to(ROOT).as_posix()
+        total_ms, rows, error = measure(path)
+        status = "OK" if total_ms <= args.budget_ms else "OVER BUDSJETT"
+        print(f"{name:<32} {total_ms:>9.1f} ms  {status}" + (f"  FEIL: {error}" if error else ""))
+        top = sorted((r for r in rows if r[3] == 0), key=lambda r: r[2], reverse=True)[:args.top]
+        for module, _, cum_us, _ in top:
+            print(f"    {module:<40} {cum_us / 1000:>9.1f} ms")
+        results.append({"skript": name, "ms": total_ms, "feil": error,
+                        "topp": [{"modul": m, "ms": c / 1000} for m, _, c, _ in top]})
+        if total_ms > args.budget_ms or error:
+            over_budget.append(name)
+
+    if not args.no_save:
+        entry = {
+            "tidspunkt": datetime.datetime.now().isoformat(timespec="seconds"),
+            "git": git_commit(),
+            "python": platform.python_version(),
+            "budsjett_ms": args.budget_ms,
+            "resultater": results,
+        }
+        with open(args.history, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        print(f"\nLagret i {args.history}")
+
+    if over_budget:
+        print(f"\nOver budsjett ({args.budget_ms:.0f} ms) eller feil ved import: " + ", ".join(over_budget))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 24 10:12:40 2026
+Måling av kjøretid per rerun for de interaktive sidene med Streamlit AppTest.
+
+Sidene kjøres med ferdig utfylt session state (syntetiske analyser av ulik
+størrelse), og typiske interaksjoner simuleres: submit på inputsiden, klikk i
+kartet og endringer i tabellen på seleksjonssiden. streamlit_folium.st_folium
+erstattes med en stand-in som bygger kartets HTML (for å måle payload) og kan
+returnere et klikk. For hver interaksjon lagres veggtid og payload i
+history_pages.jsonl.
+
+Bruk (fra rotmappen):
+    python -m benchmarks.bench_pages
+    python -m benchmarks.bench_pages --sizes 500 2000 10000 --submit
+"""
+import argparse
+import datetime
+import json
+import platform
+import time
+from pathlib import Path
+from unittest import mock
+
+import geopandas as gpd
+import streamlit as st
+import streamlit_folium
+from streamlit.testing.v1 import AppTest
+
+import area_cache
+import get_matrikkel_data
+import get_veg_data
+import prefetch
+from classify_buildings import classify_buildings
+from get_veg_data import parse_vegobjekter, parse_fartsgrenser
+from map_layers import create_qd_buffer
+from qd_rules import QD_func
+
+from benchmarks.bench_pipeline import git_commit, previous_results
+from benchmarks.synthetic import DEFAULT_CENTER, synthetic_buildings, synthetic_roads, synthetic_nvdb
+
+ROOT = Path(__file__).resolve().parents[1]
+HISTORY = Path(__file__).with_name("history_pages.jsonl")
+DEFAULT_SIZES = [500, 2_000, 10_000]
+NEI = 10_000
+TIMEOUT = 600
+
+
+class FoliumRecorder:
+    """Stand-in for st_folium: renders the map to measure its size and returns a queued click."""
+
+    def __init__(self):
+        self.payload_bytes = 0
+        self.click = None
+
+    def __call__(self, fig, *args, feature_group_to_add=None, **kwargs):
+        if feature_group_to_add is not None:
+            feature_group_to_add.add_to(fig)
+        self.payload_bytes += len(fig.get_root().render())
+        out = {}
+        if self.click is not None:
+            out["last_object_clicked"] = self.click
+        return out
+
+
+def seed_analysis(n, seed=0):
+    """Session state as left by the input page after an analysis of n buildings."""
+    x, y = DEFAULT_CENTER
+    QD_syk, QD_bolig, QD_vei = QD_func(NEI)
+
+    buildings = classify_buildings(synthetic_buildings(n, radius=QD_syk, seed=seed))
+    anlegg = gpd.GeoDataFrame(
+        {"nordUTM33": [y], "oestUTM33": [x], "NEI": [NEI]},
+        geometry=gpd.points_from_xy([x], [y]),
+        crs="EPSG:32633",
+    )
+
+    roads = synthetic_roads(max(10, n // 50), radius=QD_syk, seed=seed)
+    veg = parse_vegobjekter(synthetic_nvdb(roads, "adt", seed))
+    veg["Fartsgrense"] = parse_fartsgrenser(synthetic_nvdb(roads, "fart", seed))["Fartsgrense"].to_numpy()
+
+    return {
+        "exp_buildings_gdf": buildings,
+        "veg_gdf": veg,
+        "gdf_anlegg": anlegg,
+        "gdf_syk": create_qd_buffer(anlegg, QD_syk, "2 kPa"),
+        "gdf_bolig": create_qd_buffer(anlegg, QD_bolig, "5 kPa"),
+        "gdf_vei": create_qd_buffer(anlegg, QD_vei, "9 kPa"),
+        "GISanalysis_complete": True,
+        "last_calc_inputs": {"nord": y, "oest": x, "nei": NEI, "faregruppe": "1.1", "margin": 0, "datakilde": "wfs"},
+        "gdf_calculated": None,
+    }
+
+
+def _page(name):
+    return str(ROOT / "pages" / name)
+
+
+def _timed_run(at, recorder):
+    recorder.payload_bytes = 0
+    t0 = time.perf_counter()
+    at.run(timeout=TIMEOUT)
+    seconds = time.perf_counter() - t0
+    return seconds, recorder.payload_bytes, [e.message for e in at.exception]
+
+
+def _seeded(page, state):
+    at = AppTest.from_file(_page(page), default_timeout=TIMEOUT)
+    for key, value in state.items():
+        at.session_state[key] = value
+    return at
+
+
+def scenarios(n, recorder, submit=False, seed=0):
+    """Yields (page, interaction, seconds, payload bytes, errors) for one analysis size."""
+    state = seed_analysis(n, seed)
+
+    at = _seeded("1_Input.py", state)
+    yield ("1_Input", "render", *_timed_run(at, recorder))
+    yield ("1_Input", "rerun", *_timed_run(at, recorder))
+
+    if submit:
+        # Fresh session: the submit fetches from the fake services (cold cache)
+        area_cache.SHARED_CACHE.clear()
+        prefetch._pending.clear()
+        at = _seeded("1_Input.py", {"input_coordinates": {"oestUTM33": DEFAULT_CENTER[0], "nordUTM33": DEFAULT_CENTER[1]}})
+        at.run(timeout=TIMEOUT)
+        next(w for w in at.number_input if w.label == "Totalvekt").set_value(NEI)
+        next(b for b in at.button if b.label == "Submit").click()
+        yield ("1_Input", "submit", *_timed_run(at, recorder))
+
+    at = _seeded("2_QD_Analyse.py", state)
+    yield ("2_QD_Analyse", "first", *_timed_run(at, recorder))
+    yield ("2_QD_Analyse", "rerun", *_timed_run(at, recorder))
+
+    at = _seeded("3_QRA_Seleksjon.py", state)
+    yield ("3_QRA_Seleksjon", "first", *_timed_run(at, recorder))
+    yield ("3_QRA_Seleksjon", "rerun", *_timed_run(at, recorder))
+
+    # Map click on the nearest building: the page toggles it and reruns itself
+    map_gdf = at.session_state["processed_map_gdf"]
+    nearest = at.session_state["qra_editor_data"]["avstand_meter"].idxmin()
+    point = map_gdf.geometry.loc[nearest]
+    recorder.click = {"lat": point.y, "lng": point.x}
+    yield ("3_QRA_Seleksjon", "map_click", *_timed_run(at, recorder))
+    recorder.click = None
+
+    # Table edit: data_editor state cannot be set from AppTest, so apply the same change
+    # the page makes after an edit (toggle Inkluder in the master table) and rerun
+    editor = at.session_state["qra_editor_data"]
+    far = editor["avstand_meter"].idxmax()
+    editor.loc[far, "Inkluder"] = not editor.loc[far, "Inkluder"]
+    yield ("3_QRA_Seleksjon", "table_edit", *_timed_run(at, recorder))
+
+    selected = at.session_state["qra_selected_gdf"]
+    at = _seeded("5_QRA_Analyse.py", {**state, "qra_selected_gdf": selected})
+    yield ("5_QRA_Analyse", f"first ({len(selected)} valgt)", *_timed_run(at, recorder))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rerun-tider for sidene med Streamlit AppTest.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--submit", action="store_true",
+                        help="mål også submit på inputsiden mot de lokale stand-in-tjenestene")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--history", type=Path, default=HISTORY)
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+
+    server = None
+    if args.submit:
+        from benchmarks.fake_services import serve_in_thread
+        server = serve_in_thread(n_buildings=max(args.sizes) * 2, seed=args.seed)
+        get_matrikkel_data.WFS_URL = server.base_url + "/wfs"
+        get_veg_data.NVDB_API_URL = server.base_url + "/nvdb"
+
+    forrige = previous_results(args.history)
+    recorder = FoliumRecorder()
+    results = []
+    with mock.patch.object(streamlit_folium, "st_folium", recorder):
+        for n in args.sizes:
+            print(f"n = {n}")
+            for page, interaction, seconds, payload, errors in scenarios(n, recorder, args.submit, args.seed):
+                steg = f"{page}/{interaction}"
+                results.append({"steg": steg, "n": n, "sekunder": seconds, "payload_bytes": payload,
+                                "feil": errors})
+                old = forrige.get((steg, n))
+                change = f"{seconds / old:>6.2f}x" if old else ""
+                print(f"  {steg:<34} {seconds * 1000:>10.1f} ms {payload / 1024:>9.0f} kB {change}"
+                      + (f"  FEIL: {errors}" if errors else ""))
+    if server is not None:
+        server.shutdown()
+
+    if not args.no_save:
+        entry = {
+            "tidspunkt": datetime.datetime.now().isoformat(timespec="seconds"),
+            "git": git_commit(),
+            "python": platform.python_version(),
+            "streamlit": st.__version__,
+            "resultater": results,
+        }
+        with open(args.history, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        print(f"\nLagret i {args.history}")
+
+
+if __name__ == "__main__":
+    main()
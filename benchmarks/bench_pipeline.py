@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Oct 22 12:10:45 2026
+Tidsmåling av hvert steg i beregningskjeden på syntetiske bygningssett.
+
+Stegene er de samme som sidene kjører: klassifisering, avstand, trykk (skalar og
+vektorisert), QD-status, kartbygging og parsing av GML- og NVDB-svar. Hver kjøring
+legges til som én linje i history.jsonl, og forrige resultat for samme steg og
+størrelse skrives ut ved siden av, slik at regresjoner synes mellom versjoner.
+
+Bruk (fra rotmappen):
+    python -m benchmarks.bench_pipeline
+    python -m benchmarks.bench_pipeline --sizes 1000 10000 100000 1000000 --repeat 5
+"""
+import argparse
+import datetime
+import json
+import platform
+import subprocess
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import shapely
+import folium
+from shapely.geometry import Point
+
+from blast_model import incident_pressure, incident_pressure_array
+from classify_buildings import classify_buildings
+from compact import compact_buildings, memory_bytes
+from get_matrikkel_data import parse_matrikkel_gml
+from get_veg_data import parse_vegobjekter, parse_fartsgrenser
+from map_layers import plot_matrikkel_on_map
+from qd_rules import QD_func
+from terrain import line_of_sight
+
+from benchmarks.synthetic import (
+    DEFAULT_CENTER, synthetic_buildings, synthetic_gml, synthetic_roads, synthetic_nvdb, synthetic_dem,
+    recorded_payloads,
+)
+
+HISTORY = Path(__file__).with_name("history.jsonl")
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+NEI = 10_000
+
+
+def timed(fn, repeat):
+    """Best wall time (s) over repeat calls, and the last result."""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def qd_status(gdf, avstand):
+    """Violation counts per category, computed the way pages/2_QD_Analyse.py does."""
+    QD_syk, QD_bolig, QD_vei = QD_func(NEI)
+    kat = gdf["kategori"]
+    return {
+        "sårbar": int(((kat == "sårbar") & (avstand < QD_syk)).sum()),
+        "bolig": int(((kat == "bolig") & (avstand < QD_bolig)).sum()),
+        "vei/industri": int(((kat == "vei/industri") & (avstand < QD_vei)).sum()),
+        "skjermingsverdig": int(((kat == "skjermingsverdig") & (avstand < QD_syk)).sum()),
+    }
+
+
+def build_map(gdf):
+    """Folium map as on the input page; returns the rendered HTML."""
+    lon, lat = gpd.GeoSeries([Point(DEFAULT_CENTER)], crs="EPSG:32633").to_crs(epsg=4326).iloc[0].coords[0]
+    m = folium.Map(location=[lat, lon], zoom_start=13)
+    m = plot_matrikkel_on_map(gdf, m)
+    return m.get_root().render()
+
+
+def run(sizes, repeat, scalar_max, map_max, gml_max, seed, terrain_max=100_000):
+    results = []
+    dem = synthetic_dem(seed=seed)  # 10 m cells, 1000 x 1000
+
+    def record(stage, n, seconds, **extra):
+        results.append({"steg": stage, "n": n, "sekunder": seconds, **extra})
+        print(f"  {stage:<18} {seconds * 1000:>10.2f} ms  {extra if extra else ''}")
+
+    for n in sizes:
+        print(f"n = {n}")
+        raw = synthetic_buildings(n, seed=seed)
+        anlegg = Point(DEFAULT_CENTER)
+
+        t, gdf = timed(lambda: classify_buildings(raw.copy()), repeat)
+        record("classify", n, t)
+
+        t, avstand = timed(lambda: gdf.geometry.distance(anlegg), repeat)
+        record("distance", n, t)
+
+        if n <= scalar_max:
+            t, _ = timed(lambda: avstand.apply(lambda d: incident_pressure(d, NEI)), repeat)
+            record("pressure_scalar", n, t)
+        t, _ = timed(lambda: incident_pressure_array(avstand.to_numpy(), NEI), repeat)
+        record("pressure_array", n, t)
+
+        t, counts = timed(lambda: qd_status(gdf, avstand), repeat)
+        record("status", n, t, brudd=sum(counts.values()))
+
+        full = gdf.assign(avstand_meter=avstand, trykk_kPa=incident_pressure_array(avstand.to_numpy(), NEI))
+        t, small = timed(lambda: compact_buildings(full), repeat)
+        record("compact", n, t, bytes_full=memory_bytes(full), bytes_compact=memory_bytes(small))
+
+        if n <= terrain_max:
+            xy = np.column_stack([gdf.geometry.x, gdf.geometry.y])
+            t, (blokkert, _) = timed(lambda: line_of_sight(dem, DEFAULT_CENTER, xy), repeat)
+            record("terrain_los", n, t, skjermet=int(blokkert.sum()))
+
+        if n <= map_max:
+            t, html = timed(lambda: build_map(gdf), 1)
+            record("map", n, t, bytes=len(html))
+
+        if n <= gml_max:
+            payload = synthetic_gml(raw)
+            t, parsed = timed(lambda: parse_matrikkel_gml(payload), repeat)
+            record("parse_gml", n, t, bytes=len(payload), rader=len(parsed))
+
+        roads = synthetic_roads(max(10, n // 50), seed=seed)
+        for kind, parser in (("adt", parse_vegobjekter), ("fart", parse_fartsgrenser)):
+            payload = synthetic_nvdb(roads, kind, seed=seed)
+            t, parsed = timed(lambda: parser(payload), repeat)
+            record(f"parse_nvdb_{kind}", n, t, objekter=len(payload["objekter"]), rader=len(parsed))
+
+    # Recorded responses, when present, are timed as they are
+    for name, payload in recorded_payloads("gml").items():
+        t, parsed = timed(lambda: parse_matrikkel_gml(payload), repeat)
+        record(f"parse_gml:{name}", len(parsed), t, bytes=len(payload))
+    for name, payload in recorded_payloads("json").items():
+        t, parsed = timed(lambda: parse_vegobjekter(payload), repeat)
+        record(f"parse_nvdb:{name}", len(parsed), t)
+
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def previous_results(history=HISTORY):
+    """{(steg, n): sekunder} from the last run in the history file."""
+    if not history.exists():
+        return {}
+    lines = history.read_text(encoding="utf-8").splitlines()
+    if not lines:
+        return {}
+    return {(r["steg"], r["n"]): r["sekunder"] for r in json.loads(lines[-1])["resultater"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark av beregningskjeden på syntetiske data.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=3, help="antall gjentak per steg (beste tid brukes)")
+    parser.add_argument("--scalar-max", type=int, default=100_000, help="største n for skalar incident_pressure")
+    parser.add_argument("--map-max", type=int, default=20_000, help="største n for kartbygging")
+    parser.add_argument("--gml-max", type=int, default=100_000, help="største n for GML-parsing")
+    parser.add_argument("--terrain-max", type=int, default=100_000, help="største n for siktlinjer over DEM")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--history", type=Path, default=HISTORY)
+    parser.add_argument("--no-save", action="store_true", help="ikke skriv til historikken")
+    args = parser.parse_args()
+
+    forrige = previous_results(args.history)
+    results = run(args.sizes, args.repeat, args.scalar_max, args.map_max, args.gml_max, args.seed, args.terrain_max)
+
+    if forrige:
+        print("\nEndring mot forrige kjøring:")
+        for r in results:
+            old = forrige.get((r["steg"], r["n"]))
+            if old:
+                print(f"  {r['steg']:<18} n={r['n']:<8} {r['sekunder'] / old:>6.2f}x")
+
+    if not args.no_save:
+        entry = {
+            "tidspunkt": datetime.datetime.now().isoformat(timespec="seconds"),
+            "git": git_commit(),
+            "python": platform.python_version(),
+            "plattform": platform.platform(),
+            "versjoner": {
+                "numpy": np.__version__, "pandas": pd.__version__,
+                "geopandas": gpd.__version__, "shapely": shapely.__version__,
+            },
+            "repeat": args.repeat,
+            "resultater": results,
+        }
+        with open(args.history, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        print(f"\nLagret i {args.history}")
+
+
+if __name__ == "__main__":
+    main()
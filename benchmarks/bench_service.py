@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 26 13:48:20 2026
+Lasttest av analysetjenesten (qd_service.py) mot de lokale stand-in-tjenestene.
+
+Starter fake_services og analysetjenesten i samme prosess, og sender bølger av
+samtidige forespørsler: en andel er like (skal slås sammen til én beregning),
+resten er spredt rundt sentrum. Skriver ut svartider, antall beregninger og
+antall forespørsler stand-in-tjenestene fikk.
+
+Bruk (fra rotmappen):
+    python -m benchmarks.bench_service
+    python -m benchmarks.bench_service --requests 200 --concurrency 50 --duplicates 0.5 --latency-ms 200
+"""
+import argparse
+import json
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import get_matrikkel_data
+import get_veg_data
+import qd_service
+from benchmarks.fake_services import serve_in_thread as serve_fake
+from benchmarks.synthetic import DEFAULT_CENTER
+
+
+def post(url, payload):
+    """(status, seconds, body) for one POST request."""
+    req = urllib.request.Request(url, data=json.dumps(payload).encode("utf-8"),
+                                 headers={"Content-Type": "application/json"})
+    t0 = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=600) as resp:
+            return resp.status, time.perf_counter() - t0, resp.read()
+    except urllib.error.HTTPError as err:
+        return err.code, time.perf_counter() - t0, err.read()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lasttest av analysetjenesten mot lokale stand-ins.")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duplicates", type=float, default=0.5, help="andel forespørsler som er like")
+    parser.add_argument("--nei", type=float, default=10_000)
+    parser.add_argument("--qra", action="store_true")
+    parser.add_argument("--buildings", type=int, default=50_000)
+    parser.add_argument("--latency-ms", type=float, default=100.0, help="forsinkelse i stand-in-tjenestene")
+    parser.add_argument("--workers", type=int, default=qd_service.SERVICE_WORKERS)
+    parser.add_argument("--upstream", type=int, default=qd_service.SERVICE_UPSTREAM)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    fake = serve_fake(n_buildings=args.buildings, latency_ms=args.latency_ms, seed=args.seed)
+    get_matrikkel_data.WFS_URL = fake.base_url + "/wfs"
+    get_veg_data.NVDB_API_URL = fake.base_url + "/nvdb"
+    service = qd_service.serve_in_thread(workers=args.workers, upstream=args.upstream)
+    url = service.base_url + "/analyse"
+
+    rng = np.random.default_rng(args.seed)
+    cx, cy = DEFAULT_CENTER
+    payloads = []
+    for _ in range(args.requests):
+        if rng.uniform() < args.duplicates:
+            x, y = cx, cy
+        else:
+            x, y = cx + rng.uniform(-3000, 3000), cy + rng.uniform(-3000, 3000)
+        payloads.append({"x": round(x, 1), "y": round(y, 1), "nei": args.nei, "qra": args.qra})
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(lambda p: post(url, p), payloads))
+    wall = time.perf_counter() - t0
+
+    seconds = np.array([s for _, s, _ in results])
+    statuses = {}
+    for status, _, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+    with urllib.request.urlopen(service.base_url + "/helse") as resp:
+        stats = json.loads(resp.read())
+
+    print(f"{args.requests} forespørsler, {args.concurrency} samtidige, {wall:.2f} s totalt")
+    print(f"  svartid P50 / P95 / maks: {np.percentile(seconds, 50) * 1000:.0f} / "
+          f"{np.percentile(seconds, 95) * 1000:.0f} / {seconds.max() * 1000:.0f} ms")
+    print(f"  statuskoder: {statuses}")
+    print(f"  tjenesten: {stats}")
+    print(f"  stand-ins: {fake.stats}")
+
+    service.shutdown()
+    fake.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Oct 22 14:26:18 2026
+Lokal stand-in for Geonorge WFS (matrikkel) og NVDB API for lasttesting uten nett.
+
+Serveren svarer med syntetiske data (benchmarks/synthetic.py) eller med bygninger
+og vegobjekter lest fra innspilte svar. Den følger bbox/kartutsnitt, paging
+(WFS startIndex/count og NVDB metadata.neste) og kan legge på forsinkelse og
+feilsvar. Fetcherne pekes hit med miljøvariabler:
+
+    python -m benchmarks.fake_services --port 8765 --latency-ms 150 --error-rate 0.05
+    MATRIKKEL_WFS_URL=http://127.0.0.1:8765/wfs NVDB_API_URL=http://127.0.0.1:8765/nvdb streamlit run streamlit_app.py
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs, urlencode
+
+import numpy as np
+import shapely
+
+from benchmarks.synthetic import (
+    DEFAULT_CENTER, synthetic_buildings, synthetic_roads, synthetic_nvdb, gml_from_arrays, recorded_payloads,
+)
+
+NVDB_PAGE_SIZE = 1000  # NVDB default sidestørrelse
+WFS_MAX_FEATURES = 100_000  # cap when the client does not ask for a page size
+
+
+class FakeData:
+    """Buildings as arrays and NVDB objects with precomputed envelopes, for fast bbox filtering."""
+
+    def __init__(self, n_buildings=50_000, n_roads=2_000, seed=0, recorded=False):
+        if recorded:
+            self._load_recorded()
+        else:
+            gdf = synthetic_buildings(n_buildings, seed=seed)
+            self.x = gdf.geometry.x.to_numpy()
+            self.y = gdf.geometry.y.to_numpy()
+            self.bygningstype = gdf["bygningstype"].to_numpy()
+            roads = synthetic_roads(n_roads, seed=seed)
+            self.nvdb = {"540": synthetic_nvdb(roads, "adt", seed)["objekter"],
+                         "105": synthetic_nvdb(roads, "fart", seed)["objekter"]}
+        self.bounds = {
+            kind: shapely.bounds(shapely.from_wkt([o["geometri"]["wkt"] for o in objekter])).reshape(-1, 4)
+            for kind, objekter in self.nvdb.items()
+        }
+
+    def _load_recorded(self):
+        from get_matrikkel_data import parse_matrikkel_gml
+
+        xs, ys, types = [], [], []
+        for payload in recorded_payloads("gml").values():
+            gdf = parse_matrikkel_gml(payload)
+            xs.append(gdf.geometry.x.to_numpy())
+            ys.append(gdf.geometry.y.to_numpy())
+            types.append(gdf["bygningstype"].astype(str).to_numpy())
+        self.x = np.concatenate(xs) if xs else np.empty(0)
+        self.y = np.concatenate(ys) if ys else np.empty(0)
+        self.bygningstype = np.concatenate(types) if types else np.empty(0, dtype=str)
+
+        # Recorded NVDB files are sorted by the object type they contain
+        self.nvdb = {"540": [], "105": []}
+        for payload in recorded_payloads("json").values():
+            for obj in payload.get("objekter", []):
+                ids = {e["id"] for e in obj.get("egenskaper", [])}
+                self.nvdb["105" if 2021 in ids else "540"].append(obj)
+
+    def buildings_in(self, minx, miny, maxx, maxy):
+        return np.flatnonzero((self.x >= minx) & (self.x <= maxx) & (self.y >= miny) & (self.y <= maxy))
+
+    def roads_in(self, kind, minx, miny, maxx, maxy):
+        b = self.bounds[kind]
+        return np.flatnonzero((b[:, 0] <= maxx) & (b[:, 2] >= minx) & (b[:, 1] <= maxy) & (b[:, 3] >= miny))
+
+
+class Handler(BaseHTTPRequestHandler):
+    server_version = "FoxtrotFake/1.0"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        srv = self.server
+
+        with srv.stats_lock:
+            srv.stats["requests"] += 1
+        delay = max(0.0, srv.rng_normal(srv.latency, srv.jitter))
+        time.sleep(delay)
+        if srv.rng_uniform() < srv.error_rate:
+            with srv.stats_lock:
+                srv.stats["errors"] += 1
+            return self._send(503, b"Service Unavailable (injected)", "text/plain")
+
+        try:
+            if url.path.rstrip("/").endswith("/wfs"):
+                return self._wfs(query)
+            parts = url.path.rstrip("/").split("/")
+            if len(parts) >= 2 and parts[-2] == "vegobjekter" and parts[-1] in srv.data.nvdb:
+                return self._nvdb(parts[-1], query)
+        except (KeyError, ValueError) as err:
+            return self._send(400, str(err).encode("utf-8"), "text/plain")
+        return self._send(404, b"Not found", "text/plain")
+
+    def _wfs(self, query):
+        minx, miny, maxx, maxy = (float(v) for v in query["bbox"].split(",")[:4])
+        hits = self.server.data.buildings_in(minx, miny, maxx, maxy)
+        start = int(query.get("startIndex", 0))
+        count = int(query.get("count", WFS_MAX_FEATURES))
+        page = hits[start:start + count]
+
+        next_url = None
+        if start + count < len(hits):
+            next_url = self._url({**query, "startIndex": start + count, "count": count})
+        d = self.server.data
+        body = gml_from_arrays(d.x[page], d.y[page], d.bygningstype[page], ids=page,
+                               number_matched=len(hits), next_url=next_url)
+        self._send(200, body, "application/gml+xml; version=3.2")
+
+    def _nvdb(self, kind, query):
+        minx, miny, maxx, maxy = (float(v) for v in query["kartutsnitt"].split(","))
+        hits = self.server.data.roads_in(kind, minx, miny, maxx, maxy)
+        size = int(query.get("antall", NVDB_PAGE_SIZE))
+        start = int(query.get("start", 0))  # NVDB uses an opaque token; here it is an offset
+        page = hits[start:start + size]
+        objekter = [self.server.data.nvdb[kind][i] for i in page]
+
+        metadata = {"antall": int(len(hits)), "returnert": len(objekter), "sidestørrelse": size}
+        if objekter:
+            neste_start = str(start + len(objekter))
+            metadata["neste"] = {"start": neste_start, "href": self._url({**query, "start": neste_start})}
+        body = json.dumps({"objekter": objekter, "metadata": metadata}, ensure_ascii=False).encode("utf-8")
+        self._send(200, body, "application/json")
+
+    def _url(self, query):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}{urlsplit(self.path).path}?{urlencode(query)}"
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        with self.server.stats_lock:
+            self.server.stats["bytes"] += len(body)
+
+
+class FakeServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, data, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, seed=0, verbose=False):
+        super().__init__(address, Handler)
+        self.data = data
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.error_rate = error_rate
+        self.verbose = verbose
+        self.stats = {"requests": 0, "errors": 0, "bytes": 0}
+        self.stats_lock = threading.Lock()
+        self._rng = np.random.default_rng(seed)
+        self._rng_lock = threading.Lock()
+
+    def rng_normal(self, mean, sd):
+        with self._rng_lock:
+            return self._rng.normal(mean, sd) if sd > 0 else mean
+
+    def rng_uniform(self):
+        with self._rng_lock:
+            return self._rng.uniform()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def serve_in_thread(port=0, **kwargs):
+    """
+    Starts a FakeServer in a daemon thread (port=0 picks a free port).
+    Keyword arguments go to FakeData (n_buildings, n_roads, recorded) and FakeServer.
+    Returns the server; its base_url + "/wfs" and + "/nvdb" are the endpoints. Stop with shutdown().
+    """
+    data_args = {k: kwargs.pop(k) for k in ("n_buildings", "n_roads", "recorded") if k in kwargs}
+    data = FakeData(seed=kwargs.get("seed", 0), **data_args)
+    server = FakeServer(("127.0.0.1", port), data, **kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lokal stand-in for matrikkel-WFS og NVDB API.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--buildings", type=int, default=50_000, help="antall syntetiske bygninger")
+    parser.add_argument("--roads", type=int, default=2_000, help="antall syntetiske veglenker")
+    parser.add_argument("--recorded", action="store_true", help="bruk innspilte svar i benchmarks/payloads/")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="andel forespørsler som får 503")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    data = FakeData(args.buildings, args.roads, seed=args.seed, recorded=args.recorded)
+    server = FakeServer(("127.0.0.1", args.port), data, args.latency_ms, args.jitter_ms, args.error_rate,
+                        seed=args.seed, verbose=args.verbose)
+    print(f"Syntetiske data rundt {DEFAULT_CENTER} (EPSG:32633)" if not args.recorded else "Innspilte data")
+    print(f"  MATRIKKEL_WFS_URL={server.base_url}/wfs")
+    print(f"  NVDB_API_URL={server.base_url}/nvdb")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(server.stats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Oct 22 11:32:04 2026
+Syntetiske matrikkel- og NVDB-data for benchmarks.
+
+Bygningene legges i klynger (tettsteder) rundt anlegget med litt spredt bebyggelse
+imellom, og bygningstypene trekkes med en blanding som ligner den norske
+bygningsmassen (mest boliger og garasjer/uthus). Noen ukjente koder tas med for å
+treffe fallback-grenen i classify_buildings.
+"""
+import json
+from pathlib import Path
+
+import numpy as np
+import geopandas as gpd
+
+from bygningskoder import MATRIKKEL_BYGNINGSTYPE
+
+PAYLOAD_DIR = Path(__file__).with_name("payloads")
+
+# Share of buildings per first digit of the building type code
+TYPE_MIX = {"1": 0.62, "2": 0.12, "3": 0.05, "4": 0.04, "5": 0.03, "6": 0.04, "7": 0.03, "8": 0.06}
+UNKNOWN_SHARE = 0.01
+UNKNOWN_CODES = ["159", "299", "999"]
+
+DEFAULT_CENTER = (262000.0, 6650000.0)  # somewhere east of Oslo, EPSG:32633
+
+
+def _type_codes(n, rng):
+    codes, weights = [], []
+    for digit, share in TYPE_MIX.items():
+        group = [c for c in MATRIKKEL_BYGNINGSTYPE if c.startswith(digit)]
+        codes += group
+        weights += [share / len(group)] * len(group)
+    weights = np.array(weights) * (1 - UNKNOWN_SHARE)
+    codes += UNKNOWN_CODES
+    weights = np.r_[weights, np.full(len(UNKNOWN_CODES), UNKNOWN_SHARE / len(UNKNOWN_CODES))]
+    return rng.choice(np.array(codes), size=n, p=weights / weights.sum())
+
+
+def synthetic_points(n, center=DEFAULT_CENTER, radius=2500.0, seed=0, clustered_share=0.85):
+    """(n, 2) clustered building positions inside a disk around center."""
+    rng = np.random.default_rng(seed)
+    n_clustered = int(n * clustered_share)
+    n_clusters = max(1, n // 300)
+
+    # Cluster centres and sizes; larger clusters are also wider
+    r = radius * np.sqrt(rng.uniform(0, 1, n_clusters))
+    a = rng.uniform(0, 2 * np.pi, n_clusters)
+    centres = np.column_stack([r * np.cos(a), r * np.sin(a)])
+    size = rng.pareto(1.5, n_clusters) + 1
+    spread = 40 + 30 * np.sqrt(size)
+    member = rng.choice(n_clusters, size=n_clustered, p=size / size.sum())
+    clustered = centres[member] + rng.normal(0, 1, (n_clustered, 2)) * spread[member, None]
+
+    n_scatter = n - n_clustered
+    r = radius * np.sqrt(rng.uniform(0, 1, n_scatter))
+    a = rng.uniform(0, 2 * np.pi, n_scatter)
+    scattered = np.column_stack([r * np.cos(a), r * np.sin(a)])
+
+    return np.vstack([clustered, scattered]) + np.asarray(center)
+
+
+def synthetic_buildings(n, center=DEFAULT_CENTER, radius=2500.0, seed=0):
+    """GeoDataFrame shaped like the WFS result: bygningstype (str) and points in EPSG:32633."""
+    rng = np.random.default_rng(seed + 1)
+    xy = synthetic_points(n, center, radius, seed)
+    return gpd.GeoDataFrame(
+        {"bygningstype": _type_codes(n, rng)},
+        geometry=gpd.points_from_xy(xy[:, 0], xy[:, 1]),
+        crs="EPSG:32633",
+    )
+
+
+def synthetic_gml(gdf):
+    """WFS 2.0 GML 3.2 FeatureCollection (bytes) for the buildings, as served by Geonorge."""
+    return gml_from_arrays(gdf.geometry.x.to_numpy(), gdf.geometry.y.to_numpy(), gdf["bygningstype"].to_numpy())
+
+
+def gml_from_arrays(x, y, bygningstype, ids=None, number_matched=None, next_url=None):
+    """GML FeatureCollection (bytes) from coordinate and type arrays; paging attributes as in WFS 2.0."""
+    ids = np.arange(len(x)) if ids is None else ids
+    members = "".join(
+        f'<wfs:member><app:Bygning gml:id="bygning.{i}">'
+        f"<app:bygningsnummer>{100000000 + i}</app:bygningsnummer>"
+        f"<app:bygningstype>{t}</app:bygningstype>"
+        f'<app:representasjonspunkt><gml:Point gml:id="p.{i}" srsName="urn:ogc:def:crs:EPSG::32633">'
+        f"<gml:pos>{xi:.2f} {yi:.2f}</gml:pos></gml:Point></app:representasjonspunkt>"
+        f"</app:Bygning></wfs:member>"
+        for i, t, xi, yi in zip(ids, bygningstype, x, y)
+    )
+    matched = len(x) if number_matched is None else number_matched
+    neste = f' next="{next_url.replace("&", "&amp;")}"' if next_url else ""
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<wfs:FeatureCollection xmlns:wfs="http://www.opengis.net/wfs/2.0" '
+        'xmlns:gml="http://www.opengis.net/gml/3.2" '
+        'xmlns:app="https://skjema.geonorge.no/SOSI/produktspesifikasjon/Matrikkelen-Bygningspunkt" '
+        f'numberMatched="{matched}" numberReturned="{len(x)}"{neste}>'
+        f"{members}</wfs:FeatureCollection>"
+    ).encode("utf-8")
+
+
+def synthetic_roads(n_roads, center=DEFAULT_CENTER, radius=2500.0, seed=0, vertices=12, step=40.0):
+    """List of (id, (k, 2) vertex array) random-walk polylines around center."""
+    rng = np.random.default_rng(seed + 2)
+    starts = synthetic_points(n_roads, center, radius, seed + 3, clustered_share=0.5)
+    heading = rng.uniform(0, 2 * np.pi, n_roads)
+    roads = []
+    for i in range(n_roads):
+        turns = np.cumsum(rng.normal(0, 0.2, vertices - 1)) + heading[i]
+        steps = np.column_stack([np.cos(turns), np.sin(turns)]) * step
+        roads.append((1000000 + i, np.vstack([starts[i], starts[i] + np.cumsum(steps, axis=0)])))
+    return roads
+
+
+def synthetic_dem(center=DEFAULT_CENTER, radius=5000.0, cell=10.0, seed=0, ridges=12):
+    """
+    terrain.Dem covering radius around center: a gentle slope plus Gaussian ridges
+    up to 80 m high, so that a share of the profiles is blocked.
+    """
+    from terrain import Dem
+
+    rng = np.random.default_rng(seed + 4)
+    n = int(np.ceil(2 * radius / cell))
+    x0, y0 = center[0] - radius, center[1] + radius
+    xs = x0 + (np.arange(n) + 0.5) * cell
+    ys = y0 - (np.arange(n) + 0.5) * cell
+    gx, gy = np.meshgrid(xs, ys)
+    z = 100.0 + 0.01 * (gx - center[0])
+    for _ in range(ridges):
+        # Elongated ridge: Gaussian across a random line through the area
+        px, py = center[0] + rng.uniform(-radius, radius), center[1] + rng.uniform(-radius, radius)
+        angle = rng.uniform(0, np.pi)
+        across = (gx - px) * -np.sin(angle) + (gy - py) * np.cos(angle)
+        z += rng.uniform(20, 80) * np.exp(-0.5 * (across / rng.uniform(50, 200)) ** 2)
+    return Dem(z.astype(np.float32), x0, y0, cell)
+
+
+def _wkt(xy):
+    return "LINESTRING Z (" + ", ".join(f"{x:.3f} {y:.3f} 10.0" for x, y in xy) + ")"
+
+
+def synthetic_nvdb(roads, kind="adt", seed=0):
+    """
+    NVDB vegobjekter response (dict) for the roads.
+    kind="adt" gives type 540 with ÅDT properties, kind="fart" type 105 with speed limits.
+    """
+    rng = np.random.default_rng(seed + 4)
+    objekter = []
+    for obj_id, xy in roads:
+        if kind == "adt":
+            egenskaper = [
+                {"id": 4621, "verdi": 2023},
+                {"id": 4623, "verdi": int(rng.lognormal(7, 1.2))},
+                {"id": 4625, "verdi": "Beregnet"},
+            ]
+        else:
+            egenskaper = [{"id": 2021, "verdi": int(rng.choice([30, 40, 50, 60, 70, 80, 90]))}]
+        objekter.append({"id": obj_id, "geometri": {"wkt": _wkt(xy), "srid": 5973}, "egenskaper": egenskaper})
+    return {"objekter": objekter, "metadata": {"antall": len(objekter), "returnert": len(objekter)}}
+
+
+def recorded_payloads(kind):
+    """Recorded responses in benchmarks/payloads/ (*.gml as bytes, *.json as dicts), if any."""
+    if kind == "gml":
+        return {p.name: p.read_bytes() for p in sorted(PAYLOAD_DIR.glob("*.gml"))}
+    return {p.name: json.loads(p.read_text(encoding="utf-8")) for p in sorted(PAYLOAD_DIR.glob("*.json"))}
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 11:40:18 2026
+Atferdstester for qd_rules.binding_qd, QD for anlegg med flere kilder.
+
+Låser at én kilde gir det samme som QD_func og inside_qd, at den bindende kilden
+er den med minst margin (avstand - QD), ikke den nærmeste, og at blandede
+faregrupper regnes per kilde.
+
+Bruk (fra rotmappen):
+    python -m pytest benchmarks/test_qd_rules.py
+    python -m benchmarks.test_qd_rules
+"""
+import importlib
+import os
+
+import numpy as np
+
+import qd_rules
+from qd_rules import binding_qd, inside_qd, QD_func
+
+KATEGORIER = np.array(["sårbar", "bolig", "vei/industri", "skjermingsverdig"], dtype=object)
+
+
+def test_one_source_matches_qd_func():
+    rng = np.random.default_rng(0)
+    bx, by = rng.uniform(-3000, 3000, size=(2, 400))
+    kategori = rng.choice(KATEGORIER, size=400)
+    QD = QD_func(5000)
+
+    avstand, qd, kilde = binding_qd(bx, by, kategori, [0.0], [0.0], [5000])
+    assert (kilde == 0).all()
+    assert np.allclose(avstand, np.hypot(bx, by))
+    assert ((avstand < qd) == inside_qd(avstand, kategori, QD)).all()
+    ring = [qd_rules.KATEGORI_RING[k] for k in KATEGORIER[:3]]
+    for k, r in zip(KATEGORIER[:3], ring):
+        assert (qd[kategori == k] == QD[r]).all()
+
+
+def test_binding_source_is_least_margin_not_nearest():
+    # 450 m from a small source (QD 400) is clear, 900 m from a large one (QD 1030) is not
+    small, large = 1000, 100000
+    assert QD_func(small)[1] < 450 and QD_func(large)[1] > 900
+    avstand, qd, kilde = binding_qd([450.0], [0.0], ["bolig"], [0.0, 1350.0], [0.0, 0.0], [small, large])
+    assert kilde[0] == 1
+    assert avstand[0] == 900.0 and qd[0] == QD_func(large)[1]
+    assert avstand[0] < qd[0]
+
+
+def test_categories_without_ring_are_never_inside():
+    avstand, qd, kilde = binding_qd([10.0, 500.0], [0.0, 0.0], ["ingen beskyttelse", "annet"],
+                                    [0.0, 450.0], [0.0, 0.0], [5000, 5000])
+    assert np.isnan(qd).all()
+    assert list(kilde) == [0, 1]
+    assert not (avstand < qd).any()
+
+
+def test_mixed_hazard_divisions():
+    os.environ["FOXTROT_UKONTROLLERT_HD"] = "1"
+    try:
+        rules = importlib.reload(qd_rules)
+        # HD 1.4 has a fixed 25 m QD, HD 1.1 at least 400 m for bolig
+        avstand, qd, kilde = rules.binding_qd([0.0, 1000.0], [0.0, 0.0], ["bolig", "bolig"],
+                                              [10.0, 1500.0], [0.0, 0.0], [100, 100], ["1.4", "1.1"])
+        assert list(kilde) == [0, 1]
+        assert qd[0] == rules.QD_func(100, "1.4")[1] and qd[1] == rules.QD_func(100, "1.1")[1]
+        assert list(avstand < qd) == [True, False]
+    finally:
+        del os.environ["FOXTROT_UKONTROLLERT_HD"]
+        importlib.reload(qd_rules)
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"{name}: OK")
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Oct 29 10:05:12 2026
+Atferdstester for terrain.line_of_sight på små konstruerte DEM-er.
+
+Låser regelen for når en bygning regnes som skjermet: terrenget må stå over
+siktlinjen mellom ladningen og bygningen, og celler nærmere enn én celle fra
+anlegget eller bygningen (deres egen grunn) teller ikke.
+
+Bruk (fra rotmappen):
+    python -m pytest benchmarks/test_terrain.py
+    python -m benchmarks.test_terrain
+"""
+import numpy as np
+
+from terrain import Dem, line_of_sight, dem_path, available_dems
+
+CELL = 10.0
+SOURCE = (105.0, 505.0)   # centre of column 10, row 49
+TARGET = (605.0, 505.0)   # centre of column 60, same row, 500 m east
+
+
+def flat_dem(walls=(), height=0.0, size=100):
+    """Flat size x size DEM at height, with full-height walls (column, wall height) across it."""
+    z = np.full((size, size), height, dtype=np.float32)
+    for col, h in walls:
+        z[:, col] = height + h
+    return Dem(z, 0.0, size * CELL, CELL)
+
+
+def obstructed(dem, targets=(TARGET,), **kwargs):
+    return line_of_sight(dem, SOURCE, np.array(targets), **kwargs)[0]
+
+
+def test_flat_terrain_is_clear():
+    assert not obstructed(flat_dem()).any()
+
+
+def test_wall_between_obstructs():
+    assert obstructed(flat_dem(walls=[(35, 10.0)])).all()
+
+
+def test_wall_below_sight_line_is_clear():
+    # The sight line runs from 1 m (charge) to 2 m (building) above ground
+    assert not obstructed(flat_dem(walls=[(35, 1.0)])).any()
+
+
+def test_clearance():
+    dem = flat_dem(walls=[(35, 3.0)])  # about 1.5 m above the sight line
+    assert obstructed(dem, clearance=1.0).all()
+    assert not obstructed(dem, clearance=2.0).any()
+
+
+def test_own_cells_do_not_obstruct():
+    # Walls on the charge's and the building's own cells are their own ground
+    assert not obstructed(flat_dem(walls=[(10, 50.0)])).any()
+    assert not obstructed(flat_dem(walls=[(60, 50.0)])).any()
+
+
+def test_neighbour_cells_obstruct_at_both_ends():
+    # One cell away counts, the same at the charge and at the building
+    assert obstructed(flat_dem(walls=[(11, 50.0)])).all()
+    assert obstructed(flat_dem(walls=[(59, 50.0)])).all()
+
+
+def test_wall_behind_building_is_ignored():
+    assert not obstructed(flat_dem(walls=[(80, 50.0)])).any()
+
+
+def test_outside_dem_and_nodata_never_obstruct():
+    assert not obstructed(flat_dem(walls=[(35, 10.0)]), targets=[(2000.0, 505.0)]).any()
+    z = flat_dem(walls=[(35, 10.0)]).z
+    z[:, 35] = np.nan
+    assert not obstructed(Dem(z, 0.0, 1000.0, CELL)).any()
+
+
+def test_blocks_give_the_same_result():
+    rng = np.random.default_rng(0)
+    dem = flat_dem(walls=[(35, 10.0), (70, 4.0)])
+    targets = rng.uniform(0, 1000, size=(500, 2))
+    whole, h_whole = line_of_sight(dem, SOURCE, targets)
+    blocked, h_blocked = line_of_sight(dem, SOURCE, targets, max_elements=300)
+    assert (whole == blocked).all()
+    assert np.array_equal(h_whole, h_blocked)
+    assert whole.any() and not whole.all()
+
+
+def test_dem_path_only_allows_listed_files(tmp_path):
+    (tmp_path / "dem_10m.npy").write_bytes(b"")
+    (tmp_path / "notater.txt").write_bytes(b"")
+    assert available_dems(str(tmp_path)) == ["dem_10m.npy"]
+    assert dem_path("dem_10m.npy", str(tmp_path)) == str(tmp_path / "dem_10m.npy")
+    for name in ("notater.txt", "../dem_10m.npy", "/etc/passwd"):
+        try:
+            dem_path(name, str(tmp_path))
+        except ValueError:
+            continue
+        raise AssertionError(f"{name} was accepted")
+
+
+if __name__ == "__main__":
+    import inspect
+    import pathlib
+    import tempfile
+
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            if "tmp_path" in inspect.signature(fn).parameters:
+                with tempfile.TemporaryDirectory() as tmp:
+                    fn(pathlib.Path(tmp))
+            else:
+                fn()
+            print(f"{name}: OK")
@@ -38,4 +38,61 @@ def incident_pressure(D,NEI):
         Cz = 0
         Dz = 0
         Ez = 0
-    return (np.exp(Az+Bz*np.log(Z) + Cz * (np.log(Z))**2+ Dz * (np.log(Z))**3+ Ez * (np.log(Z))**4))
\ No newline at end of file
+    return (np.exp(Az+Bz*np.log(Z) + Cz * (np.log(Z))**2+ Dz * (np.log(Z))**3+ Ez * (np.log(Z))**4))
+
+# Swisdak (1994) coefficients per scaled-distance band, same as incident_pressure
+_KB_PRESSURE = np.array([
+    [7.2106, -2.1069, -0.3229, 0.1117, 0.0685],    # Z <= 2.9
+    [7.5938, -3.0523, 0.40977, 0.0261, -0.01267],  # 2.9 < Z <= 23.8
+    [6.0536, -1.4066, 0, 0, 0],                    # Z > 23.8
+])
+
+def incident_pressure_array(D, NEI):
+    """
+    Vectorized incident_pressure over whole arrays.
+    Args:
+      D   : array of distances (m)
+      NEI : scalar or array (broadcast against D) of net explosive content (kg TNT eq)
+    Returns:
+      array of pressures in kPa, np.nan where inputs are invalid.
+    """
+    D = np.asarray(D, dtype=float)
+    NEI = np.asarray(NEI, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        Z = D / np.cbrt(NEI)
+        band = np.where(Z <= 2.9, 0, np.where(Z <= 23.8, 1, 2))
+        c = _KB_PRESSURE[band]
+        L = np.log(Z)
+        P = np.exp(c[..., 0] + L * (c[..., 1] + L * (c[..., 2] + L * (c[..., 3] + L * c[..., 4]))))
+    valid = (D > 0) & (NEI > 0)
+    return np.where(valid, P, np.nan)
+
+
+# Swisdak (1994) coefficients for scaled positive-phase impulse (kPa-ms/kg^1/3)
+_KB_IMPULSE_LIMITS = np.array([0.96, 2.38, 33.7])
+_KB_IMPULSE = np.array([
+    [5.522, 1.117, 0.600, -0.292, -0.087],        # Z <= 0.96
+    [5.465, -0.308, -1.464, 1.362, -0.432],       # 0.96 < Z <= 2.38
+    [5.2749, -0.4677, -0.2499, 0.0588, -0.00554], # 2.38 < Z <= 33.7
+    [5.9825, -1.062, 0, 0, 0],                    # Z > 33.7
+])
+
+def incident_impulse_array(D, NEI):
+    """
+    Incident positive-phase impulse from simplified Kingery–Bulmash (Swisdak, 1994).
+    Args:
+      D   : array of distances (m)
+      NEI : scalar or array (broadcast against D) of net explosive content (kg TNT eq)
+    Returns:
+      array of impulses in kPa-ms (= Pa-s), np.nan where inputs are invalid.
+    """
+    D = np.asarray(D, dtype=float)
+    NEI = np.asarray(NEI, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        W13 = np.cbrt(NEI)
+        Z = D / W13
+        c = _KB_IMPULSE[np.searchsorted(_KB_IMPULSE_LIMITS, Z)]
+        L = np.log(Z)
+        i = np.exp(c[..., 0] + L * (c[..., 1] + L * (c[..., 2] + L * (c[..., 3] + L * c[..., 4])))) * W13
+    valid = (D > 0) & (NEI > 0)
+    return np.where(valid, i, np.nan)
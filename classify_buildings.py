@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 13:20:31 2026
+Klassifisering av bygninger fra matrikkelen etter bygningskoder.py.
+Flyttet hit fra pages/1_Input.py slik at den kan deles av cache, batch og sider.
+"""
+import numpy as np
+import pandas as pd
+
+import timing
+
+from bygningskoder import MATRIKKEL_BYGNINGSTYPE
+
+COLOR_MAP = {
+    "sårbar": "red",
+    "bolig": "orange",
+    "vei/industri": "black",
+    "skjermingsverdig": "purple",
+    "ingen beskyttelse": "#79DAD6"
+}
+
+# Expected Dict structure: "111": ("Enebolig", "bolig")
+_REF_DF = pd.DataFrame.from_dict(
+    MATRIKKEL_BYGNINGSTYPE,
+    orient='index',
+    columns=['Beskrivelse', 'Kategori']
+)
+
+
+@timing.traced("classify")
+def classify_buildings(gdf):
+    """
+    Classifies buildings using the MATRIKKEL_BYGNINGSTYPE dictionary.
+    Assigns colors: Purple (skjermingsverdig), Red (sårbar), etc.
+    """
+    # 1. Ensure the building code column is a string
+    gdf["bygningstype"] = gdf["bygningstype"].astype(str)
+
+    # 2. Merge the lookup data into the results
+    gdf = gdf.merge(
+        _REF_DF,
+        left_on="bygningstype",
+        right_index=True,
+        how="left"
+    )
+
+    # 3. Fallback if code is new/unknown: Guess type based on first digit
+    first_digit = gdf["bygningstype"].str[0]
+    fallback = np.select(
+        [first_digit == "1", first_digit.isin(["5", "6", "7", "8"])],
+        ["bolig", "sårbar"],
+        default="vei/industri"
+    )
+    gdf["kategori"] = gdf["Kategori"].where(gdf["Kategori"].notna(), fallback)
+
+    # 4. Map the color, defaulting to 'black' if category is somehow unknown
+    gdf["color"] = gdf["kategori"].map(COLOR_MAP).fillna("black")
+
+    return gdf
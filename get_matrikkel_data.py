@@ -4,13 +4,25 @@ Created on Tue Aug 12 09:59:03 2025
 
 @author: KRHE
 """
+import os
 import requests
 import geopandas as gpd
 from io import BytesIO
 
-def get_matrikkel_data(bbox_tuple):
-    """Denne funksjonen bruker Kartverkets API til å finne alle bygninger innenfor en bounding box."""
-    wfs_url = "https://wfs.geonorge.no/skwms1/wfs.matrikkelen-bygningspunkt?"
+import metrics
+import timing
+
+# "wfs" = Kartverkets WFS, "lokal" = lokal indeks bygget med matrikkel_index.py
+DEFAULT_BACKEND = os.environ.get("MATRIKKEL_BACKEND", "wfs")
+# Kan pekes mot en lokal stand-in (benchmarks/fake_services.py) for lasttesting
+WFS_URL = os.environ.get("MATRIKKEL_WFS_URL", "https://wfs.geonorge.no/skwms1/wfs.matrikkelen-bygningspunkt?")
+
+def get_matrikkel_data(bbox_tuple, backend=None):
+    """Denne funksjonen bruker Kartverkets API til å finne alle bygninger innenfor en bounding box.
+    Med backend="lokal" hentes bygningene fra den lokale indeksen i stedet (ingen nettverkstrafikk)."""
+    backend = backend or DEFAULT_BACKEND
+    if backend == "lokal":
+        return get_matrikkel_data_lokal(bbox_tuple)
 
     minx, miny, maxx, maxy = bbox_tuple
     bbox_str = f'{minx},{miny},{maxx},{maxy},EPSG:32633'
@@ -26,7 +38,10 @@ def get_matrikkel_data(bbox_tuple):
     }
 
     try:
-        response = requests.get(wfs_url, params=params)
+        with timing.span("wfs_fetch") as sp, metrics.upstream("wfs") as call:
+            response = requests.get(WFS_URL, params=params)
+            sp.bytes = call.bytes = len(response.content)
+            call.status = response.status_code
         response.raise_for_status()
     except requests.exceptions.HTTPError as errh:
         print("HTTP Error:", errh)
@@ -42,7 +57,10 @@ def get_matrikkel_data(bbox_tuple):
         return gpd.GeoDataFrame()
 
     try:
-        matrikkel_data = gpd.read_file(BytesIO(response.content))
+        with timing.span("parse_gml") as sp:
+            sp.bytes = len(response.content)
+            matrikkel_data = parse_matrikkel_gml(response.content)
+            sp.rows_out = len(matrikkel_data)
         return matrikkel_data
     except ValueError as ve:
         print(f"ValueError: {ve}")
@@ -50,3 +68,49 @@ def get_matrikkel_data(bbox_tuple):
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
         return gpd.GeoDataFrame()
+
+
+def parse_matrikkel_gml(content):
+    """Leser GML-svaret fra WFS-en (bytes) til en GeoDataFrame."""
+    return gpd.read_file(BytesIO(content))
+
+
+def get_matrikkel_data_lokal(bbox_tuple):
+    """Henter bygninger innenfor en bounding box fra den lokale matrikkelindeksen."""
+    from matrikkel_index import query_bbox
+
+    try:
+        hits = query_bbox(bbox_tuple)
+    except (OSError, ValueError) as err:
+        print("Error reading local index:", err)
+        return gpd.GeoDataFrame()
+
+    if len(hits["x"]) == 0:
+        return gpd.GeoDataFrame()
+
+    return gpd.GeoDataFrame(
+        {"bygningstype": hits["bygningstype"].astype(str)},
+        geometry=gpd.points_from_xy(hits["x"], hits["y"]),
+        crs="EPSG:32633",
+    )
+
+
+def clip_to_circle(gdf, center_xy, radius, margin=0.0):
+    """
+    Fjerner bygninger utenfor sirkelen rundt anlegget. WFS-en returnerer alt i den
+    kvadratiske bounding boxen, og ca. 21 % av kvadratet ligger utenfor den innskrevne sirkelen.
+    Args:
+      gdf       : bygningspunkter (EPSG:32633)
+      center_xy : (x, y) for anlegget
+      radius    : største relevante avstand (m), normalt QD_syk
+      margin    : ekstra avstand (m) for å beholde kontekstbygg utenfor radius
+    Returns:
+      GeoDataFrame med bygningene innenfor radius + margin.
+    """
+    if gdf is None or gdf.empty:
+        return gdf
+    cx, cy = center_xy
+    dx = gdf.geometry.x.to_numpy() - cx
+    dy = gdf.geometry.y.to_numpy() - cy
+    r = radius + margin
+    return gdf[dx * dx + dy * dy <= r * r]
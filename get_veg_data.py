@@ -5,16 +5,56 @@ Created on Tue Aug 12 09:52:32 2025
 @author: KRHE
 """
 
+import os
 import requests
 import pandas as pd
 import geopandas as gpd
 from shapely import wkt
 
+import metrics
+import timing
+
+# Kan pekes mot en lokal stand-in (benchmarks/fake_services.py) for lasttesting
+NVDB_API_URL = os.environ.get("NVDB_API_URL", "https://nvdbapiles.atlas.vegvesen.no").rstrip("/")
+MAX_SIDER = 100  # øvre grense for antall sider per vegobjekttype
+
+
+class AvkortetSvar(RuntimeError):
+    """NVDB har flere sider enn MAX_SIDER; svaret ville vært ufullstendig."""
+
+
+def hent_alle_sider(url, params, headers):
+    """Henter alle sider fra NVDB ved å følge metadata.neste.start.
+    Returnerer svaret med objektene fra alle sider samlet i 'objekter'.
+    Kaster AvkortetSvar hvis det fortsatt er flere sider etter MAX_SIDER."""
+    params = dict(params)
+    jsonResponse = None
+    objekter = []
+    for _ in range(MAX_SIDER):
+        with timing.span("nvdb_fetch", url=url) as sp, metrics.upstream("nvdb") as call:
+            response = requests.get(url, params=params, headers=headers)
+            sp.bytes = call.bytes = len(response.content)
+            call.status = response.status_code
+        response.raise_for_status()
+        side = response.json()
+        if 'objekter' not in side:
+            return side if jsonResponse is None else {**jsonResponse, 'objekter': objekter}
+        jsonResponse = side
+        objekter += side['objekter']
+        neste = side.get('metadata', {}).get('neste') or {}
+        if not side['objekter'] or 'start' not in neste:
+            break
+        params['start'] = neste['start']
+    else:
+        raise AvkortetSvar(f"{url} har flere enn {MAX_SIDER} sider ({len(objekter)} objekter hentet)")
+    return {**jsonResponse, 'objekter': objekter}
+
+
 def get_veg_data(row):
     """Denne funksjonen bruker SVV NVDB API til å finne alle veier, ÅDT og hastighet innenfor en bounding box
     https://nvdb-docs.atlas.vegvesen.no/"""
-    nvdburl = 'https://nvdbapiles.atlas.vegvesen.no/vegobjekter/540'  # 540 er ÅDT
-    fartsurl = 'https://nvdbapiles.atlas.vegvesen.no/vegobjekter/105'  # 105 = Fartsgrense
+    nvdburl = f'{NVDB_API_URL}/vegobjekter/540'  # 540 er ÅDT
+    fartsurl = f'{NVDB_API_URL}/vegobjekter/105'  # 105 = Fartsgrense
 
     minx, miny, maxx, maxy = row['minx'], row['miny'], row['maxx'], row['maxy']
 
@@ -31,15 +71,34 @@ def get_veg_data(row):
     }
 
     try:
-        response = requests.get(nvdburl, params=params, headers=headers)
-        response.raise_for_status()
-        jsonResponse = response.json()
+        jsonResponse = hent_alle_sider(nvdburl, params, headers)
         if 'objekter' not in jsonResponse:
             return gpd.GeoDataFrame()
     except (requests.exceptions.RequestException, ValueError) as err:
         print("Error:", err)
         return gpd.GeoDataFrame()
 
+    geo_veg_data = parse_vegobjekter(jsonResponse)
+    if geo_veg_data.empty:
+        return geo_veg_data
+
+    try:
+        fart_json = hent_alle_sider(fartsurl, params, headers)
+        if 'objekter' not in fart_json:
+            geo_veg_data['Fartsgrense'] = None
+            return geo_veg_data
+    except AvkortetSvar:
+        raise
+    except Exception as err:
+        print("Error fetching speed limits:", err)
+        geo_veg_data['Fartsgrense'] = None
+        return geo_veg_data
+
+    return join_fartsgrenser(geo_veg_data, parse_fartsgrenser(fart_json))
+
+
+def parse_vegobjekter(jsonResponse):
+    """Gjør om NVDB-svaret for ÅDT (vegobjekttype 540) til en GeoDataFrame i EPSG:5973."""
     vegdata_list = []
     for vegobjekt in jsonResponse['objekter']:
         vegdata_dict = {'Vegobj_id': vegobjekt['id']}
@@ -60,20 +119,11 @@ def get_veg_data(row):
 
     if 'geometry' in vegdata:
         vegdata['geometry'] = vegdata['geometry'].apply(wkt.loads)
-    geo_veg_data = gpd.GeoDataFrame(vegdata, geometry='geometry', crs="EPSG:5973")
+    return gpd.GeoDataFrame(vegdata, geometry='geometry', crs="EPSG:5973")
 
-    try:
-        fart_response = requests.get(fartsurl, params=params, headers=headers)
-        fart_response.raise_for_status()
-        fart_json = fart_response.json()
-        if 'objekter' not in fart_json:
-            geo_veg_data['Fartsgrense'] = None
-            return geo_veg_data
-    except Exception as err:
-        print("Error fetching speed limits:", err)
-        geo_veg_data['Fartsgrense'] = None
-        return geo_veg_data
 
+def parse_fartsgrenser(fart_json):
+    """Gjør om NVDB-svaret for fartsgrenser (vegobjekttype 105) til en GeoDataFrame i EPSG:5973."""
     fart_list = []
     for obj in fart_json['objekter']:
         fart_dict = {}
@@ -87,15 +137,20 @@ def get_veg_data(row):
 
     fart_df = pd.DataFrame(fart_list)
     if fart_df.empty:
-        geo_veg_data['Fartsgrense'] = None
-        return geo_veg_data
+        return gpd.GeoDataFrame()
 
     fart_df['geometry'] = fart_df['geometry'].apply(wkt.loads)
-    geo_fart = gpd.GeoDataFrame(fart_df, geometry='geometry', crs="EPSG:5973")
+    return gpd.GeoDataFrame(fart_df, geometry='geometry', crs="EPSG:5973")
+
+
+def join_fartsgrenser(geo_veg_data, geo_fart):
+    """Deler ÅDT-segmentene opp etter fartsgrensestrekningene."""
+    if geo_fart.empty:
+        geo_veg_data['Fartsgrense'] = None
+        return geo_veg_data
 
-    geo_veg_data = gpd.overlay(
+    return gpd.overlay(
         geo_veg_data,
         geo_fart[['geometry', 'Fartsgrense']],
         how='intersection'
     )
-    return geo_veg_data
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Oct 22 11:05:37 2026
+Kartlag som deles av sidene. Flyttet hit fra pages/1_Input.py slik at
+kartbyggingen kan måles i benchmarks/ uten å starte Streamlit.
+"""
+from compact import is_compact, to_geodataframe
+
+
+def create_qd_buffer(gdf, qd_value, pressure_label):
+    out = gdf.copy().drop(columns=["nordUTM33", "oestUTM33"])
+    out["QD"] = qd_value
+    out["trykk"] = pressure_label
+    out["geometry"] = out.geometry.buffer(qd_value)
+    return out
+
+
+def plot_matrikkel_on_map(gdf, m):
+    if gdf is None or gdf.empty:
+        return m
+    if is_compact(gdf):
+        gdf = to_geodataframe(gdf)
+    categories = gdf["kategori"].unique()
+    for cat in categories:
+        subset = gdf[gdf["kategori"] == cat]
+        color = subset["color"].iloc[0]
+        subset = subset.drop(columns=["color", "kategori", "typekode"], errors="ignore")
+        subset.explore(
+            m=m,
+            name=f"Bygg – {cat}",
+            marker_type="circle",
+            style_kwds=dict(color=color, fillColor=color, fillOpacity=1, radius=5),
+        )
+    return m
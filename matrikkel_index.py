@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 09:12:40 2026
+Lokal, nettverksfri indeks over bygningspunkter fra matrikkelen.
+
+Indeksen bygges fylke for fylke fra en nedlastet Matrikkel bygningspunkt-eksport
+(GML, GeoPackage, GeoJSON eller annet format som geopandas kan lese) og lagres
+som numpy-arrays som kan minnemappes:
+
+    <indeks>/manifest.json
+    <indeks>/<fylke>/x.npy            float64, UTM33N (EPSG:32633)
+    <indeks>/<fylke>/y.npy            float64
+    <indeks>/<fylke>/bygningstype.npy uint16
+    <indeks>/<fylke>/kategori.npy     uint8, indeks i KATEGORIER
+    <indeks>/<fylke>/celle_start.npy  int64, CSR-offset per gridcelle
+
+Punktene sorteres etter gridcelle (rad for rad), slik at alle punkter i en rad
+av celler ligger sammenhengende. Et bbox-søk blir da ett slice per cellerad
+pluss et eksakt filter på kandidatene.
+
+Bruk fra kommandolinjen:
+    python matrikkel_index.py bygningspunkt_03.gml --fylke 03
+"""
+import argparse
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+
+from bygningskoder import MATRIKKEL_BYGNINGSTYPE
+
+INDEX_DIR = os.environ.get("MATRIKKEL_INDEX_DIR", "matrikkel_index")
+DEFAULT_CELL_SIZE = 1000.0  # m
+
+KATEGORIER = ["sårbar", "bolig", "vei/industri", "skjermingsverdig", "ingen beskyttelse"]
+
+_ARRAY_NAMES = ["x", "y", "bygningstype", "kategori", "celle_start"]
+_loaded = {}  # (indeks, fylke) -> dict med minnemappede arrays
+
+
+def category_codes(type_codes):
+    """
+    Precomputes the category index (into KATEGORIER) for an array of building codes.
+    Unknown codes fall back on the first digit, as in classify_buildings.
+    """
+    type_codes = np.asarray(type_codes, dtype=np.int64)
+    lookup = np.full(1000, -1, dtype=np.int16)
+    for code, (_, kategori) in MATRIKKEL_BYGNINGSTYPE.items():
+        lookup[int(code)] = KATEGORIER.index(kategori)
+
+    first_digit = type_codes // 100
+    fallback = np.where(
+        first_digit == 1, KATEGORIER.index("bolig"),
+        np.where(np.isin(first_digit, [5, 6, 7, 8]), KATEGORIER.index("sårbar"), KATEGORIER.index("vei/industri"))
+    )
+    in_range = (type_codes >= 0) & (type_codes < 1000)
+    found = np.where(in_range, lookup[np.clip(type_codes, 0, 999)], -1)
+    return np.where(found >= 0, found, fallback).astype(np.uint8)
+
+
+def _read_manifest(index_dir):
+    path = os.path.join(index_dir, "manifest.json")
+    if not os.path.exists(path):
+        return {"fylker": {}}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_manifest(index_dir, manifest):
+    path = os.path.join(index_dir, "manifest.json")
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def build_county_index(source_path, fylke, index_dir=INDEX_DIR, cell_size=DEFAULT_CELL_SIZE, type_column="bygningstype"):
+    """
+    Bulk-loads one county export into the local index.
+    Args:
+      source_path : downloaded bygningspunkt file for the county
+      fylke       : county number, e.g. "03"
+      index_dir   : root directory of the index
+      cell_size   : grid cell size (m)
+      type_column : column holding the building type code
+    Returns:
+      number of building points written.
+    """
+    import geopandas as gpd
+
+    gdf = gpd.read_file(source_path)
+    if gdf.crs is not None and gdf.crs.to_epsg() != 32633:
+        gdf = gdf.to_crs(epsg=32633)
+
+    codes = np.asarray(gdf[type_column].astype(str).str.extract(r"(\d+)")[0].fillna(999).astype(int))
+    geoms = gdf.geometry
+    if not (geoms.geom_type == "Point").all():
+        geoms = geoms.representative_point()
+    x = np.asarray(geoms.x, dtype=np.float64)
+    y = np.asarray(geoms.y, dtype=np.float64)
+
+    x0, y0 = np.floor(x.min() / cell_size) * cell_size, np.floor(y.min() / cell_size) * cell_size
+    nx = int((x.max() - x0) // cell_size) + 1
+    ny = int((y.max() - y0) // cell_size) + 1
+    cell = ((y - y0) // cell_size).astype(np.int64) * nx + ((x - x0) // cell_size).astype(np.int64)
+
+    order = np.argsort(cell, kind="stable")
+    cell = cell[order]
+    celle_start = np.searchsorted(cell, np.arange(nx * ny + 1)).astype(np.int64)
+
+    county_dir = os.path.join(index_dir, fylke)
+    os.makedirs(county_dir, exist_ok=True)
+    np.save(os.path.join(county_dir, "x.npy"), x[order])
+    np.save(os.path.join(county_dir, "y.npy"), y[order])
+    np.save(os.path.join(county_dir, "bygningstype.npy"), codes[order].astype(np.uint16))
+    np.save(os.path.join(county_dir, "kategori.npy"), category_codes(codes[order]))
+    np.save(os.path.join(county_dir, "celle_start.npy"), celle_start)
+
+    manifest = _read_manifest(index_dir)
+    manifest["fylker"][fylke] = {
+        "kilde": os.path.basename(source_path),
+        "antall": int(len(x)),
+        "bbox": [float(x.min()), float(y.min()), float(x.max()), float(y.max())],
+        "origo": [float(x0), float(y0)],
+        "celle_str": float(cell_size),
+        "nx": nx,
+        "ny": ny,
+    }
+    manifest["versjon"] = datetime.now().strftime("%Y%m%dT%H%M%S")
+    _write_manifest(index_dir, manifest)
+
+    _loaded.pop((index_dir, fylke), None)
+    return int(len(x))
+
+
+def _county_arrays(index_dir, fylke):
+    key = (index_dir, fylke)
+    if key not in _loaded:
+        county_dir = os.path.join(index_dir, fylke)
+        _loaded[key] = {
+            name: np.load(os.path.join(county_dir, f"{name}.npy"), mmap_mode="r") for name in _ARRAY_NAMES
+        }
+    return _loaded[key]
+
+
+def index_version(index_dir=INDEX_DIR):
+    """Returns the version stamp of the index (changes whenever a county is rebuilt)."""
+    return _read_manifest(index_dir).get("versjon")
+
+
+def query_bbox(bbox_tuple, index_dir=INDEX_DIR):
+    """
+    Finds all indexed building points inside a bounding box.
+    Args:
+      bbox_tuple : (minx, miny, maxx, maxy) in EPSG:32633
+    Returns:
+      dict with arrays "x", "y", "bygningstype", "kategori".
+    """
+    minx, miny, maxx, maxy = bbox_tuple
+    manifest = _read_manifest(index_dir)
+    parts = []
+
+    for fylke, meta in manifest["fylker"].items():
+        bminx, bminy, bmaxx, bmaxy = meta["bbox"]
+        if bminx > maxx or bmaxx < minx or bminy > maxy or bmaxy < miny:
+            continue
+
+        arrays = _county_arrays(index_dir, fylke)
+        x0, y0 = meta["origo"]
+        size, nx, ny = meta["celle_str"], meta["nx"], meta["ny"]
+        ix0 = max(int((minx - x0) // size), 0)
+        ix1 = min(int((maxx - x0) // size), nx - 1)
+        iy0 = max(int((miny - y0) // size), 0)
+        iy1 = min(int((maxy - y0) // size), ny - 1)
+        if ix0 > ix1 or iy0 > iy1:
+            continue
+
+        # One contiguous slice per row of cells
+        rows = np.arange(iy0, iy1 + 1) * nx
+        starts = arrays["celle_start"][rows + ix0]
+        stops = arrays["celle_start"][rows + ix1 + 1]
+        lengths = stops - starts
+        if lengths.sum() == 0:
+            continue
+        idx = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+
+        x = arrays["x"][idx]
+        y = arrays["y"][idx]
+        inside = (x >= minx) & (x <= maxx) & (y >= miny) & (y <= maxy)
+        idx = idx[inside]
+        parts.append({
+            "x": x[inside],
+            "y": y[inside],
+            "bygningstype": arrays["bygningstype"][idx],
+            "kategori": arrays["kategori"][idx],
+        })
+
+    if not parts:
+        return {
+            "x": np.empty(0), "y": np.empty(0),
+            "bygningstype": np.empty(0, dtype=np.uint16), "kategori": np.empty(0, dtype=np.uint8),
+        }
+    return {k: np.concatenate([p[k] for p in parts]) for k in parts[0]}
+
+
+def query_radius(x, y, radius, index_dir=INDEX_DIR):
+    """Finds all indexed building points within radius (m) of (x, y)."""
+    hits = query_bbox((x - radius, y - radius, x + radius, y + radius), index_dir)
+    keep = (hits["x"] - x) ** 2 + (hits["y"] - y) ** 2 <= radius ** 2
+    return {k: v[keep] for k, v in hits.items()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bygg lokal bygningsindeks fra en matrikkel-eksport.")
+    parser.add_argument("kilde", help="Nedlastet bygningspunkt-fil for fylket")
+    parser.add_argument("--fylke", required=True, help="Fylkesnummer, f.eks. 03")
+    parser.add_argument("--indeks", default=INDEX_DIR, help="Rotkatalog for indeksen")
+    parser.add_argument("--celle", type=float, default=DEFAULT_CELL_SIZE, help="Cellestørrelse i meter")
+    parser.add_argument("--kolonne", default="bygningstype", help="Kolonne med bygningstype")
+    args = parser.parse_args()
+
+    n = build_county_index(args.kilde, args.fylke, args.indeks, args.celle, args.kolonne)
+    print(f"Fylke {args.fylke}: {n} bygningspunkter indeksert i {args.indeks}")
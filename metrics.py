@@ -0,0 +1,293 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 23 13:20:54 2026
+Prosessfelles driftsmetrikker i Prometheus-tekstformat.
+
+Registeret samler responstid og feil mot Geonorge WFS og NVDB, kjøretid per
+side (rerun) og størrelsen på session state, i tillegg til cache-tallene fra
+area_cache. Metrikkene eksponeres på én av to måter, styrt av miljøvariabler:
+
+    FOXTROT_METRICS_PORT=9108            HTTP-endepunkt /metrics
+    FOXTROT_METRICS_FILE=/var/lib/node_exporter/foxtrot.prom
+                                         tekstfil for node_exporter (skrives hvert FOXTROT_METRICS_INTERVAL s)
+
+Uten noen av dem samles tallene bare i minnet.
+"""
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+METRICS_PORT = os.environ.get("FOXTROT_METRICS_PORT")
+METRICS_FILE = os.environ.get("FOXTROT_METRICS_FILE")
+METRICS_INTERVAL = float(os.environ.get("FOXTROT_METRICS_INTERVAL", 15))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_str(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        return tuple((k, labels.get(k, "")) for k in self.label_names)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def header(self):
+        # In text format 0.0.4 HELP and TYPE must name the sample, which ends in _total
+        name = f"{self.name}_total"
+        return [f"# HELP {name} {self.help}", f"# TYPE {name} {self.kind}"]
+
+    def inc(self, amount=1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [f"{self.name}_total{_label_str(k)} {v}" for k, v in self._values.items()]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, label_names=(), buckets=()):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for n, upper in enumerate(self.buckets):
+                if value <= upper:
+                    state[0][n] += 1
+            state[1] += value
+            state[2] += 1
+
+    def samples(self):
+        out = []
+        with self._lock:
+            for key, (counts, total, n) in self._values.items():
+                for upper, c in zip(self.buckets, counts):
+                    out.append(f"{self.name}_bucket{_label_str(key + (('le', repr(float(upper))),))} {c}")
+                out.append(f"{self.name}_bucket{_label_str(key + (('le', '+Inf'),))} {n}")
+                out.append(f"{self.name}_sum{_label_str(key)} {total}")
+                out.append(f"{self.name}_count{_label_str(key)} {n}")
+        return out
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, fn):
+        """fn() -> list of (name, kind, help, [(labels dict, value), ...]) evaluated at export time."""
+        with self._lock:
+            self._collectors.append(fn)
+
+    def render(self):
+        lines = []
+        with self._lock:
+            metrics, collectors = list(self._metrics), list(self._collectors)
+        for m in metrics:
+            lines += m.header() + m.samples()
+        for fn in collectors:
+            for name, kind, help_text, samples in fn():
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+                lines += [f"{name}{_label_str(sorted(labels.items()))} {value}" for labels, value in samples]
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+RERUN_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60)
+BYTES_BUCKETS = tuple(10.0 ** e for e in range(4, 11))
+
+UPSTREAM_SECONDS = REGISTRY.register(Histogram(
+    "foxtrot_upstream_request_seconds", "Responstid mot eksterne tjenester.", ("tjeneste", "status"), LATENCY_BUCKETS))
+UPSTREAM_ERRORS = REGISTRY.register(Counter(
+    "foxtrot_upstream_errors", "Feil mot eksterne tjenester.", ("tjeneste", "type")))
+UPSTREAM_BYTES = REGISTRY.register(Counter(
+    "foxtrot_upstream_bytes", "Bytes hentet fra eksterne tjenester.", ("tjeneste",)))
+RERUN_SECONDS = REGISTRY.register(Histogram(
+    "foxtrot_rerun_seconds", "Kjøretid for én kjøring av en side.", ("side",), RERUN_BUCKETS))
+# Labelled by page, not by session (a session label would grow without bound): the
+# histogram is the distribution over all runs of a page, from every session
+SESSION_STATE_BYTES = REGISTRY.register(Histogram(
+    "foxtrot_session_state_bytes",
+    "Omtrentlig størrelse på session state ved slutten av en kjøring, fordelt over alle sesjoner per side.",
+    ("side",), BYTES_BUCKETS))
+
+
+class _Call:
+    __slots__ = ("status", "bytes")
+
+    def __init__(self):
+        self.status = None
+        self.bytes = None
+
+
+@contextmanager
+def upstream(tjeneste):
+    """Times one request to an external service; set .status (and .bytes) on the yielded object."""
+    call = _Call()
+    t0 = time.perf_counter()
+    try:
+        yield call
+    except Exception as err:
+        UPSTREAM_ERRORS.inc(tjeneste=tjeneste, type=type(err).__name__)
+        raise
+    finally:
+        UPSTREAM_SECONDS.observe(time.perf_counter() - t0, tjeneste=tjeneste,
+                                 status=call.status if call.status is not None else "error")
+    if call.bytes:
+        UPSTREAM_BYTES.inc(call.bytes, tjeneste=tjeneste)
+    if call.status is not None and call.status >= 400:
+        UPSTREAM_ERRORS.inc(tjeneste=tjeneste, type=f"http_{call.status}")
+
+
+def _nbytes(obj):
+    memory_usage = getattr(obj, "memory_usage", None)
+    if memory_usage is not None:
+        try:
+            usage = memory_usage(deep=True)
+            return int(usage.sum()) if hasattr(usage, "sum") else int(usage)
+        except TypeError:
+            pass
+    nbytes = getattr(obj, "nbytes", None)
+    if isinstance(nbytes, int):
+        return nbytes
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(_nbytes(v) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sys.getsizeof(obj) + sum(_nbytes(v) for v in obj)
+    return sys.getsizeof(obj)
+
+
+def session_state_bytes(state):
+    """Approximate memory held by a session state (DataFrames counted deep)."""
+    return sum(_nbytes(state[k]) for k in list(state.keys()))
+
+
+class RerunTimer:
+    """
+    Context manager around pg.run() in streamlit_app.py; records duration and session
+    state size when the run ends, also when it ends in st.stop(), st.rerun(),
+    st.switch_page() or an error (Streamlit ends those runs by raising through pg.run()).
+    """
+
+    def __init__(self, side, state=None):
+        self.side = side
+        self.state = state
+        self._t0 = time.perf_counter()
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.done(self.state)
+        return False
+
+    def done(self, state=None):
+        RERUN_SECONDS.observe(time.perf_counter() - self._t0, side=self.side)
+        # Deep DataFrame sizing costs a little, so it is only done when metrics are exported
+        if state is not None and (METRICS_PORT or METRICS_FILE):
+            SESSION_STATE_BYTES.observe(session_state_bytes(state), side=self.side)
+
+
+def rerun_timer(side, state=None):
+    """with metrics.rerun_timer("1_Input", st.session_state): pg.run()"""
+    start_exporter()
+    return RerunTimer(side, state)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def write_textfile(path):
+    """Writes the registry atomically (write to a temporary file, then rename)."""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(REGISTRY.render())
+    os.replace(tmp, path)
+
+
+def _textfile_loop(path, interval):
+    while True:
+        try:
+            write_textfile(path)
+        except OSError as err:
+            print("Error writing metrics file:", err)
+        time.sleep(interval)
+
+
+_exporter_started = False
+_exporter_lock = threading.Lock()
+
+
+def start_exporter():
+    """Starts the HTTP endpoint and/or textfile writer configured by environment, once per process."""
+    global _exporter_started
+    if _exporter_started:
+        return
+    with _exporter_lock:
+        if _exporter_started:
+            return
+        _exporter_started = True
+        if METRICS_PORT:
+            try:
+                server = ThreadingHTTPServer(("0.0.0.0", int(METRICS_PORT)), _Handler)
+                server.daemon_threads = True
+                threading.Thread(target=server.serve_forever, daemon=True, name="metrics-http").start()
+            except OSError as err:
+                print("Error starting metrics endpoint:", err)
+        if METRICS_FILE:
+            threading.Thread(target=_textfile_loop, args=(METRICS_FILE, METRICS_INTERVAL),
+                             daemon=True, name="metrics-file").start()
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 13:27:50 2026
+Monte Carlo-analyse av usikkerhet i QRA-resultatene.
+
+NEI, TNT-ekvivalens, opphold og probitparametere trekkes tilfeldig, og blast- og
+risikokjeden regnes for hele batcher av trekk som arrays. Batchene fordeles på en
+prosesspool med reproduserbar seeding (én SeedSequence per oppgave). Resultatene
+samles i logaritmiske histogrammer, slik at minnebruken ikke vokser med antall trekk.
+
+Hver prosess summerer histogrammene for alle sine oppgaver og sender dem tilbake én
+gang, med uint32-tellinger og bare de binnene som har treff. Tellingene er heltall,
+så summen blir den samme uansett hvordan oppgavene fordeles på prosessene.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from blast_model import incident_pressure_array, incident_impulse_array
+from qra import PROBITS, DEFAULT_PROBIT, fatality_probability
+
+DEFAULT_USIKKERHET = {
+    "nei_sigma": 0.10,      # lognormal spread of the NEI estimate
+    "tnt_min": 0.8,         # TNT equivalence factor, uniform between min and max
+    "tnt_max": 1.2,
+    "opphold_sigma": 0.30,  # lognormal spread of presence factors (clipped to 1)
+    "probit_sd": 0.50,      # normal spread added to the probit value
+}
+
+
+class LogHistogram:
+    """
+    Running percentile estimator for many columns at once. Values are counted in
+    fixed log10 bins (plus one bin for values below lo, including zero); histograms
+    from different workers are merged by adding counts. Counts are uint32, so a
+    histogram holds at most 2^32 - 1 samples.
+    """
+
+    def __init__(self, n_columns, lo=-12.0, hi=2.0, width=0.05):
+        self.lo = lo
+        self.width = width
+        self.nbins = int(round((hi - lo) / width))
+        self.n = 0
+        self.counts = np.zeros((self.nbins + 1, n_columns), dtype=np.uint32)
+
+    def update(self, values):
+        """Adds a (samples, columns) block of values."""
+        values = np.asarray(values, dtype=float)
+        n_columns = self.counts.shape[1]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            k = np.floor((np.log10(values) - self.lo) / self.width)
+        k = np.where(np.isfinite(k), k, -1)  # zero and nan go to the underflow bin
+        k = np.clip(k, -1, self.nbins - 1).astype(np.int64) + 1
+        flat = (k * n_columns + np.arange(n_columns)[None, :]).ravel()
+        if flat.size:
+            # Count only over the span of flat indices hit, not the whole (bins, columns) table
+            base = flat.min()
+            hits = np.bincount(flat - base)
+            self.counts.reshape(-1)[base:base + hits.size] += hits.astype(np.uint32)
+        self.n += values.shape[0]
+
+    def merge(self, other):
+        self.counts += other.counts
+        self.n += other.n
+
+    def __getstate__(self):
+        # Only the rows (bins) with counts are pickled, e.g. when sent back from a worker
+        state = self.__dict__.copy()
+        rows = np.flatnonzero(self.counts.any(axis=1))
+        first, last = (int(rows[0]), int(rows[-1]) + 1) if rows.size else (0, 0)
+        state["counts"] = self.counts[first:last]
+        state["_rows"] = (first, self.counts.shape)
+        return state
+
+    def __setstate__(self, state):
+        first, shape = state.pop("_rows")
+        counts = np.zeros(shape, dtype=np.uint32)
+        counts[first:first + len(state["counts"])] = state["counts"]
+        state["counts"] = counts
+        self.__dict__.update(state)
+
+    def percentile(self, q):
+        """Estimated q-th percentile (0-100) per column; bin centres, 0 for the underflow bin."""
+        cum = np.cumsum(self.counts, axis=0)
+        k = np.argmax(cum >= np.ceil(q / 100 * self.n), axis=0)
+        centres = np.r_[0.0, 10 ** (self.lo + (np.arange(self.nbins) + 0.5) * self.width)]
+        return centres[k]
+
+
+_worker = {}
+
+
+def _init_worker(static):
+    _worker.update(static)
+
+
+def _run_task(seed_seq, n_samples, ir_hist, agg_hist):
+    """Evaluates n_samples draws in memory-bounded batches into the two histograms."""
+    w = _worker
+    rng = np.random.default_rng(seed_seq)
+    D, opphold, personer, u = w["D"], w["opphold"], w["personer"], w["usikkerhet"]
+    batch = max(1, w["max_elements"] // max(len(D), 1))
+
+    for start in range(0, n_samples, batch):
+        n = min(batch, n_samples - start)
+        nei = w["NEI"] * rng.lognormal(0.0, u["nei_sigma"], n) * rng.uniform(u["tnt_min"], u["tnt_max"], n)
+        occ = rng.lognormal(0.0, u["opphold_sigma"], n)
+        shift = rng.normal(0.0, u["probit_sd"], n)
+
+        Ps = incident_pressure_array(D[None, :], nei[:, None]) * 1000
+        i = incident_impulse_array(D[None, :], nei[:, None])
+        p = fatality_probability(Ps, i, w["probit"], shift=shift[:, None])
+        presence = np.minimum(opphold[None, :] * occ[:, None], 1.0)
+
+        ir = w["frekvens"] * p * presence
+        ir_hist.update(ir)
+        agg_hist.update(np.column_stack([(p * presence) @ personer * w["frekvens"], ir.max(axis=1)]))
+
+
+def _run_tasks(tasks):
+    """Runs (seed, n_samples) tasks in turn and returns their summed histograms."""
+    ir_hist = LogHistogram(len(_worker["D"]))
+    agg_hist = LogHistogram(2)  # PLL, max IR
+    for seed_seq, n in tasks:
+        _run_task(seed_seq, n, ir_hist, agg_hist)
+    return ir_hist, agg_hist
+
+
+def run_monte_carlo(D, opphold, personer, NEI, frekvens, probit=DEFAULT_PROBIT, n_samples=10_000,
+                    usikkerhet=None, seed=12345, workers=None, max_elements=2_000_000):
+    """
+    Monte Carlo propagation of input uncertainty through the QRA.
+    Args:
+      D         : (B,) distances (m) to the selected buildings
+      opphold   : (B,) presence factors
+      personer  : (B,) persons per building
+      NEI, frekvens, probit : central values as for run_qra
+      n_samples : number of Monte Carlo draws
+      usikkerhet: overrides for DEFAULT_USIKKERHET
+      seed      : master seed; the same seed and n_samples give the same result for any worker count
+      workers   : process count (None = all cores, 1 = run in this process)
+    Returns:
+      (ir_hist, agg_hist) LogHistograms; agg_hist columns are PLL and max IR.
+    """
+    static = {
+        "D": np.asarray(D, dtype=float),
+        "opphold": np.asarray(opphold, dtype=float),
+        "personer": np.asarray(personer, dtype=float),
+        "NEI": float(NEI),
+        "frekvens": float(frekvens),
+        "probit": PROBITS[probit] if isinstance(probit, str) else probit,
+        "usikkerhet": {**DEFAULT_USIKKERHET, **(usikkerhet or {})},
+        "max_elements": max_elements,
+    }
+    workers = workers or os.cpu_count() or 1
+
+    # Task split depends only on n_samples, so results do not depend on the worker count
+    n_tasks = min(n_samples, 64)
+    sizes = np.full(n_tasks, n_samples // n_tasks)
+    sizes[:n_samples % n_tasks] += 1
+    tasks = [(s, int(n)) for s, n in zip(np.random.SeedSequence(seed).spawn(n_tasks), sizes)]
+
+    if workers == 1:
+        _init_worker(static)
+        return _run_tasks(tasks)
+
+    # One job per process, so each process returns its histograms once instead of per task
+    workers = min(workers, n_tasks)
+    jobs = [tasks[i::workers] for i in range(workers)]
+    ir_hist = LogHistogram(len(static["D"]))
+    agg_hist = LogHistogram(2)
+    # spawn: the Streamlit server has prefetch, cache and metrics threads running, which
+    # fork does not handle safely
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_init_worker, initargs=(static,)) as pool:
+        futures = [pool.submit(_run_tasks, job) for job in jobs]
+        for fut in as_completed(futures):
+            a, b = fut.result()
+            ir_hist.merge(a)
+            agg_hist.merge(b)
+    return ir_hist, agg_hist
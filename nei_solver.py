@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Oct 21 11:18:09 2026
+Største tillatte NEI for et anlegg gitt eksponerte bygninger.
+
+Avstandene sorteres én gang per kategori. Antall brudd for en NEI er da et
+binærsøk (searchsorted) mot QD for kategorien, og både kurven over alle NEI og
+den største NEI med høyst k brudd finnes uten å hente eller regne på nytt.
+"""
+import numpy as np
+import pandas as pd
+
+from qd_rules import QD_array, MAX_NEI, KATEGORI_RING, DEFAULT_FAREGRUPPE
+
+
+class ViolationCounter:
+    """Counts QD violations for any NEI from distances sorted once per category."""
+
+    def __init__(self, avstand, kategori, faregruppe=DEFAULT_FAREGRUPPE):
+        avstand = np.asarray(avstand, dtype=float)
+        kategori = np.asarray(kategori)
+        self.faregruppe = faregruppe
+        self.sorted = {cat: np.sort(avstand[kategori == cat]) for cat in KATEGORI_RING}
+
+    def per_category(self, NEI):
+        """{kategori: violations} for an array of NEI values (buildings closer than QD)."""
+        QD = QD_array(NEI, self.faregruppe)
+        return {cat: np.searchsorted(d, QD[KATEGORI_RING[cat]], side="left") for cat, d in self.sorted.items()}
+
+    def total(self, NEI):
+        return sum(self.per_category(NEI).values())
+
+
+def violation_curve(avstand, kategori, nei_values=None, faregruppe=DEFAULT_FAREGRUPPE):
+    """
+    Violations versus NEI in one call.
+    Returns:
+      DataFrame indexed by NEI with one column per category and "totalt".
+    """
+    if nei_values is None:
+        nei_values = np.unique(np.round(np.geomspace(1, MAX_NEI, 400)))
+    nei_values = np.asarray(nei_values, dtype=float)
+    counts = ViolationCounter(avstand, kategori, faregruppe).per_category(nei_values)
+    df = pd.DataFrame(counts, index=pd.Index(nei_values, name="NEI"))
+    df["totalt"] = df.sum(axis=1)
+    return df
+
+
+def max_permissible_nei(avstand, kategori, k=0, nei_min=1, nei_max=MAX_NEI, faregruppe=DEFAULT_FAREGRUPPE):
+    """
+    Largest integer NEI in [nei_min, nei_max] with at most k violations.
+    Returns None if even nei_min gives more than k violations.
+    """
+    counter = ViolationCounter(avstand, kategori, faregruppe)
+    if counter.total(nei_min) > k:
+        return None
+    if counter.total(nei_max) <= k:
+        return int(nei_max)
+
+    lo, hi = int(nei_min), int(nei_max)  # total(lo) <= k < total(hi)
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if counter.total(mid) <= k:
+            lo = mid
+        else:
+            hi = mid
+    return lo
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 15:40:12 2026
+Tidsprofiler for opphold per bygningsgruppe (24 timer for hverdag og helg).
+
+Skoler er i bruk på dagtid og boliger om natten, så én oppholdsfaktor gir feil
+risikobilde. Risikoen regnes som en bygninger x tidsluker-matrise i én
+vektorisert operasjon.
+"""
+import numpy as np
+import pandas as pd
+
+# Building type code prefixes per profile group; the longest matching prefix wins
+PROFIL_GRUPPER = {
+    "bolig": ["1"],
+    "barnehage/skole": ["61"],
+    "høyere utdanning": ["62"],
+    "kultur/idrett/religion": ["64", "65", "66", "67"],
+    "kontor/forretning": ["3"],
+    "hotell/restaurant": ["5"],
+    "helse": ["7"],
+    "industri/lager": ["2", "4"],
+    "annet": [],
+}
+DAGTYPER = {"hverdag": 5 / 7, "helg": 2 / 7}  # share of the week
+TIMER = [f"{h:02d}" for h in range(24)]
+
+
+def _profile(inside_hours, inside, outside):
+    arr = np.full(24, outside, dtype=float)
+    for start, stop in inside_hours:
+        arr[start:stop] = inside
+    return arr
+
+
+def default_profiles():
+    """Default presence profiles: {"hverdag": DataFrame, "helg": DataFrame}, groups x hours."""
+    hverdag = {
+        "bolig": np.r_[np.full(7, 0.95), np.full(9, 0.3), np.full(8, 0.8)],
+        "barnehage/skole": _profile([(8, 16)], 0.9, 0.0),
+        "høyere utdanning": _profile([(8, 18)], 0.7, 0.02),
+        "kultur/idrett/religion": _profile([(17, 22)], 0.6, 0.05),
+        "kontor/forretning": _profile([(8, 17)], 0.85, 0.02) + _profile([(17, 20)], 0.3, 0.0),
+        "hotell/restaurant": _profile([(0, 8), (22, 24)], 0.8, 0.4),
+        "helse": _profile([], 0.0, 0.9),
+        "industri/lager": _profile([(7, 16)], 0.8, 0.1),
+        "annet": _profile([], 0.0, 0.25),
+    }
+    helg = {
+        "bolig": np.r_[np.full(9, 0.95), np.full(13, 0.6), np.full(2, 0.95)],
+        "barnehage/skole": _profile([], 0.0, 0.02),
+        "høyere utdanning": _profile([], 0.0, 0.05),
+        "kultur/idrett/religion": _profile([(11, 22)], 0.5, 0.05),
+        "kontor/forretning": _profile([(10, 18)], 0.3, 0.02),
+        "hotell/restaurant": _profile([(0, 10), (22, 24)], 0.9, 0.5),
+        "helse": _profile([], 0.0, 0.9),
+        "industri/lager": _profile([], 0.0, 0.1),
+        "annet": _profile([], 0.0, 0.25),
+    }
+    return {
+        "hverdag": pd.DataFrame.from_dict(hverdag, orient="index", columns=TIMER),
+        "helg": pd.DataFrame.from_dict(helg, orient="index", columns=TIMER),
+    }
+
+
+def profile_groups(bygningstype):
+    """Index into PROFIL_GRUPPER for each building type code."""
+    names = list(PROFIL_GRUPPER)
+    prefixes = sorted(((p, g) for g, name in enumerate(names) for p in PROFIL_GRUPPER[name]), key=lambda t: -len(t[0]))
+
+    codes = pd.Series(bygningstype).astype(str).to_numpy()
+    uniq, inverse = np.unique(codes, return_inverse=True)
+    group = np.full(len(uniq), names.index("annet"))
+    for n, code in enumerate(uniq):  # once per distinct code, not per building
+        for prefix, g in prefixes:
+            if code.startswith(prefix):
+                group[n] = g
+                break
+    return group[inverse]
+
+
+def profile_matrix(profiles):
+    """(groups, slots) presence matrix, slot weights summing to 1, and slot labels."""
+    names = list(PROFIL_GRUPPER)
+    P = np.hstack([profiles[d].reindex(names).fillna(0).to_numpy(dtype=float) for d in DAGTYPER])
+    weights = np.concatenate([np.full(24, share / 24) for share in DAGTYPER.values()])
+    labels = [f"{d} {h}:00" for d in DAGTYPER for h in TIMER]
+    return P, weights, labels
+
+
+def average_presence(bygningstype, profiles):
+    """(B,) time-averaged presence per building from the profiles."""
+    P, weights, _ = profile_matrix(profiles)
+    return np.minimum(P, 1.0)[profile_groups(bygningstype)] @ weights
+
+
+def time_profile_risk(p_dod, personer, bygningstype, profiles, frekvens):
+    """
+    Risk over the hours of the week.
+    Args:
+      p_dod        : (B,) probability of fatality given an explosion
+      personer     : (B,) persons per building
+      bygningstype : (B,) building type codes
+      profiles     : {"hverdag": DataFrame, "helg": DataFrame} as from default_profiles
+      frekvens     : explosion frequency (per year)
+    Returns:
+      dict with
+        "presence"   : (B, slots) presence matrix
+        "N_per_slot" : (slots,) expected fatalities if the explosion happens in that slot
+        "labels"     : slot labels
+        "opphold"    : (B,) time-averaged presence
+        "IR"         : (B,) individual risk with time-averaged presence
+        "N_peak", "N_mean", "worst_slot"
+    """
+    P, weights, labels = profile_matrix(profiles)
+    presence = np.minimum(P[profile_groups(bygningstype)], 1.0)  # (B, slots) in one gather
+    exposed = np.asarray(p_dod, dtype=float) * np.asarray(personer, dtype=float)
+    N_per_slot = exposed @ presence
+    opphold = presence @ weights
+    worst = int(np.argmax(N_per_slot)) if len(N_per_slot) else 0
+    return {
+        "presence": presence,
+        "N_per_slot": N_per_slot,
+        "labels": labels,
+        "opphold": opphold,
+        "IR": frekvens * np.asarray(p_dod, dtype=float) * opphold,
+        "N_peak": float(N_per_slot[worst]) if len(N_per_slot) else 0.0,
+        "N_mean": float(N_per_slot @ weights),
+        "worst_slot": labels[worst],
+    }
@@ -5,25 +5,22 @@ Created on Tue Jan 20 13:32:09 2026
 @author: KRHE
 """
 
+# Only light modules at the top: geopandas, folium, pyproj and the fetchers are imported
+# where they are first needed, and are usually already loaded by the warm-up in
+# streamlit_app.py (see warmup.py)
 import streamlit as st
-import geopandas as gpd
-import pandas as pd
-import folium
-from pyproj import Transformer
-from streamlit_folium import st_folium
-from get_matrikkel_data import get_matrikkel_data
-
-# --- IMPORT DICTIONARY ---
-try:
-    from bygningskoder import MATRIKKEL_BYGNINGSTYPE
-except ImportError:
-    st.error("Kunne ikke finne 'bygningskoder.py'. Sjekk filnavn og plassering.")
-    MATRIKKEL_BYGNINGSTYPE = {} # Fallback to prevent crash
-
+from prefetch import start_prefetch, buildings_future, roads_future
+from qd_rules import (QD_func, FAREGRUPPER, DEFAULT_FAREGRUPPE, MAX_NEI, inside_qd, violation_counts,
+                      unverified_warning)
+from pressure_overlay import pressure_overlay, TRYKK_NIVAER
+from map_layers import plot_matrikkel_on_map, create_qd_buffer
+from compact import compact_buildings
+import timing
 
+timing.start_run("1_Input")
 # --- 1. INITIALIZATION OF SESSION STATE ---
 keys_to_init = [
-    "exp_buildings_gdf", "gdf_anlegg", 
+    "exp_buildings_gdf", "veg_gdf", "gdf_anlegg", 
     "gdf_syk", "gdf_bolig", "gdf_vei", 
     "GISanalysis_complete", 
     "last_calc_inputs"
@@ -38,101 +35,102 @@ for key in keys_to_init:
 
 # --- 2. HELPER FUNCTIONS ---
 def epsg32633_to_latlon(x, y):
+    from pyproj import Transformer
     transformer = Transformer.from_crs("EPSG:32633", "EPSG:4326", always_xy=True)
     lon, lat = transformer.transform(x, y)
     return lat, lon
 
-def QD_func(NEI):
-    QD_syk = max(round(44.4 * NEI ** (1/3)), 800)
-    QD_bolig = max(round(22.2 * NEI ** (1/3)), 400)
-    QD_vei = max(round(14.8 * NEI ** (1/3)), 180)
-    return QD_syk, QD_bolig, QD_vei
-
-def classify_buildings(gdf):
+def fetch_progressive(bbox_tuple, center, QD, radius, backend):
     """
-    Classifies buildings using the MATRIKKEL_BYGNINGSTYPE dictionary.
-    Assigns colors: Purple (skjermingsverdig), Red (sårbar), etc.
+    Fetches buildings tile by tile, nearest the facility first, and shows running QD
+    violation counts and the violating buildings found so far after each tile.
+    Returns the same buildings as buildings_future(...).result() clipped to radius.
     """
-    # 1. Ensure the building code column is a string
-    gdf["bygningstype"] = gdf["bygningstype"].astype(str)
-
-    # 2. Convert the dictionary to a DataFrame for efficient merging
-    # Expected Dict structure: "111": ("Enebolig", "bolig")
-    ref_df = pd.DataFrame.from_dict(
-        MATRIKKEL_BYGNINGSTYPE, 
-        orient='index', 
-        columns=['Beskrivelse', 'Kategori']
-    )
-
-    # 3. Merge the lookup data into the results
-    gdf = gdf.merge(
-        ref_df,
-        left_on="bygningstype",
-        right_index=True,
-        how="left"
-    )
+    import numpy as np
+    import pandas as pd
+    import geopandas as gpd
+    from area_cache import iter_buildings
+    from get_matrikkel_data import clip_to_circle
 
-    # 4. Define Logic to assign Category (with fallback)
-    def assign_category(row):
-        # If found in dictionary, use that
-        if pd.notna(row["Kategori"]):
-            return row["Kategori"]
-        
-        # Fallback if code is new/unknown: Guess type based on first digit
-        code = str(row["bygningstype"])
-        first_digit = code[0]
-        
-        if first_digit == "1": return "bolig"
-        if first_digit in ["5", "6", "7", "8"]: return "sårbar"
-        return "vei/industri" # Default fallback
+    progress = st.progress(0.0, text="Henter nærmeste fliser...")
+    counts_box = st.empty()
+    table_box = st.empty()
+    cx, cy = center
+    parts, inside_parts = [], []
+    counts = dict.fromkeys(["sårbar", "bolig", "vei/industri", "skjermingsverdig"], 0)
 
-    gdf["kategori"] = gdf.apply(assign_category, axis=1)
+    for done, total, part in iter_buildings(bbox_tuple, center, radius=radius, backend=backend):
+        progress.progress(done / total, text=f"Fliser ferdig: {done} av {total}")
+        part = clip_to_circle(part, center, radius)
+        if part is None or part.empty:
+            continue
+        parts.append(part)
+        avstand = np.hypot(part.geometry.x.to_numpy() - cx, part.geometry.y.to_numpy() - cy)
+        kategori = part["kategori"].to_numpy()
+        for kat, n in violation_counts(avstand, kategori, QD).items():
+            counts[kat] += n
+        inside = inside_qd(avstand, kategori, QD)
+        if inside.any():
+            inside_parts.append(pd.DataFrame({
+                "bygningstype": part["bygningstype"].to_numpy()[inside],
+                "kategori": kategori[inside],
+                "avstand_meter": avstand[inside],
+            }))
 
-    # 5. Assign Colors
-    color_map = {
-        "sårbar": "red",
-        "bolig": "orange",
-        "vei/industri": "black",
-        "skjermingsverdig": "purple",
-        "ingen beskyttelse": "#79DAD6"
-    }
-    
-    # Map the color, defaulting to 'black' if category is somehow unknown
-    gdf["color"] = gdf["kategori"].map(color_map).fillna("black")
+        with counts_box.container():
+            cols = st.columns(4)
+            for col, (kat, n) in zip(cols, counts.items()):
+                col.metric(f"{kat} innenfor QD" if kat != "skjermingsverdig" else "skjermingsverdig innenfor QD_syk", n)
+        if inside_parts:
+            table_box.dataframe(
+                pd.concat(inside_parts, ignore_index=True).sort_values("avstand_meter"),
+                width="stretch",
+                hide_index=True,
+                column_config={"avstand_meter": st.column_config.NumberColumn("Avstand (m)", format="%.1f m")},
+            )
 
-      
-    return gdf
+    progress.empty()
+    if not parts:
+        return gpd.GeoDataFrame()
+    return gpd.GeoDataFrame(pd.concat(parts, ignore_index=True), crs=parts[0].crs)
 
-def create_qd_buffer(gdf, qd_value, pressure_label):
-    out = gdf.copy().drop(columns=["nordUTM33", "oestUTM33"])
-    out["QD"] = qd_value
-    out["trykk"] = pressure_label
-    out["geometry"] = out.geometry.buffer(qd_value)
-    return out
+# --- 3. INPUT FORM ---
+# Location is entered outside the form so that a prefetch can start as soon as
+# plausible coordinates exist, while the user is still filling in the rest.
+st.write("Input")
 
-def plot_matrikkel_on_map(gdf, m):
-    if gdf is None or gdf.empty:
-        return m
-    categories = gdf["kategori"].unique()
-    for cat in categories:
-        subset = gdf[gdf["kategori"] == cat]
-        color = subset["color"].iloc[0]
-        subset = subset.drop(columns=["color", "kategori", "typekode"], errors="ignore")
-        subset.explore(
-            m=m,
-            name=f"Bygg – {cat}",
-            marker_type="circle",
-            style_kwds=dict(color=color, fillColor=color, fillOpacity=1, radius=5),
-        )
-    return m
+clicked = st.session_state.get("input_coordinates") or {}
+nordUTM33 = st.number_input('Nord / Y', value=clicked.get("nordUTM33"), placeholder='UTM33N EPSG:32633')
+oestUTM33 = st.number_input('Øst / X', value=clicked.get("oestUTM33"), placeholder='UTM33N EPSG:32633')
+datakilde = st.radio(
+    'Datakilde',
+    options=["wfs", "lokal"],
+    format_func=lambda k: {"wfs": "Geonorge WFS", "lokal": "Lokal indeks"}[k],
+    horizontal=True,
+)
+start_prefetch(oestUTM33, nordUTM33, backend=datakilde)
 
-# --- 3. INPUT FORM ---
 with st.form("my_form"):
-    st.write("Input")
-
-    nordUTM33 = st.number_input('Nord / Y', value=None, placeholder='UTM33N EPSG:32633')
-    oestUTM33 = st.number_input('Øst / X', value=None, placeholder='UTM33N EPSG:32633')
-    NEI = st.number_input('Totalvekt', step=1, min_value=1, max_value=100000)
+    NEI = st.number_input('Totalvekt', step=1, min_value=1, max_value=MAX_NEI)
+    faregruppe = st.selectbox(
+        'Faregruppe (HD)', options=FAREGRUPPER, index=FAREGRUPPER.index(DEFAULT_FAREGRUPPE),
+        help="Bestemmer hvilke QD-regler som brukes, se qd_rules.py."
+    )
+    if unverified_warning(faregruppe):
+        st.warning(unverified_warning(faregruppe))
+    margin = st.number_input(
+        'Margin utenfor QD_syk (m)', value=0, step=50, min_value=0, max_value=5000,
+        help="Bygninger lenger unna enn QD_syk + margin fjernes før videre analyse."
+    )
+    progressiv = st.checkbox(
+        'Vis resultater fortløpende', value=False,
+        help="Henter flis for flis, nærmest anlegget først, og viser QD-brudd etter hvert som flisene blir ferdige."
+    )
+    kompakt = st.checkbox(
+        'Kompakt lagring', value=False,
+        help="Lagrer bygningene med koordinat-arrays, kategorikolonner og float32 avstand/trykk "
+             "(flere ganger mindre minne for store analyser, se compact.py)."
+    )
    
     submitted = st.form_submit_button("Submit")
    
@@ -154,16 +152,24 @@ with st.form("my_form"):
             st.session_state["last_calc_inputs"] = {
                 "nord": nordUTM33,
                 "oest": oestUTM33,
-                "nei": NEI
+                "nei": NEI,
+                "faregruppe": faregruppe,
+                "margin": margin,
+                "datakilde": datakilde,
+                "kompakt": kompakt
             }
             
+            import pandas as pd
+            import geopandas as gpd
+            from get_matrikkel_data import clip_to_circle
+            
             # 2. Process Data
             d = {'nordUTM33':[nordUTM33],'oestUTM33':[oestUTM33],'NEI':[NEI]}
             df = pd.DataFrame(data=d)
             gdf_anlegg = gpd.GeoDataFrame(df, geometry=gpd.points_from_xy(df.oestUTM33,df.nordUTM33),crs='EPSG:32633')
             
             # 3. Calculate Buffers
-            QD_syk, QD_bolig, QD_vei = QD_func(NEI)
+            QD_syk, QD_bolig, QD_vei = QD_func(NEI, faregruppe)
             gdf_syk   = create_qd_buffer(gdf_anlegg, QD_syk,   "2 kPa")
             gdf_bolig = create_qd_buffer(gdf_anlegg, QD_bolig, "5 kPa")
             gdf_vei   = create_qd_buffer(gdf_anlegg, QD_vei,   "9 kPa")
@@ -171,15 +177,32 @@ with st.form("my_form"):
             # 4. API Call
             gdf_syk_bbox = pd.concat([gdf_syk, gdf_syk['geometry'].bounds], axis=1)
             row = gdf_syk_bbox.iloc[0]
-            bbox_tuple = (row["minx"], row["miny"], row["maxx"], row["maxy"])
+            bbox_tuple = (row["minx"] - margin, row["miny"] - margin, row["maxx"] + margin, row["maxy"] + margin)
+            
+            # Start roads first so both requests run concurrently; either may already be prefetched
+            veg_future = roads_future(bbox_tuple)
+            if progressiv:
+                with timing.span("buildings_progressive") as sp:
+                    exp_buildings_gdf = fetch_progressive(
+                        bbox_tuple, (oestUTM33, nordUTM33), (QD_syk, QD_bolig, QD_vei), QD_syk + margin, datakilde
+                    )
+                    sp.rows_out = len(exp_buildings_gdf)
+            else:
+                with timing.span("buildings_wait") as sp:
+                    exp_buildings_gdf = buildings_future(bbox_tuple, backend=datakilde).result()
+                    sp.rows_out = len(exp_buildings_gdf)
             
-            exp_buildings_gdf = get_matrikkel_data(bbox_tuple) 
+            # Drop everything outside the QD_syk circle (+ margin) before any further work
+            with timing.span("clip", rows_in=len(exp_buildings_gdf)) as sp:
+                exp_buildings_gdf = clip_to_circle(exp_buildings_gdf, (oestUTM33, nordUTM33), QD_syk, margin)
+                sp.rows_out = len(exp_buildings_gdf)
             
             # --- HANDLE NO RESULTS ---            
             if exp_buildings_gdf.empty:
                 st.warning('Ingen bygninger eksponert :sunglasses:')
                 # Build Map
-                
+                import folium
+                from streamlit_folium import st_folium
                 
                 m = gdf_anlegg.explore(
                     marker_type=folium.Marker(icon=folium.Icon(color='blue', icon='bomb', prefix='fa')),
@@ -194,10 +217,11 @@ with st.form("my_form"):
                 st_folium(m, width="stretch", zoom=13, key="map_noobjects", returned_objects=[])
                 st.stop()
                 
-            # --- APPLY CLASSIFICATION ---
+            # Buildings come back already classified ('kategori' and 'color' based on bygningskoder.py)
+            # from the shared tile cache, see area_cache.py
             
-            exp_buildings_gdf = exp_buildings_gdf[["bygningstype", "geometry"]]
-            exp_buildings_gdf = classify_buildings(exp_buildings_gdf) # This adds 'kategori' and 'color' based on bygningskoder.py
+            if kompakt:
+                exp_buildings_gdf = compact_buildings(exp_buildings_gdf)
             
             # 5. STORE PROCESSED DATA
             st.session_state["gdf_anlegg"] = gdf_anlegg
@@ -205,6 +229,16 @@ with st.form("my_form"):
             st.session_state["gdf_bolig"] = gdf_bolig
             st.session_state["gdf_vei"] = gdf_vei
             st.session_state["exp_buildings_gdf"] = exp_buildings_gdf
+            from get_veg_data import AvkortetSvar
+            with timing.span("roads_wait"):
+                try:
+                    st.session_state["veg_gdf"] = veg_future.result()
+                    st.session_state["veg_advarsel"] = None
+                except AvkortetSvar as err:
+                    # Better no roads than a silently incomplete road layer
+                    from geopandas import GeoDataFrame
+                    st.session_state["veg_gdf"] = GeoDataFrame()
+                    st.session_state["veg_advarsel"] = f"Vegdata fra NVDB er utelatt: {err}"
             
             # 6. Flag Analysis as Complete
             st.session_state["gdf_calculated"] = None
@@ -212,6 +246,8 @@ with st.form("my_form"):
 
 # --- 4. RENDER OUTPUT ---
 if st.session_state["GISanalysis_complete"]:
+    import folium
+    from streamlit_folium import st_folium
     
     st.divider()
     st.subheader("Resultat")
@@ -220,7 +256,15 @@ if st.session_state["GISanalysis_complete"]:
     inputs = st.session_state["last_calc_inputs"]
     if inputs:
         st.info(f"**Valgte verdier:** Nord: {inputs['nord']}, Øst: {inputs['oest']}, Totalvekt: {inputs['nei']} kg")
+    if st.session_state.get("veg_advarsel"):
+        st.warning(st.session_state["veg_advarsel"])
         
+    vis_trykk = st.checkbox(
+        "Vis trykkfelt", value=False,
+        help="Innfallende overtrykk rundt anlegget som fargelagt bilde. Bånd fra "
+             + ", ".join(f"{p} kPa" for p in TRYKK_NIVAER) + "; under laveste bånd er gjennomsiktig."
+    )
+    
     with st.spinner("Tegner kart...", show_time=True):
         # --- RE-GENERATE MAP FROM SAVED DATA ---
         gdf_anlegg = st.session_state["gdf_anlegg"]
@@ -230,31 +274,39 @@ if st.session_state["GISanalysis_complete"]:
         exp_buildings = st.session_state["exp_buildings_gdf"]
     
         # Build Map
-        m = gdf_anlegg.explore(
-            marker_type=folium.Marker(icon=folium.Icon(color='blue', icon='bomb', prefix='fa')),
-            name='anlegg',
-            control=False
-        )
-        
-        gdf_syk.explore(m=m, style_kwds=dict(fill=False, color='red'), name='QDsyk', control=False)
-        gdf_bolig.explore(m=m, style_kwds=dict(fill=False, color='orange'), name='QDbolig', control=False)
-        gdf_vei.explore(m=m, style_kwds=dict(fill=False, color='black'), name='QDvei', control=False)
-        
-        m = plot_matrikkel_on_map(exp_buildings, m)
-        folium.LayerControl().add_to(m)
+        with timing.span("map_build", rows_in=len(exp_buildings)):
+            m = gdf_anlegg.explore(
+                marker_type=folium.Marker(icon=folium.Icon(color='blue', icon='bomb', prefix='fa')),
+                name='anlegg',
+                control=False
+            )
+            
+            gdf_syk.explore(m=m, style_kwds=dict(fill=False, color='red'), name='QDsyk', control=False)
+            gdf_bolig.explore(m=m, style_kwds=dict(fill=False, color='orange'), name='QDbolig', control=False)
+            gdf_vei.explore(m=m, style_kwds=dict(fill=False, color='black'), name='QDvei', control=False)
+            
+            if vis_trykk:
+                anlegg = gdf_anlegg.geometry.iloc[0]
+                pressure_overlay(anlegg.x, anlegg.y, inputs["nei"], gdf_syk["QD"].iloc[0] + inputs["margin"]).add_to(m)
+            
+            m = plot_matrikkel_on_map(exp_buildings, m)
+            folium.LayerControl().add_to(m)
     
         # Render Map
-        st_folium(
-            m, 
-            width="stretch", 
-            zoom=13, 
-            key="map_1",
-            returned_objects=[]
-        )
+        with timing.span("st_folium"):
+            st_folium(
+                m, 
+                width="stretch", 
+                zoom=13, 
+                key="map_1",
+                returned_objects=[]
+            )
         
         st.page_link(
-            "pages/2_QD_analyse.py", 
+            "pages/2_QD_Analyse.py", 
             label="Gå til side for analyse av utsatte objekter og QD", 
             icon=":material/calculate:", 
             width="stretch"
         )
+
+timing.render_panel()
@@ -1,31 +1,35 @@
+import os
 import streamlit as st
-import geopandas as gpd
 import pandas as pd
 import numpy as np
-from blast_model import incident_pressure
+from blast_model import incident_pressure_array
+from road_exposure import road_exposure
+import altair as alt
+from nei_solver import max_permissible_nei, violation_curve
+from qd_rules import QD_func, MAX_RADIUS, DEFAULT_FAREGRUPPE, unverified_warning
+from compact import is_compact, point_xy, compact_buildings
+from terrain import (terrain_screening, shielded_pressure, available_dems, dem_path, DEM_PATH,
+                     DEFAULT_REDUKSJON, DEFAULT_LADNINGSHOYDE, DEFAULT_BYGNINGSHOYDE)
+import timing
 
 # --- 1. SETUP & STATE CHECK ---
 st.set_page_config(page_title="Analyse av objekter", page_icon=":material/analytics:")
-
+timing.start_run("2_QD_Analyse")
 if "GISanalysis_complete" not in st.session_state or not st.session_state["GISanalysis_complete"]:
     st.warning("Ingen data funnet. Vennligst gå tilbake til hovedsiden og kjør analysen først.")
-    st.page_link("streamlit_app.py", label="Gå til hovedside", icon=":material/home:") 
+    st.page_link("Hjem.py", label="Gå til hovedside", icon=":material/home:") 
     st.stop()
 
 # --- 2. RETRIEVE INPUTS ---
 gdf_anlegg = st.session_state["gdf_anlegg"]
 inputs = st.session_state["last_calc_inputs"]
 NEI = inputs["nei"]
+faregruppe = inputs.get("faregruppe", DEFAULT_FAREGRUPPE)
 
-# --- 3. HELPER FUNCTION (QD Limits) ---
-def QD_func(NEI):
-    """Calculates regulatory safety distances."""
-    QD_syk = max(round(44.4 * NEI ** (1/3)), 800)
-    QD_bolig = max(round(22.2 * NEI ** (1/3)), 400)
-    QD_vei = max(round(14.8 * NEI ** (1/3)), 180)
-    return QD_syk, QD_bolig, QD_vei
-
-QD_syk, QD_bolig, QD_vei = QD_func(NEI)
+# --- 3. QD LIMITS (shared rule table, see qd_rules.py) ---
+QD_syk, QD_bolig, QD_vei = QD_func(NEI, faregruppe)
+if unverified_warning(faregruppe):
+    st.warning(unverified_warning(faregruppe))
 
 # --- 4. CALCULATIONS (PERFORM ONCE & PERSIST) ---
 # We check if 'gdf_calculated' exists. If not, we perform the heavy math and save it.
@@ -36,14 +40,19 @@ if "gdf_calculated" not in st.session_state or st.session_state["gdf_calculated"
     
     # A. Calculate Distance (Geometry)
     anlegg_point = gdf_anlegg.geometry.iloc[0]
-    df_calc["avstand_meter"] = df_calc.geometry.distance(anlegg_point)
+    with timing.span("distance", rows_in=len(df_calc)):
+        bx, by = point_xy(df_calc)  # works for both GeoDataFrame and compact tables
+        df_calc["avstand_meter"] = np.hypot(bx - anlegg_point.x, by - anlegg_point.y)
     
     # B. Calculate Blast Overpressure (Physics Model)
     # This is the "expensive" operation we want to do only once
-    df_calc["trykk_kPa"] = df_calc["avstand_meter"].apply(lambda d: incident_pressure(d, NEI))
+    with timing.span("pressure", rows_in=len(df_calc)):
+        df_calc["trykk_kPa"] = incident_pressure_array(df_calc["avstand_meter"].to_numpy(), NEI)
     
     # C. Sort by distance
     df_calc = df_calc.sort_values(by="avstand_meter")
+    if is_compact(df_calc):
+        df_calc = compact_buildings(df_calc)
     
     # SAVE to Session State
     st.session_state["gdf_calculated"] = df_calc
@@ -90,7 +99,7 @@ total_violation_count = len(df_syk_inside) + len(df_bolig_inside) + len(df_indus
 
 # --- 7. RENDER PAGE ---
 st.title("Detaljert Analyse")
-st.write(f"Analyse basert på et netto eksplosivinnhold (NEI) på **{NEI} kg**.")
+st.write(f"Analyse basert på et netto eksplosivinnhold (NEI) på **{NEI} kg**, faregruppe **HD {faregruppe}**.")
 
 st.divider()
 
@@ -152,34 +161,157 @@ else:
 
 st.divider()
 
+# --- VEGER INNENFOR QD ---
+veg_gdf = st.session_state.get("veg_gdf")
+if veg_gdf is not None and not veg_gdf.empty:
+    st.subheader("Veger innenfor QD")
+    veg_segmenter, veg_oppsummering = road_exposure(veg_gdf, gdf_anlegg.geometry.iloc[0], NEI, faregruppe)
+    st.dataframe(
+        veg_oppsummering,
+        width="stretch",
+        hide_index=True,
+        column_config={
+            "Eksponert lengde (m)": st.column_config.NumberColumn(format="%.0f m"),
+            "Trafikkeksponering (kjt·t/døgn)": st.column_config.NumberColumn(format="%.1f"),
+            "Kjøretøy til stede": st.column_config.NumberColumn(format="%.2f"),
+        }
+    )
+    with st.expander("Vegsegmenter per ring"):
+        st.dataframe(
+            veg_segmenter,
+            width="stretch",
+            hide_index=True,
+            column_config={
+                "Eksponert lengde (m)": st.column_config.NumberColumn(format="%.1f m"),
+                "Min. avstand (m)": st.column_config.NumberColumn(format="%.1f m"),
+                "Maks trykk (kPa)": st.column_config.NumberColumn(format="%.2f kPa"),
+                "Kjøretøy til stede": st.column_config.NumberColumn(format="%.3f"),
+            }
+        )
+    st.divider()
+
+# --- STØRSTE TILLATTE NEI ---
+with st.expander("Største tillatte NEI på denne lokasjonen"):
+    st.caption(
+        f"Bruker alle bygninger innenfor {MAX_RADIUS} m (QD_syk for største NEI), "
+        "slik at svaret gjelder for hele området 1–100 000 kg."
+    )
+    k_tillatt = st.number_input("Tillatt antall brudd (k)", value=0, min_value=0, step=1)
+
+    if st.button("Beregn største tillatte NEI", width="stretch"):
+        from area_cache import get_buildings
+        from get_matrikkel_data import clip_to_circle
+        with st.spinner("Henter bygninger for største radius...", show_time=True):
+            anlegg_point = gdf_anlegg.geometry.iloc[0]
+            x, y = anlegg_point.x, anlegg_point.y
+            alle_bygg = get_buildings(
+                (x - MAX_RADIUS, y - MAX_RADIUS, x + MAX_RADIUS, y + MAX_RADIUS),
+                backend=inputs.get("datakilde"),
+            )
+            alle_bygg = clip_to_circle(alle_bygg, (x, y), MAX_RADIUS)
+            if alle_bygg.empty:
+                st.session_state["nei_solver_data"] = (inputs, np.empty(0), np.empty(0, dtype=object))
+            else:
+                st.session_state["nei_solver_data"] = (
+                    inputs,
+                    np.hypot(alle_bygg.geometry.x.to_numpy() - x, alle_bygg.geometry.y.to_numpy() - y),
+                    alle_bygg["kategori"].to_numpy(),
+                )
+
+    solver_data = st.session_state.get("nei_solver_data")
+    if solver_data is not None and solver_data[0] == inputs:
+        _, avstand, kategori = solver_data
+        nei_maks = max_permissible_nei(avstand, kategori, k=k_tillatt, faregruppe=faregruppe)
+        if nei_maks is None:
+            st.error(f"Selv 1 kg gir mer enn {k_tillatt} brudd på denne lokasjonen.")
+        else:
+            st.metric(label=f"Største NEI med høyst {k_tillatt} brudd", value=f"{nei_maks:,} kg".replace(",", " "))
+
+        kurve = violation_curve(avstand, kategori, faregruppe=faregruppe).reset_index().melt("NEI", var_name="Kategori", value_name="Brudd")
+        chart = alt.Chart(kurve).mark_line(interpolate="step-after").encode(
+            x=alt.X("NEI:Q", scale=alt.Scale(type="log"), title="NEI (kg)"),
+            y=alt.Y("Brudd:Q", title="Antall brudd"),
+            color="Kategori:N",
+        )
+        st.altair_chart(chart, width="stretch")
+
+# --- TERRENGSKJERMING ---
+skjermet = None
+with st.expander("Terrengskjerming (DEM)"):
+    st.caption(
+        "Flagger bygninger der terrenget bryter siktlinjen fra anlegget, og reduserer trykket for dem "
+        "med en fast faktor. Dette er en screening; QD-bruddene over endres ikke. Se terrain.py."
+    )
+    # Only files in the configured DEM directory can be chosen, never a free-text path
+    dem_filer = available_dems()
+    standard = os.path.basename(DEM_PATH) if DEM_PATH else None
+    dem_fil = st.selectbox(
+        "DEM (GeoTIFF eller .npy)", options=dem_filer,
+        index=dem_filer.index(standard) if standard in dem_filer else (0 if dem_filer else None),
+        disabled=not dem_filer,
+    )
+    if not dem_filer:
+        st.info("Ingen DEM tilgjengelig. Sett FOXTROT_DEM_DIR (eller FOXTROT_DEM_PATH) til en mappe med DEM-filer.")
+    col_a, col_b, col_c = st.columns(3)
+    with col_a:
+        ladningshoyde = st.number_input("Ladningshøyde (m)", value=DEFAULT_LADNINGSHOYDE, min_value=0.0, step=0.5)
+    with col_b:
+        bygningshoyde = st.number_input("Høyde på bygning (m)", value=DEFAULT_BYGNINGSHOYDE, min_value=0.0, step=0.5)
+    with col_c:
+        reduksjon = st.slider("Trykkfaktor bak terreng", min_value=0.0, max_value=1.0, value=DEFAULT_REDUKSJON, step=0.05)
+    terreng_inputs = (inputs, dem_fil, ladningshoyde, bygningshoyde)
+
+    if st.button("Beregn siktlinjer", width="stretch", disabled=not dem_fil):
+        with st.spinner("Sampler terrengprofiler...", show_time=True):
+            anlegg = gdf_anlegg.geometry.iloc[0]
+            try:
+                with timing.span("terrain", rows_in=len(exp_buildings_gdf)):
+                    obstructed, _ = terrain_screening(
+                        (anlegg.x, anlegg.y),
+                        np.column_stack(point_xy(exp_buildings_gdf)),
+                        dem_path(dem_fil),
+                        source_height=ladningshoyde,
+                        target_height=bygningshoyde,
+                    )
+                st.session_state["terreng_data"] = (terreng_inputs, pd.Series(obstructed, index=exp_buildings_gdf.index))
+            except (ImportError, OSError, ValueError) as err:
+                st.error(str(err))
+
+    saved = st.session_state.get("terreng_data")
+    if saved is not None and saved[0] == terreng_inputs:
+        skjermet = saved[1]
+        brudd_idx = df_syk_inside.index.union(df_bolig_inside.index).union(df_industri_inside.index)
+        col_a, col_b = st.columns(2)
+        with col_a:
+            st.metric(label="Skjermede bygninger", value=int(skjermet.sum()))
+        with col_b:
+            st.metric(label="Skjermede blant bruddene", value=int(skjermet.loc[brudd_idx].sum()))
+
+st.divider()
+
 # --- B. DETAILED TABLE ---
 st.subheader("Tabell over alle bygninger")
 
 # Prepare display DataFrame
 display_df = exp_buildings_gdf[["Beskrivelse", "kategori", "avstand_meter", "trykk_kPa"]].copy()
 
-# Add Status Column
-def get_status(row):
-    cat = row["kategori"]
-    dist = row["avstand_meter"]
-    
-    # Check violations
-    if cat == "sårbar" and dist < QD_syk:
-        return "⚠️ Innenfor QD  (sårbar)"
-    elif cat == "bolig" and dist < QD_bolig:
-        return "⚠️ Innenfor QD (bolig)"
-    elif cat == "vei/industri" and dist < QD_vei:
-        return "⚠️ Innenfor QD (vei/ind.)"
-    elif cat == "ingen beskyttelse":
-        return None
-    else:
-        return "✅ Trygg"
-
-display_df["Status"] = display_df.apply(get_status, axis=1)
+# Add Status Column (same masks as the violation counts above, no per-row apply)
+status = pd.Series("✅ Trygg", index=display_df.index, dtype=object)
+status[df_syk_inside.index] = "⚠️ Innenfor QD  (sårbar)"
+status[df_bolig_inside.index] = "⚠️ Innenfor QD (bolig)"
+status[df_industri_inside.index] = "⚠️ Innenfor QD (vei/ind.)"
+status[display_df["kategori"] == "ingen beskyttelse"] = None
+display_df["Status"] = status
 
 # Rename columns
 display_df.columns = ["Beskrivelse", "Kategori", "Avstand (m)", "Trykk (kPa)", "Status"]
 
+if skjermet is not None:
+    display_df["Skjermet"] = skjermet
+    display_df["Trykk bak terreng (kPa)"] = shielded_pressure(
+        display_df["Trykk (kPa)"], skjermet.loc[display_df.index].to_numpy(), reduksjon
+    )
+
 # Display Table with Formatting
 st.dataframe(
     display_df, 
@@ -188,13 +320,14 @@ st.dataframe(
     column_config={
         "Avstand (m)": st.column_config.NumberColumn(format="%.1f m"),
         "Trykk (kPa)": st.column_config.NumberColumn(format="%.2f kPa"),
+        "Trykk bak terreng (kPa)": st.column_config.NumberColumn(format="%.2f kPa"),
         "Status": st.column_config.TextColumn(width="medium"),
     }
 )
 
 # Navigation and Download
 st.page_link(
-    "pages/3_QRA_seleksjon.py", 
+    "pages/3_QRA_Seleksjon.py", 
     label="Gå til side for seleksjon av objekter til QRA", 
     icon=":material/calculate:", 
     width="stretch",
@@ -206,4 +339,6 @@ st.download_button(
     data=csv,
     file_name='bygningsanalyse_resultat.csv',
     mime='text/csv',
-)
\ No newline at end of file
+)
+
+timing.render_panel()
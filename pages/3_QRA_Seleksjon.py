@@ -1,11 +1,13 @@
 import streamlit as st
-import geopandas as gpd
 import pandas as pd
+import numpy as np
 import folium
 from streamlit_folium import st_folium
-from pyproj import Transformer
 # Import needed only for fallback
-from blast_model import incident_pressure
+from blast_model import incident_pressure_array
+from qd_rules import QD_func, DEFAULT_FAREGRUPPE, unverified_warning
+from compact import is_compact, point_xy, compact_buildings, to_latlon
+import timing
 
 # ------------------------------------------------------------
 # 1. PAGE SETUP
@@ -15,13 +17,13 @@ st.set_page_config(
     page_icon=":material/checklist:",
     layout="wide"
 )
-
+timing.start_run("3_QRA_Seleksjon")
 # ------------------------------------------------------------
 # 2. REQUIRED STATE CHECK
 # ------------------------------------------------------------
 if not st.session_state.get("GISanalysis_complete", False):
     st.warning("Ingen data funnet. Vennligst kjør analysen på hovedsiden først.")
-    st.page_link("streamlit_app.py", label="Gå til hovedside", icon=":material/home:", width="stretch")
+    st.page_link("Hjem.py", label="Gå til hovedside", icon=":material/home:", width="stretch")
     st.stop()
 
 # ------------------------------------------------------------
@@ -62,9 +64,12 @@ else:
     anlegg_point = gdf_anlegg.geometry.iloc[0]
     
     # Physics Calculation
-    df_work["avstand_meter"] = df_work.geometry.distance(anlegg_point)
-    df_work["trykk_kPa"] = df_work["avstand_meter"].apply(lambda d: incident_pressure(d, NEI))
+    bx, by = point_xy(df_work)
+    df_work["avstand_meter"] = np.hypot(bx - anlegg_point.x, by - anlegg_point.y)
+    df_work["trykk_kPa"] = incident_pressure_array(df_work["avstand_meter"].to_numpy(), NEI)
     df_work = df_work.sort_values("avstand_meter")
+    if is_compact(df_work):
+        df_work = compact_buildings(df_work)
     
     # Store result so we don't calculate again
     st.session_state["gdf_calculated"] = df_work
@@ -72,37 +77,35 @@ else:
 # ------------------------------------------------------------
 # 5. LOGIC & DEFAULTS (Determine Inclusion)
 # ------------------------------------------------------------
-def QD_limits(NEI):
-    return (
-        max(round(44.4 * NEI ** (1 / 3)), 800),
-        max(round(22.2 * NEI ** (1 / 3)), 400),
-        max(round(14.8 * NEI ** (1 / 3)), 180),
+faregruppe = current_inputs.get("faregruppe", DEFAULT_FAREGRUPPE)
+QD_syk, QD_bolig, QD_vei = QD_func(NEI, faregruppe)
+if unverified_warning(faregruppe):
+    st.warning(unverified_warning(faregruppe))
+
+def analyze(df):
+    """Default (Status, Inkluder) for all rows at once."""
+    cat = df["kategori"].to_numpy()
+    dist = df["avstand_meter"].to_numpy()
+
+    # Skjermingsverdig is checked against QD_syk; unknown categories fall back to QD_vei
+    limit = np.select(
+        [(cat == "sårbar") | (cat == "skjermingsverdig"), cat == "bolig"],
+        [QD_syk, QD_bolig],
+        default=QD_vei,
     )
+    inside = (dist < limit) & (cat != "ingen beskyttelse")
 
-QD_syk, QD_bolig, QD_vei = QD_limits(NEI)
-
-def analyze_row(row):
-    cat = row["kategori"]
-    dist = row["avstand_meter"]
-    
-    # Exclusion logic
-    if cat == "ingen beskyttelse": 
-        return "Ingen beskyttelse", False
-    
-    # Skjermingsverdig logic
-    if cat == "skjermingsverdig":
-        return ("⚠️ Skjermingsverdig", True) if dist < QD_syk else ("✅ Trygg", False)
-    
-    # Standard logic
-    limit = QD_syk if cat == "sårbar" else (QD_bolig if cat == "bolig" else QD_vei)
-    return ("⚠️ Innenfor QD", True) if dist < limit else ("✅ Trygg", False)
+    status = np.where(inside, "⚠️ Innenfor QD", "✅ Trygg").astype(object)
+    status[inside & (cat == "skjermingsverdig")] = "⚠️ Skjermingsverdig"
+    status[cat == "ingen beskyttelse"] = "Ingen beskyttelse"
+    return status, inside
 
 # Initialize the Editor DataFrame if not present
 if "qra_editor_data" not in st.session_state:
-    # Apply logic to determine default status/include
-    results = df_work.apply(analyze_row, axis=1)
-    df_work["Status"] = [r[0] for r in results]
-    df_work["Inkluder"] = [r[1] for r in results]
+    # Determine default status/include
+    df_work["Status"], df_work["Inkluder"] = analyze(df_work)
+    if is_compact(df_work):
+        df_work = compact_buildings(df_work)  # Status as a categorical
     
     st.session_state["qra_editor_data"] = df_work.copy()
 
@@ -112,23 +115,31 @@ if "qra_editor_data" not in st.session_state:
 # df_current is the Single Source of Truth for this page
 df_current = st.session_state["qra_editor_data"]
 
-# Ensure geometry is preserved (in case session state stored it as plain pandas)
-if not isinstance(df_current, gpd.GeoDataFrame):
-    df_current = gpd.GeoDataFrame(df_current, geometry=df_work.geometry, crs=df_work.crs)
+# Ensure geometry is preserved (in case session state stored it as plain pandas).
+# Compact tables (see compact.py) carry x/y columns instead and are used as they are.
+if not is_compact(df_current):
+    import geopandas as gpd
+    if not isinstance(df_current, gpd.GeoDataFrame):
+        df_current = gpd.GeoDataFrame(df_current, geometry=df_work.geometry, crs=df_work.crs)
 
 # Create/Update CRS-converted version for Map (Lat/Lon)
 if "processed_map_gdf" not in st.session_state:
-    st.session_state["processed_map_gdf"] = df_current.to_crs(epsg=4326)
+    if is_compact(df_current):
+        st.session_state["processed_map_gdf"] = to_latlon(df_current[["x", "y", "Beskrivelse"]])
+    else:
+        st.session_state["processed_map_gdf"] = df_current.to_crs(epsg=4326)
 
 map_gdf = st.session_state["processed_map_gdf"]
 # Important: Sync the 'Inkluder' column from editor to the map gdf for coloring
 map_gdf["Inkluder"] = df_current["Inkluder"]
+map_lon, map_lat = point_xy(map_gdf)
 
 # ------------------------------------------------------------
 # 7. MAP VIEW STATE
 # ------------------------------------------------------------
 if "map_center" not in st.session_state:
     anlegg = st.session_state["gdf_anlegg"].geometry.iloc[0]
+    from pyproj import Transformer
     transformer = Transformer.from_crs("EPSG:32633", "EPSG:4326", always_xy=True)
     lon, lat = transformer.transform(anlegg.x, anlegg.y)
     st.session_state["map_center"] = [lat, lon]
@@ -177,17 +188,16 @@ with col_map:
     # 2. Dynamic Feature Group
     fg = folium.FeatureGroup(name="Objekter")
 
-    for idx, row in map_gdf.iterrows():
-        included = row["Inkluder"]
+    for lat, lon, included, beskrivelse in zip(map_lat, map_lon, map_gdf["Inkluder"], map_gdf["Beskrivelse"]):
         folium.CircleMarker(
-            [row.geometry.y, row.geometry.x],
+            [lat, lon],
             radius=8 if included else 6,
             color="white",
             weight=1,
             fill=True,
             fill_color="#28a745" if included else "#6c757d",
             fill_opacity=0.9 if included else 0.5,
-            tooltip=row["Beskrivelse"],
+            tooltip=beskrivelse,
         ).add_to(fg)
 
     # 3. Render
@@ -218,8 +228,8 @@ with col_map:
             # Find clicked object
             tol = 1e-4
             hit = map_gdf[
-                (abs(map_gdf.geometry.y - lat) < tol) & 
-                (abs(map_gdf.geometry.x - lng) < tol)
+                (abs(map_lat - lat) < tol) & 
+                (abs(map_lon - lng) < tol)
             ]
 
             if not hit.empty:
@@ -251,6 +261,7 @@ with col_table:
             "avstand_meter": st.column_config.NumberColumn("Avstand (m)", format="%.1f"),
             "trykk_kPa": st.column_config.NumberColumn("Trykk (kPa)", format="%.2f"),
         },
+        disabled=[c for c in cols if c != "Inkluder"],
         hide_index=True,
         height=600,
         key="table_editor"
@@ -280,4 +291,6 @@ with st.popover("Bekreft utvalg", type="primary", width="stretch"):
     st.session_state["qra_selected_gdf"] = final
 
     if st.button("Gå til side for QRA parametere", width="stretch", type="secondary"):
-        st.switch_page("pages/4_QRA_Parametere.py")
\ No newline at end of file
+        st.switch_page("pages/4_QRA_Parametere.py")
+
+timing.render_panel()
@@ -1,12 +1,154 @@
 import streamlit as st
-import geopandas as gpd
 import pandas as pd
-import folium
-from streamlit_folium import st_folium
-from pyproj import Transformer
-# Import needed only for fallback
+from qra import PROBITS, DEFAULT_PROBIT, DEFAULT_FREKVENS, DEFAULT_KATEGORI_PARAMETERE, run_qra
+from occupancy import default_profiles, time_profile_risk, TIMER
+from societal_risk import estimate_population
+import timing
+
+# --- 1. SETUP & STATE CHECK ---
+st.set_page_config(page_title="QRA parametere", page_icon=":material/tune:")
+timing.start_run("4_QRA_Parametere")
+if "qra_selected_gdf" not in st.session_state:
+    st.warning("Ingen objekter valgt. Vennligst velg objekter til QRA først.")
+    st.page_link("pages/3_QRA_Seleksjon.py", label="Gå til seleksjon for QRA", icon=":material/checklist:")
+    st.stop()
 
 df_QRA = st.session_state["qra_selected_gdf"]
 
-st.write(df_QRA["Beskrivelse"])
-st.session_state
\ No newline at end of file
+anlegg = st.session_state["gdf_anlegg"].geometry.iloc[0]
+NEI = st.session_state["last_calc_inputs"]["nei"]
+
+params = st.session_state.get("qra_params") or {
+    "frekvens": DEFAULT_FREKVENS,
+    "probit": DEFAULT_PROBIT,
+    "kategori_parametere": DEFAULT_KATEGORI_PARAMETERE.copy(),
+    "personer_kilde": "kategori",
+    "scenarier": pd.DataFrame([{"Øst": anlegg.x, "Nord": anlegg.y, "NEI": float(NEI), "Frekvens": DEFAULT_FREKVENS}]),
+    "bruk_tidsprofil": False,
+    "opphold_profiler": default_profiles(),
+}
+
+# Only reseed the editors when they are freshly created, so edits are not reset on every rerun
+if "qra_kategori_editor" not in st.session_state:
+    st.session_state["qra_kategori_base"] = params["kategori_parametere"]
+if "qra_scenario_editor" not in st.session_state:
+    st.session_state["qra_scenario_base"] = params["scenarier"]
+for dagtype in ("hverdag", "helg"):
+    if f"qra_profil_{dagtype}_editor" not in st.session_state:
+        st.session_state[f"qra_profil_{dagtype}_base"] = params["opphold_profiler"][dagtype]
+
+# --- 2. RENDER PAGE ---
+st.title("Parametere for QRA")
+st.write(f"**{len(df_QRA)}** objekter er valgt til kvantitativ risikoanalyse.")
+
+frekvens = st.number_input(
+    "Eksplosjonsfrekvens (per år)",
+    value=float(params["frekvens"]),
+    min_value=0.0,
+    step=1e-6,
+    format="%.1e",
+)
+probit = st.selectbox(
+    "Probitfunksjon",
+    options=list(PROBITS),
+    index=list(PROBITS).index(params["probit"]),
+)
+
+st.subheader("Opphold og personer per kategori")
+st.caption("Opphold er andel av tiden en person befinner seg i bygningen.")
+kategori_parametere = st.data_editor(
+    st.session_state["qra_kategori_base"],
+    column_config={
+        "opphold": st.column_config.NumberColumn("Opphold", min_value=0.0, max_value=1.0, format="%.2f"),
+        "personer": st.column_config.NumberColumn("Personer per bygning", min_value=0.0, format="%.1f"),
+    },
+    width="stretch",
+    key="qra_kategori_editor",
+)
+
+personer_kilde = st.radio(
+    "Personer per bygning",
+    options=["kategori", "bygningstype"],
+    format_func=lambda k: {"kategori": "Fra tabellen over (per kategori)", "bygningstype": "Estimert fra bygningstype"}[k],
+    index=["kategori", "bygningstype"].index(params["personer_kilde"]),
+    horizontal=True,
+)
+
+st.subheader("Tidsprofiler for opphold")
+bruk_tidsprofil = st.checkbox(
+    "Bruk tidsprofiler i stedet for fast opphold per kategori",
+    value=params["bruk_tidsprofil"],
+)
+
+profil_config = {h: st.column_config.NumberColumn(h, min_value=0.0, max_value=1.0, format="%.2f") for h in TIMER}
+opphold_profiler = {}
+for tab, dagtype in zip(st.tabs(["Hverdag", "Helg"]), ("hverdag", "helg")):
+    with tab:
+        opphold_profiler[dagtype] = st.data_editor(
+            st.session_state[f"qra_profil_{dagtype}_base"],
+            column_config=profil_config,
+            width="stretch",
+            key=f"qra_profil_{dagtype}_editor",
+        )
+
+# Recomputed on every edit: one buildings x time-slots matrix operation
+personer = estimate_population(df_QRA["bygningstype"]) if personer_kilde == "bygningstype" else None
+qra_preview, _ = run_qra(df_QRA, NEI, frekvens, probit, kategori_parametere, personer=personer)
+tidsrisiko = time_profile_risk(
+    qra_preview["p_død"].to_numpy(),
+    qra_preview["personer"].to_numpy(),
+    df_QRA["bygningstype"],
+    opphold_profiler,
+    frekvens,
+)
+
+col1, col2, col3 = st.columns(3)
+with col1:
+    st.metric(label="Forventet omkomne, verste time", value=f"{tidsrisiko['N_peak']:.2f}")
+with col2:
+    st.metric(label="Forventet omkomne, tidsmidlet", value=f"{tidsrisiko['N_mean']:.2f}")
+with col3:
+    st.metric(label="Verste time", value=tidsrisiko["worst_slot"])
+
+st.line_chart(
+    pd.DataFrame(
+        {"Forventet omkomne": tidsrisiko["N_per_slot"]},
+        index=pd.RangeIndex(len(tidsrisiko["labels"]), name="Time i uken (0–23 hverdag, 24–47 helg)"),
+    )
+)
+
+st.subheader("Scenarier for samfunnsrisiko (F–N)")
+st.caption("Én rad per eksplosjonskilde/scenario. Koordinater i UTM33N, frekvens per år.")
+scenarier = st.data_editor(
+    st.session_state["qra_scenario_base"],
+    num_rows="dynamic",
+    column_config={
+        "Øst": st.column_config.NumberColumn("Øst / X", format="%.1f"),
+        "Nord": st.column_config.NumberColumn("Nord / Y", format="%.1f"),
+        "NEI": st.column_config.NumberColumn("NEI (kg)", min_value=1.0, format="%.0f"),
+        "Frekvens": st.column_config.NumberColumn("Frekvens (per år)", min_value=0.0, format="%.1e"),
+    },
+    width="stretch",
+    hide_index=True,
+    key="qra_scenario_editor",
+)
+
+# --- 3. SAVE PARAMETERS ---
+st.session_state["qra_params"] = {
+    "frekvens": frekvens,
+    "probit": probit,
+    "kategori_parametere": kategori_parametere,
+    "personer_kilde": personer_kilde,
+    "scenarier": scenarier,
+    "bruk_tidsprofil": bruk_tidsprofil,
+    "opphold_profiler": opphold_profiler,
+}
+
+st.page_link(
+    "pages/5_QRA_Analyse.py",
+    label="Gå til QRA analyse",
+    icon=":material/calculate:",
+    width="stretch",
+)
+
+timing.render_panel()
@@ -5,3 +5,269 @@ Created on Tue Jan 20 13:34:59 2026
 @author: KRHE
 """
 
+import streamlit as st
+import altair as alt
+import numpy as np
+import pandas as pd
+from qra import run_qra, DEFAULT_PROBIT, DEFAULT_FREKVENS, DEFAULT_KATEGORI_PARAMETERE
+from societal_risk import estimate_population, expected_fatalities, fn_curve
+from occupancy import average_presence
+from traffic_risk import traffic_risk
+from compact import point_xy
+import timing
+
+# --- 1. SETUP & STATE CHECK ---
+st.set_page_config(page_title="QRA analyse", page_icon=":material/analytics:")
+timing.start_run("5_QRA_Analyse")
+if "qra_selected_gdf" not in st.session_state:
+    st.warning("Ingen objekter valgt. Vennligst velg objekter til QRA først.")
+    st.page_link("pages/3_QRA_Seleksjon.py", label="Gå til seleksjon for QRA", icon=":material/checklist:")
+    st.stop()
+
+# --- 2. RETRIEVE INPUTS ---
+df_QRA = st.session_state["qra_selected_gdf"]
+NEI = st.session_state["last_calc_inputs"]["nei"]
+params = st.session_state.get("qra_params") or {
+    "frekvens": DEFAULT_FREKVENS,
+    "probit": DEFAULT_PROBIT,
+    "kategori_parametere": DEFAULT_KATEGORI_PARAMETERE,
+}
+
+# --- 3. CALCULATIONS ---
+personer = None
+if params.get("personer_kilde") == "bygningstype":
+    personer = estimate_population(df_QRA["bygningstype"])
+
+opphold = None
+if params.get("bruk_tidsprofil"):
+    opphold = average_presence(df_QRA["bygningstype"], params["opphold_profiler"])
+
+qra_result, qra_summary = run_qra(
+    df_QRA,
+    NEI,
+    frekvens=params["frekvens"],
+    probit=params["probit"],
+    kategori_parametere=params["kategori_parametere"],
+    personer=personer,
+    opphold=opphold,
+)
+st.session_state["qra_result"] = qra_result
+
+scenarier = params.get("scenarier")
+if scenarier is None:
+    anlegg = st.session_state["gdf_anlegg"].geometry.iloc[0]
+    scenarier = pd.DataFrame([{"Øst": anlegg.x, "Nord": anlegg.y, "NEI": float(NEI), "Frekvens": params["frekvens"]}])
+scenarier = scenarier.dropna()
+
+# Road users (NVDB ÅDT and speed limits), added to PLL and F–N
+veg_pieces, N_veg, veg_summary = traffic_risk(
+    st.session_state.get("veg_gdf"),
+    scenarier[["Øst", "Nord", "NEI", "Frekvens"]].to_numpy(dtype=float),
+    probit=params["probit"],
+)
+
+# Building fatalities over the same scenario rows as the road users, so PLL totals and
+# F–N add like with like (qra_summary covers only the facility with params["frekvens"])
+if scenarier.empty:
+    N_bygg = np.zeros(0)
+else:
+    N_bygg = expected_fatalities(
+        np.column_stack(point_xy(df_QRA)),
+        (qra_result["personer"] * qra_result["opphold"]).to_numpy(),
+        scenarier[["Øst", "Nord", "NEI"]].to_numpy(dtype=float),
+        probit=params["probit"],
+    )
+pll_bygg_scenarier = float(N_bygg @ scenarier["Frekvens"].to_numpy(dtype=float))
+
+# --- 4. RENDER PAGE ---
+st.title("QRA analyse")
+st.write(
+    f"NEI **{NEI} kg**, eksplosjonsfrekvens **{params['frekvens']:.1e}** per år, "
+    f"probit: **{params['probit']}**."
+)
+
+st.divider()
+
+col1, col2, col3 = st.columns(3)
+with col1:
+    st.metric(label="Høyeste individuelle risiko (per år)", value=f"{qra_summary['maks_IR']:.2e}")
+with col2:
+    st.metric(label="PLL (forventet omkomne per år)", value=f"{qra_summary['PLL']:.2e}")
+with col3:
+    st.metric(label="Eksponerte personer (gj.snitt)", value=f"{qra_summary['eksponerte_personer']:.1f}")
+
+st.caption(f"Forventet antall omkomne gitt eksplosjon: {qra_summary['forventet_døde']:.2f}")
+
+if len(veg_pieces):
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric(label="Høyeste stedsspesifikke IR på veg (per år)", value=f"{veg_summary['maks_IR']:.2e}")
+    with col2:
+        st.metric(label="PLL trafikanter (per år)", value=f"{veg_summary['PLL']:.2e}")
+    with col3:
+        st.metric(label="PLL totalt (per år)", value=f"{pll_bygg_scenarier + veg_summary['PLL']:.2e}")
+    st.caption("PLL for trafikanter og PLL totalt er regnet over alle scenariene i scenariotabellen.")
+
+st.divider()
+
+# --- A. DETAILED TABLE ---
+st.subheader("Risiko per bygning")
+
+display_df = qra_result[
+    ["Beskrivelse", "kategori", "avstand_meter", "trykk_kPa", "impuls_Pa_s", "p_død", "IR", "personer", "PLL"]
+].sort_values("IR", ascending=False)
+
+st.dataframe(
+    display_df,
+    width="stretch",
+    hide_index=True,
+    column_config={
+        "avstand_meter": st.column_config.NumberColumn("Avstand (m)", format="%.1f m"),
+        "trykk_kPa": st.column_config.NumberColumn("Trykk (kPa)", format="%.2f kPa"),
+        "impuls_Pa_s": st.column_config.NumberColumn("Impuls (Pa·s)", format="%.1f"),
+        "p_død": st.column_config.NumberColumn("P(død)", format="%.2e"),
+        "IR": st.column_config.NumberColumn("IR (per år)", format="%.2e"),
+        "personer": st.column_config.NumberColumn("Personer", format="%.1f"),
+        "PLL": st.column_config.NumberColumn("PLL (per år)", format="%.2e"),
+    }
+)
+
+csv = display_df.to_csv(index=False).encode('utf-8')
+st.download_button(
+    label="Last ned tabell som CSV",
+    data=csv,
+    file_name='qra_resultat.csv',
+    mime='text/csv',
+)
+
+st.divider()
+
+# --- B. SOCIETAL RISK (F–N) ---
+st.subheader("Samfunnsrisiko (F–N-kurve)")
+
+if scenarier.empty:
+    st.info("Ingen scenarier definert. Legg til scenarier på siden for QRA parametere.")
+else:
+    N = N_bygg + N_veg
+    n, F = fn_curve(N, scenarier["Frekvens"].to_numpy(dtype=float))
+    fn_df = pd.DataFrame({"N": n, "F": F})
+    fn_df = fn_df[fn_df["N"] > 0]
+
+    if fn_df.empty:
+        st.success("Ingen scenarier gir forventede omkomne blant de valgte objektene.")
+    else:
+        chart = alt.Chart(fn_df).mark_line(interpolate="step-before", point=True).encode(
+            x=alt.X("N:Q", scale=alt.Scale(type="log"), title="Antall omkomne N"),
+            y=alt.Y("F:Q", scale=alt.Scale(type="log"), title="Frekvens av N eller flere (per år)"),
+        )
+        st.altair_chart(chart, width="stretch")
+
+st.divider()
+
+# --- C. UNCERTAINTY (MONTE CARLO) ---
+with st.expander("Usikkerhet (Monte Carlo)"):
+    st.caption("Trekker NEI, TNT-ekvivalens, opphold og probitparametere og viser persentiler av risikoen.")
+    col_n, col_seed = st.columns(2)
+    with col_n:
+        n_samples = st.number_input("Antall trekk", value=10000, min_value=100, max_value=1_000_000, step=1000)
+    with col_seed:
+        seed = st.number_input("Seed", value=12345, min_value=0, step=1)
+
+    # The result is only shown for the inputs it was computed from
+    mc_inputs = (
+        NEI, params["frekvens"], params["probit"],
+        tuple(qra_result["avstand_meter"]), tuple(qra_result["opphold"]), tuple(qra_result["personer"]),
+        int(n_samples), int(seed),
+    )
+    if st.button("Kjør Monte Carlo", width="stretch"):
+        from monte_carlo import run_monte_carlo
+        with st.spinner("Kjører Monte Carlo...", show_time=True):
+            ir_hist, agg_hist = run_monte_carlo(
+                qra_result["avstand_meter"].to_numpy(dtype=float),
+                qra_result["opphold"].to_numpy(dtype=float),
+                qra_result["personer"].to_numpy(dtype=float),
+                NEI,
+                params["frekvens"],
+                probit=params["probit"],
+                n_samples=int(n_samples),
+                seed=int(seed),
+            )
+        st.session_state["qra_monte_carlo"] = (mc_inputs, (ir_hist, agg_hist))
+
+    saved_mc = st.session_state.get("qra_monte_carlo")
+    if saved_mc is not None and saved_mc[0] == mc_inputs:
+        ir_hist, agg_hist = saved_mc[1]
+        pll = {q: agg_hist.percentile(q)[0] for q in (5, 50, 95)}
+        max_ir = {q: agg_hist.percentile(q)[1] for q in (5, 50, 95)}
+        st.write(
+            f"**PLL** P5 / P50 / P95: {pll[5]:.2e} / {pll[50]:.2e} / {pll[95]:.2e} per år  \n"
+            f"**Høyeste IR** P5 / P50 / P95: {max_ir[5]:.2e} / {max_ir[50]:.2e} / {max_ir[95]:.2e} per år"
+        )
+        mc_df = qra_result[["Beskrivelse", "kategori", "avstand_meter", "IR"]].copy()
+        for q in (5, 50, 95):
+            mc_df[f"IR P{q}"] = ir_hist.percentile(q)
+        st.dataframe(
+            mc_df.sort_values("IR P95", ascending=False),
+            width="stretch",
+            hide_index=True,
+            column_config={
+                "avstand_meter": st.column_config.NumberColumn("Avstand (m)", format="%.1f m"),
+                "IR": st.column_config.NumberColumn("IR (per år)", format="%.2e"),
+                "IR P5": st.column_config.NumberColumn(format="%.2e"),
+                "IR P50": st.column_config.NumberColumn(format="%.2e"),
+                "IR P95": st.column_config.NumberColumn(format="%.2e"),
+            },
+        )
+
+st.divider()
+
+# --- D. LSIR CONTOURS ---
+st.subheader("Individuell risikokontur (LSIR)")
+
+col_ext, col_res = st.columns(2)
+with col_ext:
+    extent = st.number_input("Utstrekning fra anlegget (m)", value=2500, min_value=250, max_value=10000, step=250)
+with col_res:
+    resolution = st.number_input("Oppløsning (m)", value=5.0, min_value=1.0, max_value=100.0, step=1.0)
+
+anlegg = st.session_state["gdf_anlegg"].geometry.iloc[0]
+lsir_inputs = (anlegg.x, anlegg.y, NEI, params["frekvens"], params["probit"], extent, resolution)
+
+if st.button("Beregn risikokonturer", width="stretch"):
+    # geopandas/contourpy are only needed once contours are requested
+    from risk_contours import lsir_grid, lsir_contours, DEFAULT_LEVELS
+    with st.spinner("Beregner risikogrid...", show_time=True):
+        xs, ys, ir = lsir_grid(
+            [(anlegg.x, anlegg.y, NEI, params["frekvens"])],
+            probit=params["probit"],
+            extent=extent,
+            resolution=resolution,
+        )
+        try:
+            st.session_state["lsir_contours"] = (lsir_inputs, lsir_contours(xs, ys, ir, DEFAULT_LEVELS))
+        except ImportError as err:
+            st.error(str(err))
+
+saved = st.session_state.get("lsir_contours")
+if saved is not None and saved[0] == lsir_inputs:
+    contours = saved[1]
+    if contours.empty:
+        st.info("Risikoen er under laveste konturnivå overalt i området.")
+    else:
+        import folium
+        from streamlit_folium import st_folium
+        m = st.session_state["gdf_anlegg"].explore(
+            marker_type=folium.Marker(icon=folium.Icon(color='blue', icon='bomb', prefix='fa')),
+            name='anlegg',
+            control=False
+        )
+        for _, row in contours.sort_values("nivå").iterrows():
+            folium.GeoJson(
+                contours[contours["nivå"] == row["nivå"]].to_crs(epsg=4326),
+                name=f"LSIR {row['nivå']:.0e}",
+                style_function=lambda _, c=row["color"]: dict(color=c, fillColor=c, fillOpacity=0.35, weight=1),
+            ).add_to(m)
+        folium.LayerControl().add_to(m)
+        st_folium(m, width="stretch", zoom=14, key="map_lsir", returned_objects=[])
+
+timing.render_panel()
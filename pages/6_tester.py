@@ -4,14 +4,15 @@ import pandas as pd
 import folium
 from streamlit_folium import st_folium
 from pyproj import Transformer
-from blast_model import incident_pressure
+from blast_model import incident_pressure_array
+from qd_rules import QD_func, DEFAULT_FAREGRUPPE, unverified_warning
 
 # --- 1. SETUP & STATE CHECK ---
 st.set_page_config(page_title="Seleksjon for QRA", page_icon=":material/checklist:", layout="wide")
 
 if "GISanalysis_complete" not in st.session_state or not st.session_state["GISanalysis_complete"]:
     st.warning("Ingen data funnet. Vennligst kjør analysen på hovedsiden først.")
-    st.page_link("streamlit_app.py", label="Gå til hovedside", icon=":material/home:") 
+    st.page_link("Hjem.py", label="Gå til hovedside", icon=":material/home:") 
     st.stop()
 
 # --- 2. STALE DATA CHECK ---
@@ -31,19 +32,16 @@ inputs = current_inputs
 NEI = inputs["nei"]
 df_work = st.session_state["exp_buildings_gdf"].copy()
 
-# --- 4. HELPER FUNCTIONS ---
-def QD_func(NEI):
-    QD_syk = max(round(44.4 * NEI ** (1/3)), 800)
-    QD_bolig = max(round(22.2 * NEI ** (1/3)), 400)
-    QD_vei = max(round(14.8 * NEI ** (1/3)), 180)
-    return QD_syk, QD_bolig, QD_vei
-
-QD_syk, QD_bolig, QD_vei = QD_func(NEI)
+# --- 4. QD LIMITS ---
+faregruppe = inputs.get("faregruppe", DEFAULT_FAREGRUPPE)
+QD_syk, QD_bolig, QD_vei = QD_func(NEI, faregruppe)
+if unverified_warning(faregruppe):
+    st.warning(unverified_warning(faregruppe))
 anlegg_point = gdf_anlegg.geometry.iloc[0] 
 
 # Recalculate physics
 df_work["avstand_meter"] = df_work.geometry.distance(anlegg_point)
-df_work["trykk_kPa"] = df_work["avstand_meter"].apply(lambda d: incident_pressure(d, NEI))
+df_work["trykk_kPa"] = incident_pressure_array(df_work["avstand_meter"].to_numpy(), NEI)
 
 # --- 5. LOGIC & DEFAULTS ---
 def analyze_row(row):
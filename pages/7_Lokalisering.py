@@ -0,0 +1,107 @@
+import streamlit as st
+import numpy as np
+from shapely import wkt
+from qd_rules import QD_func, FAREGRUPPER, DEFAULT_FAREGRUPPE, MAX_NEI, unverified_warning
+import timing
+
+# --- 1. SETUP ---
+st.set_page_config(page_title="Lokalisering", page_icon=":material/location_searching:", layout="wide")
+timing.start_run("7_Lokalisering")
+st.title("Lokalisering av nytt lager")
+st.write(
+    "Finn punktet innenfor et tillatt område som gir færrest QD-brudd for en gitt NEI. "
+    "Området angis som et polygon i UTM33N (EPSG:32633), som WKT."
+)
+
+# --- 2. INPUT FORM ---
+with st.form("siting_form"):
+    omrade_wkt = st.text_area(
+        "Tillatt område (WKT)",
+        placeholder="POLYGON ((x1 y1, x2 y2, x3 y3, x1 y1))",
+    )
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        NEI = st.number_input('Totalvekt', step=1, min_value=1, max_value=MAX_NEI)
+        faregruppe = st.selectbox('Faregruppe (HD)', options=FAREGRUPPER, index=FAREGRUPPER.index(DEFAULT_FAREGRUPPE))
+        if unverified_warning(faregruppe):
+            st.warning(unverified_warning(faregruppe))
+    with col2:
+        spacing = st.number_input('Grovt rutenett (m)', value=100, min_value=10, max_value=1000, step=10)
+    with col3:
+        datakilde = st.radio(
+            'Datakilde',
+            options=["wfs", "lokal"],
+            format_func=lambda k: {"wfs": "Geonorge WFS", "lokal": "Lokal indeks"}[k],
+            horizontal=True,
+        )
+    submitted = st.form_submit_button("Finn beste lokasjon")
+
+if submitted:
+    try:
+        omrade = wkt.loads(omrade_wkt)
+    except Exception:
+        st.error("Kunne ikke lese polygonet. Sjekk WKT-teksten.")
+        st.stop()
+    if omrade.geom_type not in ("Polygon", "MultiPolygon") or omrade.is_empty:
+        st.error("Området må være et polygon.")
+        st.stop()
+
+    from area_cache import get_buildings
+    from siting import optimize_siting
+    with st.spinner("Henter bygninger og screener kandidater...", show_time=True):
+        QD_syk = QD_func(NEI, faregruppe)[0]
+        minx, miny, maxx, maxy = omrade.bounds
+        bygg = get_buildings((minx - QD_syk, miny - QD_syk, maxx + QD_syk, maxy + QD_syk), backend=datakilde)
+        if bygg.empty:
+            building_xy, kategori = np.empty((0, 2)), np.empty(0, dtype=object)
+        else:
+            building_xy = np.column_stack([bygg.geometry.x, bygg.geometry.y])
+            kategori = bygg["kategori"].to_numpy()
+        ranked, heatmap = optimize_siting(omrade, building_xy, kategori, NEI, spacing=spacing, faregruppe=faregruppe)
+
+    st.session_state["siting_result"] = (omrade_wkt, NEI, ranked, heatmap)
+
+# --- 3. RENDER OUTPUT ---
+result = st.session_state.get("siting_result")
+if result is not None:
+    omrade_wkt, NEI, ranked, heatmap = result
+    import geopandas as gpd
+    import folium
+    from streamlit_folium import st_folium
+
+    st.divider()
+    st.subheader("Beste lokasjoner")
+    if ranked.empty:
+        st.warning("Ingen kandidatpunkter innenfor området. Prøv et finere rutenett.")
+        st.stop()
+
+    st.dataframe(
+        ranked.rename(columns={"x": "Øst / X", "y": "Nord / Y", "totalt": "Brudd totalt"}),
+        width="stretch",
+        hide_index=True,
+        column_config={
+            "Øst / X": st.column_config.NumberColumn(format="%.1f"),
+            "Nord / Y": st.column_config.NumberColumn(format="%.1f"),
+        },
+    )
+
+    m = heatmap.explore(
+        column="totalt",
+        cmap="YlOrRd",
+        name="Brudd (grovt rutenett)",
+        style_kwds=dict(weight=0, fillOpacity=0.6),
+        legend_kwds=dict(caption="Antall QD-brudd"),
+    )
+    gpd.GeoSeries([wkt.loads(omrade_wkt)], crs="EPSG:32633").explore(
+        m=m, style_kwds=dict(fill=False, color="blue"), name="Tillatt område", control=False
+    )
+    beste = gpd.GeoDataFrame(ranked, geometry=gpd.points_from_xy(ranked["x"], ranked["y"]), crs="EPSG:32633")
+    beste.explore(
+        m=m,
+        marker_type=folium.Marker(icon=folium.Icon(color='blue', icon='bomb', prefix='fa')),
+        name="Beste lokasjoner",
+    )
+    folium.LayerControl().add_to(m)
+    st_folium(m, width="stretch", height=600, key="map_siting", returned_objects=[])
+
+timing.render_panel()
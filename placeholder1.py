@@ -9,6 +9,7 @@ import streamlit as st
 from streamlit_folium import st_folium
 import folium
 from pyproj import Transformer
+from prefetch import start_prefetch
 
 st.set_page_config(page_title="Folium Click Map", layout="wide")
 
@@ -48,7 +49,7 @@ def epsg32633_to_latlon(x, y):
     return lat, lon
 
 # Initial map center
-if not st.session_state["input_coordinates"]:
+if not st.session_state.get("input_coordinates"):
     start_coords = [59.2638, 10.4044]  # Example: Tønsberg area
     start_coordsUTM33N = latlon_to_epsg32633(start_coords[0], start_coords[1])
 else: 
@@ -77,9 +78,13 @@ if returned and "last_clicked" in returned and returned["last_clicked"] is not N
     lat = returned["last_clicked"]['lat']
     lon = returned["last_clicked"]['lng']
 
-    latutm, lonutm =  latlon_to_epsg32633(lat, lon)
+    oestutm, nordutm = latlon_to_epsg32633(lat, lon)
     
-    st.success(f"Clicked location: {lonutm:.2f}, {latutm:.2f}")
+    st.success(f"Clicked location: {nordutm:.2f}, {oestutm:.2f}")
+
+    # Hand the coordinates to the input page and start fetching exposure data right away
+    st.session_state["input_coordinates"] = {"oestUTM33": oestutm, "nordUTM33": nordutm}
+    start_prefetch(oestutm, nordutm)
 
     # Show a map with a marker at the clicked position
 else:
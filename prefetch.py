@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 11:05:12 2026
+Spekulativ forhåndshenting av bygninger og veger.
+
+Så snart brukeren har oppgitt plausible koordinater (kartklikk eller inntastet),
+startes henting for største mulige radius i en bakgrunnstråd. Når brukeren trykker
+"Submit" finner siden resultatet ferdig, eller venter bare på det som gjenstår.
+Resultatene havner i den delte cachen i area_cache.py. area_cache (og dermed
+geopandas/requests) importeres først i bakgrunnstråden, så inputsiden starter raskt.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from qd_rules import MAX_RADIUS
+import timing
+
+MAX_PENDING = 32
+
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="prefetch")
+_lock = threading.Lock()
+_pending = {}  # (kind, backend, bbox) -> Future, oldest first
+
+
+def plausible_utm33(x, y):
+    """True if (x, y) looks like a UTM33N coordinate on the Norwegian mainland or Svalbard."""
+    if x is None or y is None:
+        return False
+    return -100_000 <= x <= 1_200_000 and 6_400_000 <= y <= 8_950_000
+
+
+def _default_backend():
+    from get_matrikkel_data import DEFAULT_BACKEND
+    return DEFAULT_BACKEND
+
+
+def _fetch(kind, backend, bbox):
+    # Goes through the process-wide tile cache, so prefetches are shared between sessions
+    from area_cache import get_buildings, get_roads
+    if kind == "bygg":
+        return get_buildings(bbox, backend=backend)
+    return get_roads(bbox)
+
+
+def _forget_if_empty(key, fut):
+    # get_* return an empty frame on upstream errors; do not keep those around
+    if fut.exception() is not None or fut.result().empty:
+        with _lock:
+            if _pending.get(key) is fut:
+                del _pending[key]
+
+
+def _submit(kind, backend, bbox):
+    key = (kind, backend, tuple(round(v, 2) for v in bbox))
+    with _lock:
+        fut = _pending.get(key)
+        new = fut is None
+        if new:
+            fut = _executor.submit(timing.bind(_fetch), kind, backend, bbox)
+            _pending[key] = fut
+            while len(_pending) > MAX_PENDING:
+                _pending.pop(next(iter(_pending)))
+    # Once per future, and outside the lock: a future that is already done runs the
+    # callback right away, and _forget_if_empty takes the lock itself
+    if new:
+        fut.add_done_callback(lambda f: _forget_if_empty(key, f))
+    return fut
+
+
+def _covering(kind, backend, bbox):
+    """Newest pending/finished fetch whose bbox contains bbox, or None."""
+    with _lock:
+        for (k, b, box), fut in reversed(list(_pending.items())):
+            if k == kind and b == backend and box[0] <= bbox[0] and box[1] <= bbox[1] \
+                    and box[2] >= bbox[2] and box[3] >= bbox[3]:
+                return fut
+    return None
+
+
+def start_prefetch(x, y, backend=None, radius=MAX_RADIUS):
+    """
+    Starts background fetching of buildings and roads around (x, y).
+    Does nothing for implausible coordinates. Returns immediately.
+    """
+    if not plausible_utm33(x, y):
+        return
+    backend = backend or _default_backend()
+    bbox = (x - radius, y - radius, x + radius, y + radius)
+    _submit("bygg", backend, bbox)
+    _submit("veg", None, bbox)
+
+
+def buildings_future(bbox_tuple, backend=None):
+    """Future for the buildings in bbox_tuple, reusing a covering prefetch when there is one."""
+    backend = backend or _default_backend()
+    return _covering("bygg", backend, bbox_tuple) or _submit("bygg", backend, bbox_tuple)
+
+
+def roads_future(bbox_tuple):
+    """Future for the roads in bbox_tuple, reusing a covering prefetch when there is one."""
+    return _covering("veg", None, bbox_tuple) or _submit("veg", None, bbox_tuple)
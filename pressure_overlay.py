@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Oct 22 09:14:51 2026
+Trykkfelt rundt anlegget som ett rasterbilde på kartet.
+
+incident_pressure_array regnes på et rutenett i Web Mercator (samme projeksjon som
+kartet, slik at bildet ikke forvrenges), fargelegges i trykkbånd og kodes som PNG
+én gang. Resultatet caches på (anlegg, NEI, oppløsning), så panorering og nye
+kjøringer av siden ikke regner på nytt.
+"""
+import functools
+
+import numpy as np
+
+from blast_model import incident_pressure_array
+
+# Lower band edges (kPa) and RGBA colours; below the first level is transparent
+TRYKK_NIVAER = np.array([2, 5, 9, 20, 50, 100])
+TRYKK_FARGER = np.array([
+    [255, 237, 160, 120],
+    [254, 178, 76, 140],
+    [253, 141, 60, 150],
+    [240, 59, 32, 160],
+    [189, 0, 38, 170],
+    [103, 0, 13, 180],
+], dtype=np.uint8)
+
+
+@functools.lru_cache(maxsize=1)
+def _transformers():
+    # pyproj and its database are loaded on first use, not when the page imports this module
+    from pyproj import Transformer
+    return (
+        Transformer.from_crs("EPSG:32633", "EPSG:3857", always_xy=True),
+        Transformer.from_crs("EPSG:3857", "EPSG:32633", always_xy=True),
+        Transformer.from_crs("EPSG:3857", "EPSG:4326", always_xy=True),
+    )
+
+
+def colorize(P):
+    """(rows, cols) pressures in kPa -> (rows, cols, 4) uint8 RGBA image."""
+    P = np.where(np.isnan(P), np.inf, P)  # nan only at the charge itself
+    band = np.searchsorted(TRYKK_NIVAER, P, side="right") - 1
+    rgba = TRYKK_FARGER[np.clip(band, 0, len(TRYKK_NIVAER) - 1)]
+    rgba[band < 0] = 0
+    return rgba
+
+
+@functools.lru_cache(maxsize=32)
+def pressure_image(x, y, NEI, extent, resolution):
+    """
+    Colour-mapped pressure field around (x, y).
+    Args:
+      x, y       : facility position (EPSG:32633)
+      NEI        : net explosive content (kg TNT eq)
+      extent     : half-width of the image (m)
+      resolution : pixel size (m)
+    Returns:
+      (png_url, bounds) with the PNG as a data URL and bounds as [[south, west], [north, east]].
+    """
+    from folium.utilities import image_to_url
+
+    _utm_to_merc, _merc_to_utm, _merc_to_latlon = _transformers()
+    cx, cy = _utm_to_merc.transform(x, y)
+    # Mercator metres are stretched by 1/cos(lat); scale so extent/resolution hold on the ground
+    scale = 1 / np.cos(np.radians(_merc_to_latlon.transform(cx, cy)[1]))
+    half = extent * scale
+    n = int(np.ceil(2 * extent / resolution))
+    mx = cx - half + (np.arange(n) + 0.5) * (2 * half / n)
+    my = cy + half - (np.arange(n) + 0.5) * (2 * half / n)  # top row first
+    gx, gy = np.meshgrid(mx, my)
+
+    ux, uy = _merc_to_utm.transform(gx, gy)
+    P = incident_pressure_array(np.hypot(ux - x, uy - y), NEI)
+    png = image_to_url(colorize(P), origin="upper")
+
+    west, south = _merc_to_latlon.transform(cx - half, cy - half)
+    east, north = _merc_to_latlon.transform(cx + half, cy + half)
+    return png, [[south, west], [north, east]]
+
+
+def pressure_overlay(x, y, NEI, extent, pixels=512, name="Trykkfelt (kPa)"):
+    """ImageOverlay of the pressure field, ready to add to a folium map."""
+    from folium.raster_layers import ImageOverlay
+
+    resolution = max(1.0, round(2 * extent / pixels, 1))
+    png, bounds = pressure_image(float(x), float(y), float(NEI), float(extent), resolution)
+    return ImageOverlay(image=png, bounds=bounds, name=name, interactive=False, zindex=1)
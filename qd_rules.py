@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 15:02:44 2026
+Sikkerhetsavstander (QD) delt mellom sider og analysemoduler.
+
+Reglene ligger som data per faregruppe (HD) og QD-ring:
+    QD = max(round(k * NEI^(1/3)), minimum)
+Faste avstander uttrykkes med k = 0. Funksjonene tar arrays av NEI og faregruppe,
+og binding_qd regner anlegg med flere kilder og blandede faregrupper i ett kall.
+
+HD 1.1 er verdiene som alltid har vært brukt i QD_func. Verdiene for HD 1.2-1.4
+er standardverdier etter samme mønster og må kontrolleres mot gjeldende forskrift
+før bruk. De er derfor ikke tilgjengelige med mindre FOXTROT_UKONTROLLERT_HD=1 er
+satt, og sidene viser da en advarsel når de brukes.
+"""
+import os
+
+import numpy as np
+
+RINGER = ("syk", "bolig", "vei")
+
+# faregruppe -> ring -> (k, minimum)
+QD_REGLER = {
+    "1.1": {"syk": (44.4, 800), "bolig": (22.2, 400), "vei": (14.8, 180)},
+    "1.2": {"syk": (0.0, 405), "bolig": (0.0, 270), "vei": (0.0, 180)},
+    "1.3": {"syk": (9.6, 90), "bolig": (6.4, 60), "vei": (4.3, 40)},
+    "1.4": {"syk": (0.0, 25), "bolig": (0.0, 25), "vei": (0.0, 25)},
+}
+KONTROLLERTE = ("1.1",)
+# Hazard divisions offered and accepted; the unverified ones only on explicit opt-in
+UKONTROLLERT_TILLATT = os.environ.get("FOXTROT_UKONTROLLERT_HD", "0") == "1"
+FAREGRUPPER = list(QD_REGLER) if UKONTROLLERT_TILLATT else list(KONTROLLERTE)
+DEFAULT_FAREGRUPPE = "1.1"
+UKONTROLLERT_ADVARSEL = ("QD-avstandene for HD {} er standardverdier som ikke er kontrollert mot "
+                         "gjeldende forskrift. Resultatene kan ikke brukes som grunnlag for beslutninger.")
+
+# Which ring each exposure category is checked against for violations
+KATEGORI_RING = {"sårbar": 0, "bolig": 1, "vei/industri": 2}
+
+_K = np.array([[QD_REGLER[hd][r][0] for r in RINGER] for hd in FAREGRUPPER])
+_MIN = np.array([[QD_REGLER[hd][r][1] for r in RINGER] for hd in FAREGRUPPER])
+
+MAX_NEI = 100000  # largest NEI accepted on the input page
+
+
+def _hd_index(faregruppe):
+    faregruppe = np.asarray(faregruppe, dtype=str)
+    known = np.isin(faregruppe, FAREGRUPPER)
+    if not known.all():
+        raise ValueError(f"Ukjent faregruppe: {np.unique(faregruppe[~known])}")
+    return np.searchsorted(FAREGRUPPER, faregruppe)
+
+
+def unverified_warning(faregruppe):
+    """Warning text for a hazard division whose QD values are not verified, else None."""
+    if str(faregruppe) in KONTROLLERTE:
+        return None
+    return UKONTROLLERT_ADVARSEL.format(faregruppe)
+
+
+def qd_distances(NEI, faregruppe=DEFAULT_FAREGRUPPE):
+    """
+    QD for every ring, broadcast over arrays of NEI and faregruppe.
+    Returns:
+      array of shape broadcast(NEI, faregruppe) + (3,), rings in RINGER order.
+    """
+    W13 = np.cbrt(np.asarray(NEI, dtype=float))[..., None]
+    hd = _hd_index(faregruppe)
+    return np.maximum(np.round(_K[hd] * W13), _MIN[hd])
+
+
+def QD_func(NEI, faregruppe=DEFAULT_FAREGRUPPE):
+    """Calculates regulatory safety distances."""
+    QD_syk, QD_bolig, QD_vei = (int(q) for q in qd_distances(NEI, faregruppe))
+    return QD_syk, QD_bolig, QD_vei
+
+
+def QD_array(NEI, faregruppe=DEFAULT_FAREGRUPPE):
+    """QD_func over an array of NEI values; returns (QD_syk, QD_bolig, QD_vei) arrays."""
+    qd = qd_distances(NEI, faregruppe)
+    return qd[..., 0], qd[..., 1], qd[..., 2]
+
+
+def inside_qd(avstand, kategori, QD):
+    """(B,) bool, True where a building of a KATEGORI_RING category is closer than its QD."""
+    avstand = np.asarray(avstand, dtype=float)
+    uniq, inverse = np.unique(np.asarray(kategori, dtype=object), return_inverse=True)
+    limit = np.array([QD[KATEGORI_RING[k]] if k in KATEGORI_RING else -np.inf for k in uniq])[inverse]
+    return avstand < limit
+
+
+def binding_qd(bx, by, kategori, sx, sy, NEI, faregruppe=DEFAULT_FAREGRUPPE):
+    """
+    The binding QD of every building for a facility with several sources.
+    Args:
+      bx, by     : (B,) building coordinates (EPSG:32633)
+      kategori   : (B,) building categories
+      sx, sy     : (S,) source coordinates
+      NEI        : (S,) NEI per source
+      faregruppe : (S,) hazard division per source, or one for all
+    Returns:
+      (avstand, QD, kilde), each (B,): distance to the binding source, its QD for the
+      building's ring and its index. The binding source is the one with the least
+      margin avstand - QD, so avstand < QD exactly when some source is violated.
+      Categories outside KATEGORI_RING get the nearest source and QD = nan.
+    """
+    bx, by = np.asarray(bx, dtype=float), np.asarray(by, dtype=float)
+    sx, sy = np.atleast_1d(np.asarray(sx, dtype=float)), np.atleast_1d(np.asarray(sy, dtype=float))
+    uniq, inverse = np.unique(np.asarray(kategori, dtype=object), return_inverse=True)
+    ring = np.array([KATEGORI_RING.get(k, -1) for k in uniq], dtype=int)[inverse]
+    qd = qd_distances(np.broadcast_to(NEI, sx.shape), np.broadcast_to(faregruppe, sx.shape))  # (S, 3)
+
+    D = np.hypot(bx[:, None] - sx[None, :], by[:, None] - sy[None, :])  # (B, S)
+    limit = qd[:, np.clip(ring, 0, 2)].T  # (B, S)
+    kilde = np.where(ring >= 0, np.argmin(D - limit, axis=1), np.argmin(D, axis=1))
+    rows = np.arange(len(bx))
+    QD = np.where(ring >= 0, limit[rows, kilde], np.nan)
+    return D[rows, kilde], QD, kilde
+
+
+def violation_counts(avstand, kategori, QD):
+    """
+    Buildings inside QD per category, counted the way pages/2_QD_Analyse.py does.
+    Args:
+      avstand  : (B,) distances to the facility (m)
+      kategori : (B,) building categories
+      QD       : (QD_syk, QD_bolig, QD_vei) as returned by QD_func
+    Returns:
+      dict category -> count, for the KATEGORI_RING categories and "skjermingsverdig"
+      (checked against QD_syk, but not counted as a QD violation).
+    """
+    avstand = np.asarray(avstand, dtype=float)
+    kategori = np.asarray(kategori, dtype=object)
+    inside = inside_qd(avstand, kategori, QD)
+    counts = {kat: int((inside & (kategori == kat)).sum()) for kat in KATEGORI_RING}
+    counts["skjermingsverdig"] = int(((kategori == "skjermingsverdig") & (avstand < QD[0])).sum())
+    return counts
+
+
+# QD_syk for the largest NEI in any hazard division: fetch radius that covers any input
+MAX_RADIUS = int(qd_distances(MAX_NEI, FAREGRUPPER)[:, 0].max())
@@ -0,0 +1,439 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 26 09:12:33 2026
+Lokal HTTP-tjeneste for QD/QRA-analyse uten Streamlit.
+
+Andre interne systemer (f.eks. saksbehandlingsverktøy) kan hente QD-resultater
+for et anlegg direkte:
+
+    POST /analyse   {"x": 262000, "y": 6650000, "nei": 10000, "faregruppe": "1.1",
+                     "margin": 0, "datakilde": "wfs", "qra": true, "veger": false,
+                     "format": "json"}
+    GET  /analyse?x=262000&y=6650000&nei=10000&format=geoparquet
+    GET  /helse
+    GET  /metrics   (samme register som metrics.py)
+
+Svaret er JSON med QD-avstander, antall brudd per kategori og bygningene (og
+"advarsel" for faregrupper med ukontrollerte QD-verdier, se qd_rules.py), eller
+bygningene som GeoParquet (krever pyarrow). Tjenesten bruker asyncio: like
+forespørsler som er under arbeid slås sammen til én beregning, og de CPU-tunge
+stegene kjøres i en prosesspool (bare koordinat- og kategoriarrays sendes dit).
+Hentingene går gjennom den delte flis-cachen i area_cache.py; antall samtidige
+HTTP-kall mot WFS/NVDB begrenses av flis-poolen der (area_cache.TILE_WORKERS).
+
+    python qd_service.py --port 8600
+    python qd_service.py --fake         # mot lokale stand-ins (benchmarks/fake_services.py)
+
+Miljøvariabler: FOXTROT_SERVICE_PORT, FOXTROT_SERVICE_WORKERS (0 = ingen
+prosesspool), FOXTROT_SERVICE_UPSTREAM (forespørsler i hentesteget samtidig).
+"""
+import argparse
+import asyncio
+import io
+import json
+import math
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qs
+
+import metrics
+from prefetch import plausible_utm33
+from qd_rules import QD_func, FAREGRUPPER, DEFAULT_FAREGRUPPE, MAX_NEI, unverified_warning
+
+SERVICE_PORT = int(os.environ.get("FOXTROT_SERVICE_PORT", 8600))
+SERVICE_WORKERS = int(os.environ.get("FOXTROT_SERVICE_WORKERS", min(4, os.cpu_count() or 1)))
+SERVICE_UPSTREAM = int(os.environ.get("FOXTROT_SERVICE_UPSTREAM", 4))
+MAX_BODY = 64 * 1024
+MAX_MARGIN = 5000  # m, same limit as the input page
+
+FORMATER = ("json", "geoparquet")
+DATAKILDER = ("wfs", "lokal")
+
+REQUEST_SECONDS = metrics.REGISTRY.register(metrics.Histogram(
+    "foxtrot_service_request_seconds", "Svartid for analysetjenesten.", ("status",), metrics.RERUN_BUCKETS))
+COALESCED = metrics.REGISTRY.register(metrics.Counter(
+    "foxtrot_service_coalesced", "Forespørsler som ventet på en lik beregning under arbeid."))
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def _bool(value):
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ("1", "true", "ja", "yes")
+
+
+def parse_request(params):
+    """
+    Validated analysis request from JSON or query parameters.
+    Returns (key, format): key is a hashable tuple
+    (x, y, nei, faregruppe, margin, datakilde, qra, veger) used to coalesce identical requests.
+    """
+    try:
+        x, y, nei = float(params["x"]), float(params["y"]), float(params["nei"])
+        margin = float(params.get("margin", 0))
+    except KeyError as err:
+        raise BadRequest(f"mangler parameter {err}") from None
+    except (TypeError, ValueError) as err:
+        raise BadRequest(f"ugyldig tall: {err}") from None
+    faregruppe = str(params.get("faregruppe", DEFAULT_FAREGRUPPE))
+    datakilde = str(params.get("datakilde", "wfs"))
+    fmt = str(params.get("format", "json"))
+
+    if not all(math.isfinite(v) for v in (x, y, nei, margin)):
+        raise BadRequest("x, y, nei og margin må være endelige tall")
+    if not plausible_utm33(x, y):
+        raise BadRequest("x/y er ikke en gyldig UTM33N-koordinat (EPSG:32633) i Norge")
+    if not 1 <= nei <= MAX_NEI:
+        raise BadRequest(f"nei må være mellom 1 og {MAX_NEI}")
+    if not 0 <= margin <= MAX_MARGIN:
+        raise BadRequest(f"margin må være mellom 0 og {MAX_MARGIN} m")
+    if faregruppe not in FAREGRUPPER:
+        raise BadRequest(f"ukjent faregruppe {faregruppe!r}, gyldige: {', '.join(FAREGRUPPER)}")
+    if datakilde not in DATAKILDER:
+        raise BadRequest(f"ukjent datakilde {datakilde!r}")
+    if fmt not in FORMATER:
+        raise BadRequest(f"ukjent format {fmt!r}")
+
+    key = (round(x, 2), round(y, 2), nei, faregruppe, margin, datakilde,
+           _bool(params.get("qra", False)), _bool(params.get("veger", False)))
+    return key, fmt
+
+
+def fetch(key):
+    """
+    Blocking, run on the fetch threads: buildings for a request from the shared tile
+    cache as plain arrays (x, y, bygningstype, kategori), and the road exposure summary
+    when requested (None otherwise). Only these arrays cross into the worker processes.
+    """
+    import numpy as np
+    from area_cache import get_buildings, get_roads
+    from get_matrikkel_data import clip_to_circle
+
+    x, y, nei, faregruppe, margin, datakilde, _, veger = key
+    QD_syk = QD_func(nei, faregruppe)[0]
+    r = QD_syk + margin
+    bbox = (x - r, y - r, x + r, y + r)
+    buildings = clip_to_circle(get_buildings(bbox, backend=datakilde), (x, y), QD_syk, margin)
+    if buildings.empty:
+        arrays = {"x": np.empty(0), "y": np.empty(0), "bygningstype": np.empty(0, dtype=object),
+                  "kategori": np.empty(0, dtype=object)}
+    else:
+        arrays = {
+            "x": buildings.geometry.x.to_numpy(dtype=float),
+            "y": buildings.geometry.y.to_numpy(dtype=float),
+            "bygningstype": buildings["bygningstype"].to_numpy(dtype=object),
+            "kategori": buildings["kategori"].to_numpy(dtype=object),
+        }
+
+    veg_summary = None
+    if veger:
+        from shapely.geometry import Point
+        from road_exposure import road_exposure
+        _, oppsummering = road_exposure(get_roads(bbox), Point(x, y), nei, faregruppe)
+        veg_summary = json.loads(oppsummering.to_json(orient="records", force_ascii=False))
+    return arrays, veg_summary
+
+
+def analyse(key, arrays):
+    """
+    CPU stage, run in the worker pool: distances, pressure, QD status and optionally QRA.
+    Returns (summary dict, dict of building columns sorted by distance).
+    """
+    import numpy as np
+    from blast_model import incident_pressure_array
+    from qd_rules import inside_qd, violation_counts
+
+    x, y, nei, faregruppe, margin, datakilde, qra, veger = key
+    QD = QD_func(nei, faregruppe)
+    avstand = np.hypot(arrays["x"] - x, arrays["y"] - y)
+    summary = {
+        "inndata": {"x": x, "y": y, "nei": nei, "faregruppe": faregruppe, "margin": margin, "datakilde": datakilde},
+        "qd": dict(zip(("syk", "bolig", "vei"), QD)),
+        "antall_bygninger": int(len(avstand)),
+        "brudd": violation_counts(avstand, arrays["kategori"], QD),
+    }
+    if unverified_warning(faregruppe):
+        summary["advarsel"] = unverified_warning(faregruppe)
+
+    order = np.argsort(avstand, kind="stable")
+    columns = {k: v[order] for k, v in arrays.items()}
+    columns["avstand_meter"] = avstand[order]
+    columns["trykk_kPa"] = incident_pressure_array(columns["avstand_meter"], nei)
+    columns["innenfor_qd"] = inside_qd(columns["avstand_meter"], columns["kategori"], QD)
+
+    if qra and len(avstand):
+        import pandas as pd
+        from qra import run_qra
+        table = pd.DataFrame({k: columns[k] for k in ("kategori", "avstand_meter", "trykk_kPa")})
+        result, summary["qra"] = run_qra(table, nei)
+        columns["p_død"] = result["p_død"].to_numpy()
+        columns["IR"] = result["IR"].to_numpy()
+    return summary, columns
+
+
+def to_json(summary, columns):
+    import pandas as pd
+
+    records = json.loads(pd.DataFrame(columns).to_json(orient="records", force_ascii=False)) \
+        if len(columns["x"]) else []
+    return json.dumps({**summary, "bygninger": records}, ensure_ascii=False).encode("utf-8")
+
+
+def to_geoparquet(summary, columns):
+    import geopandas as gpd
+
+    table = {k: v for k, v in columns.items() if k not in ("x", "y")}
+    buildings = gpd.GeoDataFrame(table, geometry=gpd.points_from_xy(columns["x"], columns["y"]), crs="EPSG:32633")
+    buf = io.BytesIO()
+    buildings.to_parquet(buf)
+    return buf.getvalue()
+
+
+class AnalysisService:
+    """
+    asyncio front for fetch/analyse with request coalescing. At most `upstream` requests
+    are in the fetch stage at once (the size of the fetch thread pool). The WFS/NVDB calls
+    themselves run on area_cache's shared tile pool, and its TILE_WORKERS threads are
+    the bound on concurrent HTTP calls, shared with the Streamlit pages in the process.
+    """
+
+    def __init__(self, workers=SERVICE_WORKERS, upstream=SERVICE_UPSTREAM):
+        self.upstream = upstream
+        self._io_pool = ThreadPoolExecutor(max_workers=upstream, thread_name_prefix="service-fetch")
+        # spawn: the parent has fetch and cache threads running, which fork does not handle safely
+        self._cpu_pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) \
+            if workers > 0 else None
+        self._inflight = {}  # key -> asyncio.Future
+        self.stats = {"forespørsler": 0, "sammenslått": 0, "beregninger": 0}
+
+    async def run(self, key):
+        """Summary and buildings for key; identical requests in flight share one computation."""
+        self.stats["forespørsler"] += 1
+        fut = self._inflight.get(key)
+        if fut is not None:
+            self.stats["sammenslått"] += 1
+            COALESCED.inc()
+            return await asyncio.shield(fut)
+
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+        try:
+            result = await self._compute(key)
+        except Exception as err:
+            fut.set_exception(err)
+            fut.exception()  # mark retrieved when nobody else is waiting
+            raise
+        else:
+            fut.set_result(result)
+            return result
+        finally:
+            del self._inflight[key]
+
+    async def _compute(self, key):
+        loop = asyncio.get_running_loop()
+        self.stats["beregninger"] += 1
+        arrays, veg_summary = await loop.run_in_executor(self._io_pool, fetch, key)
+        summary, columns = await loop.run_in_executor(self._cpu_pool, analyse, key, arrays)
+        if veg_summary is not None:
+            summary["veger"] = veg_summary
+        return summary, columns
+
+    def shutdown(self):
+        self._io_pool.shutdown(wait=False, cancel_futures=True)
+        if self._cpu_pool is not None:
+            self._cpu_pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def _read_request(reader):
+    request_line = (await reader.readline()).decode("latin-1").strip()
+    if not request_line:
+        return None
+    parts = request_line.split(" ")
+    if len(parts) != 3:
+        raise BadRequest("ugyldig forespørselslinje")
+    method, target, _ = parts
+    headers = {}
+    while True:
+        line = (await reader.readline()).decode("latin-1").strip()
+        if not line:
+            break
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get("content-length", 0))
+    except ValueError:
+        raise BadRequest("ugyldig Content-Length") from None
+    if length < 0 or length > MAX_BODY:
+        raise BadRequest("for stor forespørsel")
+    body = await reader.readexactly(length) if length else b""
+    return method, target, body
+
+
+async def _send(writer, status, body, content_type):
+    reason = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+              500: "Internal Server Error", 501: "Not Implemented", 502: "Bad Gateway"}.get(status, "")
+    head = (f"HTTP/1.1 {status} {reason}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n")
+    writer.write(head.encode("latin-1") + body)
+    await writer.drain()
+
+
+def _error(message):
+    return json.dumps({"feil": message}, ensure_ascii=False).encode("utf-8")
+
+
+async def handle(service, reader, writer):
+    t0 = time.perf_counter()
+    status = 500
+    try:
+        try:
+            request = await _read_request(reader)
+            if request is None:
+                return
+            method, target, body = request
+            url = urlsplit(target)
+
+            if url.path == "/helse":
+                status = 200
+                return await _send(writer, 200, json.dumps(service.stats, ensure_ascii=False).encode("utf-8"),
+                                   "application/json")
+            if url.path == "/metrics":
+                status = 200
+                return await _send(writer, 200, metrics.REGISTRY.render().encode("utf-8"),
+                                   "text/plain; version=0.0.4; charset=utf-8")
+            if url.path != "/analyse":
+                status = 404
+                return await _send(writer, 404, _error("ukjent sti"), "application/json")
+
+            if method == "GET":
+                params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            elif method == "POST":
+                try:
+                    params = json.loads(body or b"{}")
+                except ValueError:
+                    raise BadRequest("ugyldig JSON") from None
+            else:
+                status = 405
+                return await _send(writer, 405, _error("bruk GET eller POST"), "application/json")
+
+            key, fmt = parse_request(params)
+            summary, columns = await service.run(key)
+            if fmt == "geoparquet":
+                try:
+                    payload = to_geoparquet(summary, columns)
+                except ImportError as err:
+                    status = 501
+                    return await _send(writer, 501, _error(f"GeoParquet er ikke tilgjengelig: {err}"),
+                                       "application/json")
+                status = 200
+                return await _send(writer, 200, payload, "application/vnd.apache.parquet")
+            status = 200
+            await _send(writer, 200, to_json(summary, columns), "application/json")
+        except BadRequest as err:
+            status = 400
+            await _send(writer, 400, _error(str(err)), "application/json")
+        except Exception as err:
+            print("Error in analysis service:", repr(err))
+            status = 500
+            await _send(writer, 500, _error(f"{type(err).__name__}: {err}"), "application/json")
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        REQUEST_SECONDS.observe(time.perf_counter() - t0, status=status)
+        writer.close()
+
+
+async def serve(host="127.0.0.1", port=SERVICE_PORT, service=None, started=None):
+    """Runs the service until cancelled; started(server) is called once it is listening."""
+    service = service or AnalysisService()
+    server = await asyncio.start_server(lambda r, w: handle(service, r, w), host, port)
+    if started is not None:
+        started(server)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.shutdown()
+
+
+class _ThreadedService:
+    def __init__(self, loop, server, thread):
+        self._loop = loop
+        self._server = server
+        self._thread = thread
+        host, port = server.sockets[0].getsockname()[:2]
+        self.base_url = f"http://{host}:{port}"
+
+    def shutdown(self):
+        self._loop.call_soon_threadsafe(self._server.close)
+        self._thread.join(timeout=5)
+
+
+def serve_in_thread(port=0, **kwargs):
+    """
+    Starts the service on its own event loop in a daemon thread (port=0 picks a free port).
+    Keyword arguments go to AnalysisService. Returns an object with base_url and shutdown().
+    """
+    ready = threading.Event()
+    box = {}
+
+    def run():
+        loop = asyncio.new_event_loop()
+        box["loop"] = loop
+
+        def started(server):
+            box["server"] = server
+            ready.set()
+
+        try:
+            loop.run_until_complete(serve(port=port, service=AnalysisService(**kwargs), started=started))
+        except asyncio.CancelledError:
+            pass
+        finally:
+            ready.set()
+            loop.close()
+
+    thread = threading.Thread(target=run, daemon=True, name="qd-service")
+    thread.start()
+    ready.wait()
+    if "server" not in box:
+        raise RuntimeError("analysis service failed to start")
+    return _ThreadedService(box["loop"], box["server"], thread)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lokal HTTP-tjeneste for QD/QRA-analyse.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=SERVICE_PORT)
+    parser.add_argument("--workers", type=int, default=SERVICE_WORKERS, help="prosesser for CPU-steg (0 = ingen)")
+    parser.add_argument("--upstream", type=int, default=SERVICE_UPSTREAM,
+                        help="forespørsler i hentesteget samtidig (HTTP-kallene begrenses av area_cache.TILE_WORKERS)")
+    parser.add_argument("--fake", action="store_true",
+                        help="start lokale stand-ins for WFS og NVDB (benchmarks/fake_services.py) og bruk dem")
+    args = parser.parse_args()
+
+    if args.fake:
+        import get_matrikkel_data
+        import get_veg_data
+        from benchmarks.fake_services import serve_in_thread as serve_fake
+        fake = serve_fake()
+        get_matrikkel_data.WFS_URL = fake.base_url + "/wfs"
+        get_veg_data.NVDB_API_URL = fake.base_url + "/nvdb"
+        print(f"Stand-ins for WFS og NVDB på {fake.base_url}")
+
+    service = AnalysisService(workers=args.workers, upstream=args.upstream)
+    print(f"Analysetjeneste på http://{args.host}:{args.port}/analyse")
+    try:
+        asyncio.run(serve(args.host, args.port, service))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 16:03:55 2026
+Kvantitativ risikoanalyse (QRA) for utvalgte bygninger.
+
+Trykk og impuls fra blast_model gjøres om til sannsynlighet for omkomne via
+probitfunksjoner, og kombineres med eksplosjonsfrekvens og oppholdsfaktorer per
+kategori. Alt regnes som hele numpy-arrays, uten Python-løkker per bygning.
+"""
+import numpy as np
+import pandas as pd
+
+from blast_model import incident_pressure_array, incident_impulse_array
+import timing
+
+try:
+    from scipy.special import ndtr as _norm_cdf
+except ImportError:
+    def _norm_cdf(x):
+        """Standard normal CDF (Abramowitz & Stegun 7.1.26, |error| < 1.5e-7)."""
+        x = np.asarray(x, dtype=float)
+        z = np.abs(x) / np.sqrt(2)
+        t = 1 / (1 + 0.3275911 * z)
+        poly = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+        erfc = poly * np.exp(-z * z)
+        return np.where(x >= 0, 1 - 0.5 * erfc, 0.5 * erfc)
+
+# Probit functions, Ps in Pa and i in Pa-s.
+#   "trykk":        Y = a + b ln(Ps)
+#   "trykk-impuls": Y = a - b ln(c1/Ps + c2/(Ps i))
+#   "P-I":          Y = a - b ln((c1/Ps)^e1 + (c2/i)^e2)
+# "faktor" is the fraction of the probit outcome that is fatal.
+PROBITS = {
+    "Bygningskollaps (TNO)": {"type": "P-I", "a": 5.0, "b": 0.22, "c1": 40000, "e1": 7.4, "c2": 460, "e2": 11.3, "faktor": 1.0},
+    "Lungeskade (Eisenberg)": {"type": "trykk", "a": -77.1, "b": 6.91, "faktor": 1.0},
+    "Hodeskade (TNO)": {"type": "trykk-impuls", "a": 5.0, "b": 8.49, "c1": 2430, "c2": 4.0e8, "faktor": 1.0},
+    "Kroppsforflytning (TNO)": {"type": "trykk-impuls", "a": 5.0, "b": 2.44, "c1": 7380, "c2": 1.3e9, "faktor": 1.0},
+}
+DEFAULT_PROBIT = "Bygningskollaps (TNO)"
+
+DEFAULT_FREKVENS = 1e-5  # explosions per year
+
+# Presence (fraction of time a person is in the building) and persons per building
+DEFAULT_KATEGORI_PARAMETERE = pd.DataFrame(
+    {
+        "opphold": [0.5, 0.7, 0.25, 0.25, 0.05],
+        "personer": [20.0, 2.5, 5.0, 2.0, 0.0],
+    },
+    index=pd.Index(["sårbar", "bolig", "vei/industri", "skjermingsverdig", "ingen beskyttelse"], name="kategori"),
+)
+
+
+def probit_value(Ps, i, probit):
+    """Probit Y for arrays of incident pressure Ps (Pa) and impulse i (Pa-s)."""
+    Ps = np.asarray(Ps, dtype=float)
+    i = np.asarray(i, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        if probit["type"] == "trykk":
+            return probit["a"] + probit["b"] * np.log(Ps)
+        if probit["type"] == "trykk-impuls":
+            return probit["a"] - probit["b"] * np.log(probit["c1"] / Ps + probit["c2"] / (Ps * i))
+        if probit["type"] == "P-I":
+            V = (probit["c1"] / Ps) ** probit["e1"] + (probit["c2"] / i) ** probit["e2"]
+            return probit["a"] - probit["b"] * np.log(V)
+    raise ValueError(f"Ukjent probittype: {probit['type']}")
+
+
+def fatality_probability(Ps, i, probit, shift=0.0):
+    """
+    Probability of fatality for arrays of Ps (Pa) and i (Pa-s). Zero where inputs are invalid.
+    shift is added to the probit value (broadcast), e.g. to sample probit uncertainty.
+    """
+    Y = probit_value(Ps, i, probit)
+    return np.nan_to_num(_norm_cdf(Y - 5 + shift), nan=0.0) * probit.get("faktor", 1.0)
+
+
+@timing.traced("run_qra")
+def run_qra(gdf, NEI, frekvens=DEFAULT_FREKVENS, probit=DEFAULT_PROBIT, kategori_parametere=None, personer=None,
+            opphold=None):
+    """
+    Individual and aggregate risk for the selected buildings.
+    Args:
+      gdf                 : buildings with "kategori", "avstand_meter" and (optionally) "trykk_kPa"
+      NEI                 : net explosive content (kg TNT eq)
+      frekvens            : explosion frequency (per year)
+      probit              : name in PROBITS or a probit dict
+      kategori_parametere : DataFrame indexed by kategori with "opphold" and "personer"
+      personer            : optional array of persons per building, overrides the category value
+      opphold             : optional array of presence per building, overrides the category value
+    Returns:
+      (result, summary)
+      result  : copy of gdf with trykk_kPa, impuls_Pa_s, p_død, IR (per year), opphold,
+                personer, forventet_døde (per explosion) and PLL (per year)
+      summary : dict with maks_IR, PLL, forventet_døde and eksponerte_personer
+    """
+    if isinstance(probit, str):
+        probit = PROBITS[probit]
+    params = DEFAULT_KATEGORI_PARAMETERE if kategori_parametere is None else kategori_parametere
+
+    result = gdf.copy()
+    D = result["avstand_meter"].to_numpy(dtype=float)
+    if "trykk_kPa" in result:
+        Ps = result["trykk_kPa"].to_numpy(dtype=float)
+    else:
+        Ps = incident_pressure_array(D, NEI)
+    i = incident_impulse_array(D, NEI)
+
+    p = fatality_probability(Ps * 1000, i, probit)
+    if opphold is None:
+        opphold = result["kategori"].map(params["opphold"]).fillna(0).to_numpy(dtype=float)
+    opphold = np.asarray(opphold, dtype=float)
+    if personer is None:
+        personer = result["kategori"].map(params["personer"]).fillna(0).to_numpy(dtype=float)
+    personer = np.asarray(personer, dtype=float)
+
+    result["trykk_kPa"] = Ps
+    result["impuls_Pa_s"] = i
+    result["p_død"] = p
+    result["IR"] = frekvens * p * opphold
+    result["opphold"] = opphold
+    result["personer"] = personer
+    result["forventet_døde"] = p * personer * opphold
+    result["PLL"] = frekvens * result["forventet_døde"]
+
+    summary = {
+        "maks_IR": float(result["IR"].max()) if len(result) else 0.0,
+        "PLL": float(result["PLL"].sum()),
+        "forventet_døde": float(result["forventet_døde"].sum()),
+        "eksponerte_personer": float((personer * opphold).sum()),
+    }
+    return result, summary
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 09:14:27 2026
+Stedsspesifikk individuell risiko (LSIR) på et regulært UTM33-grid, med
+konturer (f.eks. 1e-5, 1e-6 og 1e-7 per år) som polygoner for kartet.
+
+Gridet regnes ut i bånd av rader for å begrense minnebruken.
+"""
+import numpy as np
+import geopandas as gpd
+from shapely.geometry import Polygon
+
+from blast_model import incident_pressure_array, incident_impulse_array
+from qra import PROBITS, DEFAULT_PROBIT, fatality_probability
+
+try:
+    from contourpy import contour_generator, FillType
+except ImportError:
+    contour_generator = None
+
+DEFAULT_LEVELS = (1e-5, 1e-6, 1e-7)
+LEVEL_COLORS = {1e-5: "#b2182b", 1e-6: "#ef8a62", 1e-7: "#fddbc7"}
+
+
+def lsir_grid(sources, probit=DEFAULT_PROBIT, extent=2500.0, resolution=5.0, chunk_rows=256):
+    """
+    Location-specific individual risk on a regular grid.
+    Args:
+      sources    : list of (x, y, NEI, frekvens) in EPSG:32633; risks from all sources are summed
+      probit     : name in PROBITS or a probit dict
+      extent     : half-width (m) of the square grid around the first source
+      resolution : cell size (m)
+      chunk_rows : grid rows evaluated per chunk
+    Returns:
+      (xs, ys, ir) where ir[j, i] is the risk per year at (xs[i], ys[j]), float32.
+    """
+    if isinstance(probit, str):
+        probit = PROBITS[probit]
+
+    cx, cy = sources[0][0], sources[0][1]
+    xs = np.arange(cx - extent, cx + extent + resolution / 2, resolution)
+    ys = np.arange(cy - extent, cy + extent + resolution / 2, resolution)
+    ir = np.zeros((len(ys), len(xs)), dtype=np.float32)
+
+    for start in range(0, len(ys), chunk_rows):
+        yy = ys[start:start + chunk_rows, None]
+        for sx, sy, NEI, frekvens in sources:
+            D = np.hypot(xs[None, :] - sx, yy - sy)
+            Ps = incident_pressure_array(D, NEI) * 1000
+            i = incident_impulse_array(D, NEI)
+            ir[start:start + chunk_rows] += (frekvens * fatality_probability(Ps, i, probit)).astype(np.float32)
+
+    return xs, ys, ir
+
+
+def lsir_contours(xs, ys, ir, levels=DEFAULT_LEVELS):
+    """
+    Polygons of the areas where the risk is at or above each level.
+    Returns:
+      GeoDataFrame (EPSG:32633) with columns "nivå", "color" and geometry.
+    """
+    if contour_generator is None:
+        raise ImportError("Konturer krever pakken 'contourpy' (følger med matplotlib).")
+
+    with np.errstate(divide="ignore"):
+        z = np.log10(np.maximum(ir.astype(float), 1e-30))
+    cg = contour_generator(x=xs, y=ys, z=z, fill_type=FillType.OuterOffset)
+    top = z.max() + 1
+
+    rows = []
+    for level in sorted(levels):
+        lower = np.log10(level)
+        if lower >= top - 1:
+            continue
+        points, offsets = cg.filled(lower, top)
+        for pts, offs in zip(points, offsets):
+            rings = [pts[offs[k]:offs[k + 1]] for k in range(len(offs) - 1)]
+            rows.append({
+                "nivå": level,
+                "color": LEVEL_COLORS.get(level, "#999999"),
+                "geometry": Polygon(rings[0], rings[1:]),
+            })
+
+    if not rows:
+        return gpd.GeoDataFrame(columns=["nivå", "color", "geometry"], geometry="geometry", crs="EPSG:32633")
+    gdf = gpd.GeoDataFrame(rows, geometry="geometry", crs="EPSG:32633")
+    return gdf.dissolve(by="nivå", as_index=False, aggfunc="first")
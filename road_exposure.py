@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 15:10:18 2026
+Eksponering av veger (NVDB) innenfor QD-ringene.
+
+Alle vegsegmenter behandles samlet med shapely sine vektoriserte funksjoner;
+det er kun en løkke over de tre ringene.
+"""
+import numpy as np
+import pandas as pd
+import shapely
+
+from blast_model import incident_pressure_array
+from qd_rules import QD_func, DEFAULT_FAREGRUPPE
+import timing
+
+DEFAULT_SPEED = 50  # km/h when NVDB has no speed limit for the segment (conservative: more vehicles present)
+
+
+def numeric_column(df, column, default):
+    """Numeric column as a float array, with default for missing column or values."""
+    if column not in df:
+        return np.full(len(df), default, dtype=float)
+    return pd.to_numeric(df[column], errors="coerce").fillna(default).to_numpy(dtype=float)
+
+
+@timing.traced("road_exposure")
+def road_exposure(veg_gdf, anlegg_point, NEI, faregruppe=DEFAULT_FAREGRUPPE):
+    """
+    Intersects road segments with the QD rings around the facility.
+    Args:
+      veg_gdf      : road segments from get_veg_data (with ÅDT_total and Fartsgrense)
+      anlegg_point : shapely Point of the facility in EPSG:32633
+      NEI          : net explosive content (kg TNT eq)
+      faregruppe   : hazard division for the QD rules
+    Returns:
+      (segments, summary)
+      segments : one row per segment and ring it enters, with exposed length,
+                 minimum distance, maximum incident pressure and vehicles present
+      summary  : one row per ring with total length and traffic exposure
+                 (ÅDT x exposed length / speed, in vehicle hours per day)
+    """
+    QD_syk, QD_bolig, QD_vei = QD_func(NEI, faregruppe)
+    rings = {"QD_vei": QD_vei, "QD_bolig": QD_bolig, "QD_syk": QD_syk}
+
+    if veg_gdf is None or veg_gdf.empty:
+        return pd.DataFrame(), pd.DataFrame()
+
+    if veg_gdf.crs is not None and veg_gdf.crs.to_epsg() != 32633:
+        veg_gdf = veg_gdf.to_crs(epsg=32633)
+
+    geoms = np.asarray(veg_gdf.geometry.array)
+    adt = numeric_column(veg_gdf, "ÅDT_total", 0)
+    fart = numeric_column(veg_gdf, "Fartsgrense", DEFAULT_SPEED)
+    vegobj = veg_gdf["Vegobj_id"].to_numpy() if "Vegobj_id" in veg_gdf else np.arange(len(veg_gdf))
+
+    min_dist = shapely.distance(geoms, anlegg_point)
+    max_pressure = incident_pressure_array(min_dist, NEI)  # pressure falls with distance
+
+    segments = []
+    summary = []
+    for ring, radius in rings.items():
+        inside = np.flatnonzero(min_dist < radius)
+        disc = shapely.buffer(anlegg_point, radius, quad_segs=64)
+        length = shapely.length(shapely.intersection(geoms[inside], disc))
+        kjt_timer = adt[inside] * (length / 1000) / fart[inside]  # vehicle hours per day
+
+        segments.append(pd.DataFrame({
+            "Ring": ring,
+            "QD (m)": radius,
+            "Vegobj_id": vegobj[inside],
+            "ÅDT": adt[inside],
+            "Fartsgrense": fart[inside],
+            "Eksponert lengde (m)": length,
+            "Min. avstand (m)": min_dist[inside],
+            "Maks trykk (kPa)": max_pressure[inside],
+            "Kjøretøy til stede": kjt_timer / 24,
+        }))
+        summary.append({
+            "Ring": ring,
+            "QD (m)": radius,
+            "Antall segmenter": len(inside),
+            "Eksponert lengde (m)": float(length.sum()),
+            "Trafikkeksponering (kjt·t/døgn)": float(kjt_timer.sum()),
+            "Kjøretøy til stede": float(kjt_timer.sum() / 24),
+        })
+
+    return pd.concat(segments, ignore_index=True), pd.DataFrame(summary)
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Oct 21 13:52:36 2026
+Lokalisering av nye lagre: finn punktet i et tillatt område med færrest QD-brudd.
+
+Screeningen teller bygninger per kategori innenfor QD_syk/QD_bolig/QD_vei for alle
+kandidatpunkter samtidig med et romlig søketre (shapely STRtree) per kategori.
+Deretter forfines rutenettet rundt de beste cellene (grovt til fint).
+"""
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import shapely
+
+from qd_rules import QD_func, KATEGORI_RING, DEFAULT_FAREGRUPPE
+
+
+def candidate_grid(polygon, spacing, origin=None):
+    """(N, 2) grid points with the given spacing that fall inside polygon."""
+    minx, miny, maxx, maxy = polygon.bounds
+    ox, oy = origin if origin is not None else (minx + spacing / 2, miny + spacing / 2)
+    xs = np.arange(ox, maxx, spacing)
+    ys = np.arange(oy, maxy, spacing)
+    gx, gy = np.meshgrid(xs, ys)
+    gx, gy = gx.ravel(), gy.ravel()
+    inside = shapely.contains_xy(polygon, gx, gy)
+    return np.column_stack([gx[inside], gy[inside]])
+
+
+class SitingScreen:
+    """Spatial indexes of the exposed buildings, built once and queried for many candidates."""
+
+    def __init__(self, building_xy, kategori, NEI, faregruppe=DEFAULT_FAREGRUPPE):
+        building_xy = np.asarray(building_xy, dtype=float)
+        kategori = np.asarray(kategori)
+        qd = QD_func(NEI, faregruppe)
+        self.layers = {}
+        for cat, q in KATEGORI_RING.items():
+            xy = building_xy[kategori == cat]
+            self.layers[cat] = (shapely.STRtree(shapely.points(xy)), xy, qd[q])
+
+    def count(self, cand_xy):
+        """DataFrame with violations per category and in total for each candidate point."""
+        cand_xy = np.asarray(cand_xy, dtype=float).reshape(-1, 2)
+        points = shapely.points(cand_xy)
+        out = {"x": cand_xy[:, 0], "y": cand_xy[:, 1]}
+        for cat, (tree, xy, qd) in self.layers.items():
+            if len(xy) == 0 or len(cand_xy) == 0:
+                out[cat] = np.zeros(len(cand_xy), dtype=np.int64)
+                continue
+            c_idx, b_idx = tree.query(points, predicate="dwithin", distance=qd)
+            # dwithin is inclusive; a violation is strictly closer than QD
+            d = np.hypot(cand_xy[c_idx, 0] - xy[b_idx, 0], cand_xy[c_idx, 1] - xy[b_idx, 1])
+            out[cat] = np.bincount(c_idx[d < qd], minlength=len(cand_xy))
+        df = pd.DataFrame(out)
+        df["totalt"] = df[list(KATEGORI_RING)].sum(axis=1)
+        return df
+
+
+def _rank(df):
+    return df.sort_values(["totalt", "sårbar", "bolig", "vei/industri"], kind="stable")
+
+
+def optimize_siting(polygon, building_xy, kategori, NEI, spacing=100.0, levels=3, refine_top=10, shortlist=10,
+                    faregruppe=DEFAULT_FAREGRUPPE):
+    """
+    Coarse-to-fine search for the best location inside polygon.
+    Args:
+      polygon     : permitted area (shapely Polygon, EPSG:32633)
+      building_xy : (B, 2) building coordinates covering polygon + QD_syk
+      kategori    : (B,) building categories
+      NEI         : net explosive content (kg TNT eq)
+      spacing     : coarse grid spacing (m); each refinement level divides it by 4
+      levels      : number of grid levels including the coarse one
+      refine_top  : number of best cells refined at each level
+      shortlist   : number of locations returned
+      faregruppe  : hazard division for the QD rules
+    Returns:
+      (ranked, heatmap)
+      ranked  : DataFrame of the best candidate locations with violation counts
+      heatmap : GeoDataFrame of the coarse grid cells with violation counts
+    """
+    screen = SitingScreen(building_xy, kategori, NEI, faregruppe)
+
+    coarse = screen.count(candidate_grid(polygon, spacing))
+    heatmap = gpd.GeoDataFrame(
+        coarse,
+        geometry=shapely.box(*(coarse[["x", "y"]].to_numpy().T[[0, 1, 0, 1]]
+                               + np.array([-1, -1, 1, 1])[:, None] * spacing / 2)),
+        crs="EPSG:32633",
+    )
+
+    evaluated = coarse
+    step = spacing
+    offsets = np.arange(-2, 3)
+    for _ in range(levels - 1):
+        step /= 4
+        best = _rank(evaluated).head(refine_top)[["x", "y"]].to_numpy()
+        dx, dy = np.meshgrid(offsets * step, offsets * step)
+        cand = (best[:, None, :] + np.column_stack([dx.ravel(), dy.ravel()])[None, :, :]).reshape(-1, 2)
+        cand = cand[shapely.contains_xy(polygon, cand[:, 0], cand[:, 1])]
+        cand = np.unique(np.round(cand, 3), axis=0)
+        evaluated = pd.concat([evaluated, screen.count(cand)], ignore_index=True)
+        evaluated = evaluated.drop_duplicates(["x", "y"])
+
+    ranked = _rank(evaluated).head(shortlist).reset_index(drop=True)
+    ranked.insert(0, "Rangering", np.arange(1, len(ranked) + 1))
+    return ranked, heatmap
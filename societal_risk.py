@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 11:02:16 2026
+Samfunnsrisiko: personestimat per bygning og F–N-kurver.
+
+Personestimatet slås opp fra bygningstype (bygningskoder.py), med standardverdier
+per kodegruppe som kan overstyres per kode. Forventet antall omkomne regnes for
+alle scenarier x bygninger i batcher av hele arrays.
+"""
+import numpy as np
+import pandas as pd
+
+from blast_model import incident_pressure_array, incident_impulse_array
+from qra import PROBITS, DEFAULT_PROBIT, fatality_probability
+
+# Persons per building by code prefix; the longest matching prefix wins
+DEFAULT_PERSONER_GRUPPE = {
+    "1": 2.5, "14": 20.0, "15": 30.0, "16": 2.0, "17": 1.0, "18": 0.0,
+    "2": 10.0, "24": 1.0,
+    "3": 25.0, "32": 30.0, "33": 200.0,
+    "4": 20.0, "43": 0.0,
+    "5": 40.0,
+    "6": 100.0, "61": 80.0, "62": 150.0, "64": 20.0, "65": 50.0, "67": 30.0,
+    "7": 60.0,
+    "8": 10.0, "83": 0.0, "84": 0.0,
+    "9": 5.0,
+}
+
+# Per-code values where the group default is clearly off
+DEFAULT_PERSONER_KODE = {
+    "111": 2.5, "112": 3.5, "121": 5.0, "131": 8.0,
+    "143": 60.0, "146": 60.0,
+    "321": 300.0,
+    "412": 150.0,
+    "511": 150.0,
+    "611": 20.0, "612": 50.0, "613": 250.0, "614": 300.0, "615": 350.0, "616": 500.0,
+    "719": 300.0, "721": 80.0, "970": 400.0,
+}
+
+
+def estimate_population(bygningstype, overrides=None):
+    """
+    Persons per building from the building type codes.
+    Args:
+      bygningstype : array-like of building type codes
+      overrides    : optional {code: persons} taking precedence over the defaults
+    Returns:
+      float array of persons per building.
+    """
+    per_code = dict(DEFAULT_PERSONER_KODE)
+    if overrides:
+        per_code.update({str(k): float(v) for k, v in overrides.items()})
+
+    codes = pd.Series(bygningstype).astype(str).to_numpy()
+    uniq, inverse = np.unique(codes, return_inverse=True)
+
+    values = np.zeros(len(uniq))
+    for n, code in enumerate(uniq):  # once per distinct code, not per building
+        if code in per_code:
+            values[n] = per_code[code]
+        elif code[:2] in DEFAULT_PERSONER_GRUPPE:
+            values[n] = DEFAULT_PERSONER_GRUPPE[code[:2]]
+        else:
+            values[n] = DEFAULT_PERSONER_GRUPPE.get(code[:1], 0.0)
+    return values[inverse]
+
+
+def expected_fatalities(building_xy, personer, scenarios, probit=DEFAULT_PROBIT, max_elements=4_000_000):
+    """
+    Expected number of fatalities per scenario.
+    Args:
+      building_xy  : (B, 2) array of building coordinates (EPSG:32633)
+      personer     : (B,) persons present per building (persons x presence)
+      scenarios    : (S, 3+) array with columns x, y, NEI
+      probit       : name in PROBITS or a probit dict
+      max_elements : upper bound on scenarios x buildings evaluated per batch
+    Returns:
+      (S,) array of expected fatalities.
+    """
+    if isinstance(probit, str):
+        probit = PROBITS[probit]
+
+    building_xy = np.asarray(building_xy, dtype=float)
+    personer = np.asarray(personer, dtype=float)
+    scenarios = np.asarray(scenarios, dtype=float)
+    S = len(scenarios)
+    batch = max(1, max_elements // max(len(building_xy), 1))
+
+    N = np.zeros(S)
+    for s0 in range(0, S, batch):
+        sc = scenarios[s0:s0 + batch]
+        D = np.hypot(building_xy[None, :, 0] - sc[:, 0, None], building_xy[None, :, 1] - sc[:, 1, None])
+        NEI = sc[:, 2, None]
+        p = fatality_probability(incident_pressure_array(D, NEI) * 1000, incident_impulse_array(D, NEI), probit)
+        N[s0:s0 + batch] = p @ personer
+    return N
+
+
+def fn_curve(N, frekvens):
+    """
+    F–N curve from per-scenario fatalities and frequencies.
+    Returns:
+      (n, F) where F[k] is the frequency (per year) of n[k] or more fatalities, n descending.
+    """
+    N = np.asarray(N, dtype=float)
+    frekvens = np.broadcast_to(np.asarray(frekvens, dtype=float), N.shape)
+
+    order = np.argsort(-N, kind="stable")
+    n_sorted = N[order]
+    F = np.cumsum(frekvens[order])
+    # For tied N keep the last cumulative value, which includes all of them
+    keep = np.r_[n_sorted[1:] != n_sorted[:-1], True]
+    return n_sorted[keep], F[keep]
@@ -1,36 +1,28 @@
 # -*- coding: utf-8 -*-
 """
 Created on Tue Jan 20 12:44:45 2026
+Inngangen til appen: setter opp navigasjonen og tar tiden på hver kjøring.
+Startsiden ligger i Hjem.py.
 
 @author: KRHE
 """
 
 import streamlit as st
+from warmup import start_warmup
+import metrics
 
-st.set_page_config(
-    page_title="Hello",
-    page_icon="👋",
-    layout="wide",
-)
+# Import geopandas, folium, pyproj etc. in the background while the user reads the start page
+start_warmup()
 
-st.write("# Welcome to Streamlit! 👋")
+# Page file -> metric label (rerun time and session state size)
+sider = {st.Page("Hjem.py", title="Hello", icon="👋", default=True): "Hjem"}
+for side in ("1_Input", "2_QD_Analyse", "3_QRA_Seleksjon", "4_QRA_Parametere",
+             "5_QRA_Analyse", "6_tester", "7_Lokalisering"):
+    sider[st.Page(f"pages/{side}.py")] = side
 
-st.sidebar.success("Select a demo above.")
+pg = st.navigation(list(sider))
 
-st.markdown(
-    """
-    Streamlit is an open-source app framework built specifically for
-    Machine Learning and Data Science projects.
-    **👈 Select a demo from the sidebar** to see some examples
-    of what Streamlit can do!
-    ### Want to learn more?
-    - Check out [streamlit.io](https://streamlit.io)
-    - Jump into our [documentation](https://docs.streamlit.io)
-    - Ask a question in our [community
-        forums](https://discuss.streamlit.io)
-    ### See more complex demos
-    - Use a neural net to [analyze the Udacity Self-driving Car Image
-        Dataset](https://github.com/streamlit/demo-self-driving)
-    - Explore a [New York City rideshare dataset](https://github.com/streamlit/demo-uber-nyc-pickups)
-"""
-)
\ No newline at end of file
+# Every run is timed here, also runs that end in st.stop(), st.rerun(), st.switch_page()
+# or an error, since Streamlit ends those by raising through pg.run()
+with metrics.rerun_timer(sider[pg], st.session_state):
+    pg.run()
@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Oct 28 09:31:12 2026
+Terrengskjerming: siktlinje fra anlegget til hver bygning over en lokal DEM.
+
+Bygninger bak en rygg får ellers samme fritt-felt-trykk som bygninger i åpent
+lende. Her samples terrengprofilen fra anlegget til hver bygning, og bygningen
+flagges som skjermet når terrenget stikker over siktlinjen mellom ladningen og
+bygningen. Trykket for skjermede bygninger reduseres med en fast faktor. Dette er
+en screening, ikke en modell for diffraksjon over terreng; faktoren må vurderes
+faglig for hvert tilfelle.
+
+DEM-en leses aldri i sin helhet, bare vinduet rundt anlegget og bygningene:
+
+    dem.tif               GeoTIFF, nord-opp med kvadratiske celler, vindu lest
+                          med rasterio (valgfri avhengighet)
+    dem.npy + dem.json    numpy-array som minnemappes (np.load(mmap_mode="r")),
+                          json med origo (øvre venstre hjørne), celle og nodata
+
+En GeoTIFF kan konverteres til .npy-formatet én gang:
+    python terrain.py dem_10m.tif dem_10m.npy
+
+Alle profilene samples som én array-operasjon (bygninger x punkter langs
+profilen, med steg lik cellestørrelsen), i blokker av bygninger for å begrense
+minnebruken. Terrengceller nærmere enn én celle fra anlegget eller bygningen (deres
+egen grunn) teller ikke som hindring.
+
+Siden velger bare blant DEM-filer i en konfigurert mappe (FOXTROT_DEM_DIR, ellers
+mappen til FOXTROT_DEM_PATH), slik at brukere ikke kan få serveren til å åpne
+vilkårlige stier.
+"""
+import argparse
+import json
+import os
+from functools import lru_cache
+
+import numpy as np
+
+DEM_PATH = os.environ.get("FOXTROT_DEM_PATH")
+DEM_DIR = os.environ.get("FOXTROT_DEM_DIR") or (os.path.dirname(os.path.abspath(DEM_PATH)) if DEM_PATH else None)
+DEM_SUFFIXES = (".npy", ".tif", ".tiff")
+DEFAULT_REDUKSJON = 0.5          # pressure factor for shielded buildings
+DEFAULT_LADNINGSHOYDE = 1.0      # m above ground at the facility
+DEFAULT_BYGNINGSHOYDE = 2.0      # m above ground at the building
+MAX_ELEMENTS = 4_000_000         # profile samples per block
+
+
+class Dem:
+    """North-up height grid: z[row, col] with the upper left corner of cell (0, 0) at (x0, y0)."""
+
+    def __init__(self, z, x0, y0, cell, nodata=None):
+        self.z = z
+        self.x0 = float(x0)
+        self.y0 = float(y0)
+        self.cell = float(cell)
+        self.nodata = nodata
+
+    @property
+    def bounds(self):
+        rows, cols = self.z.shape
+        return (self.x0, self.y0 - rows * self.cell, self.x0 + cols * self.cell, self.y0)
+
+    def window(self, bbox):
+        """
+        float32 copy of the cells covering bbox (nodata as nan). With a memory-mapped
+        z only the rows of the window are read from disk.
+        """
+        minx, miny, maxx, maxy = bbox
+        rows, cols = self.z.shape
+        c0 = max(int(np.floor((minx - self.x0) / self.cell)), 0)
+        c1 = min(int(np.ceil((maxx - self.x0) / self.cell)), cols)
+        r0 = max(int(np.floor((self.y0 - maxy) / self.cell)), 0)
+        r1 = min(int(np.ceil((self.y0 - miny) / self.cell)), rows)
+        z = np.array(self.z[r0:max(r0, r1), c0:max(c0, c1)], dtype=np.float32)
+        if self.nodata is not None:
+            z[z == self.nodata] = np.nan
+        return Dem(z, self.x0 + c0 * self.cell, self.y0 - r0 * self.cell, self.cell)
+
+    def sample(self, x, y):
+        """Heights at (x, y) (nearest cell), nan outside the grid or on nodata."""
+        x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+        col = np.floor((np.atleast_1d(x) - self.x0) / self.cell).astype(np.int64)
+        row = np.floor((self.y0 - np.atleast_1d(y)) / self.cell).astype(np.int64)
+        rows, cols = self.z.shape
+        inside = (row >= 0) & (row < rows) & (col >= 0) & (col < cols)
+        out = np.full(col.shape, np.nan, dtype=np.float32)
+        out[inside] = self.z[row[inside], col[inside]]
+        if self.nodata is not None:
+            out[out == self.nodata] = np.nan
+        return out.reshape(np.shape(x))
+
+
+@lru_cache(maxsize=4)
+def _open_npy(path):
+    with open(os.path.splitext(path)[0] + ".json", encoding="utf-8") as f:
+        meta = json.load(f)
+    z = np.load(path, mmap_mode="r")
+    return Dem(z, meta["origo"][0], meta["origo"][1], meta["celle"], meta.get("nodata"))
+
+
+def _read_geotiff(path, bbox):
+    try:
+        import rasterio
+        from rasterio.windows import Window, from_bounds
+    except ImportError:
+        raise ImportError("rasterio er ikke installert. Installer med: pip install rasterio, "
+                          "eller konverter DEM-en til .npy med terrain.py.") from None
+
+    with rasterio.open(path) as ds:
+        if ds.transform.b != 0 or ds.transform.d != 0 or ds.transform.e >= 0:
+            raise ValueError("DEM-en må være nord-opp uten rotasjon.")
+        win = from_bounds(*bbox, transform=ds.transform).round_offsets("floor").round_lengths("ceil")
+        win = win.intersection(Window(0, 0, ds.width, ds.height))
+        z = ds.read(1, window=win, out_dtype="float32")
+        x0, y0 = ds.window_transform(win) * (0, 0)
+        nodata, cell = ds.nodata, ds.res[0]
+    if nodata is not None:
+        z[z == nodata] = np.nan
+    return Dem(z, x0, y0, cell)
+
+
+def available_dems(directory=DEM_DIR):
+    """Sorted file names of the DEMs (GeoTIFF or .npy) in the configured directory."""
+    if not directory or not os.path.isdir(directory):
+        return []
+    return sorted(f for f in os.listdir(directory)
+                  if f.lower().endswith(DEM_SUFFIXES) and os.path.isfile(os.path.join(directory, f)))
+
+
+def dem_path(name, directory=DEM_DIR):
+    """Full path of a DEM listed by available_dems; ValueError for any other name."""
+    if name not in available_dems(directory):
+        raise ValueError(f"Ukjent DEM: {name!r}")
+    return os.path.join(directory, name)
+
+
+def load_dem(path, bbox):
+    """Window of the DEM at path (GeoTIFF or .npy) covering bbox, as a Dem."""
+    if path.lower().endswith(".npy"):
+        return _open_npy(path).window(bbox)
+    return _read_geotiff(path, bbox)
+
+
+def line_of_sight(dem, source_xy, target_xy, source_height=DEFAULT_LADNINGSHOYDE,
+                  target_height=DEFAULT_BYGNINGSHOYDE, clearance=0.0, max_elements=MAX_ELEMENTS):
+    """
+    Terrain obstruction between one source and many targets.
+    Args:
+      dem           : Dem covering the source and all targets
+      source_xy     : (x, y) of the facility (EPSG:32633)
+      target_xy     : (B, 2) building coordinates
+      source_height : charge height above ground (m)
+      target_height : height above ground of the point on the building (m)
+      clearance     : terrain must rise this much (m) above the sight line to count
+      max_elements  : profile samples evaluated per block of buildings
+    Returns:
+      (obstructed, hindring): (B,) bool and (B,) float32, the largest height (m) of the
+      terrain above the sight line (negative when the line is clear). Samples closer
+      than one cell to the source or the target, outside the DEM or on nodata never
+      obstruct.
+    """
+    target_xy = np.asarray(target_xy, dtype=float).reshape(-1, 2)
+    sx, sy = source_xy
+    dx, dy = target_xy[:, 0] - sx, target_xy[:, 1] - sy
+    dist = np.hypot(dx, dy)
+    B = len(dist)
+    hindring = np.full(B, -np.inf, dtype=np.float32)
+    if B == 0:
+        return np.zeros(0, dtype=bool), hindring
+
+    zs = dem.sample(sx, sy) + source_height
+    zt = dem.sample(target_xy[:, 0], target_xy[:, 1]) + target_height
+
+    # Samples one cell apart, none closer than one cell to either end (the structures' own ground)
+    step = dem.cell
+    n = max(int(np.ceil(dist.max() / step)) - 1, 1)
+    d = step * np.arange(1, n + 1, dtype=np.float32)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ux, uy = np.where(dist > 0, dx / dist, 0), np.where(dist > 0, dy / dist, 0)
+
+    order = np.argsort(dist)  # similar lengths per block, so few samples are masked away
+    block = max(1, max_elements // n)
+    for start in range(0, B, block):
+        idx = order[start:start + block]
+        # Only as many samples as the longest profile in the block needs
+        k = min(n, max(int(np.ceil(dist[idx].max() / step)) - 1, 1))
+        dk = d[:k]
+        px = sx + ux[idx, None] * dk[None, :]
+        py = sy + uy[idx, None] * dk[None, :]
+        terreng = dem.sample(px, py)
+        with np.errstate(divide="ignore", invalid="ignore"):  # buildings at the charge itself
+            linje = zs + dk[None, :] / dist[idx, None] * (zt[idx, None] - zs)
+            over = np.where(dk[None, :] <= dist[idx, None] - step, terreng - linje, -np.inf)
+        hindring[idx] = np.max(np.where(np.isnan(over), -np.inf, over), axis=1)
+
+    with np.errstate(invalid="ignore"):
+        obstructed = np.isfinite(zt) & np.isfinite(zs) & (hindring > clearance)
+    return obstructed, hindring
+
+
+def shielded_pressure(trykk, obstructed, reduksjon=DEFAULT_REDUKSJON):
+    """Incident pressure with shielded buildings scaled by reduksjon (0-1)."""
+    trykk = np.asarray(trykk, dtype=float)
+    return np.where(obstructed, trykk * reduksjon, trykk)
+
+
+def terrain_screening(source_xy, target_xy, path=None, margin=None, **kwargs):
+    """
+    Loads the DEM window around the facility and buildings and runs line_of_sight.
+    Keyword arguments go to line_of_sight. Returns (obstructed, hindring).
+    """
+    path = path or DEM_PATH
+    if not path:
+        raise ValueError("Ingen DEM angitt (sett FOXTROT_DEM_PATH eller oppgi en sti).")
+    target_xy = np.asarray(target_xy, dtype=float).reshape(-1, 2)
+    xs = np.append(target_xy[:, 0], source_xy[0])
+    ys = np.append(target_xy[:, 1], source_xy[1])
+    margin = 50.0 if margin is None else margin
+    dem = load_dem(path, (xs.min() - margin, ys.min() - margin, xs.max() + margin, ys.max() + margin))
+    return line_of_sight(dem, source_xy, target_xy, **kwargs)
+
+
+def convert_geotiff(source, target):
+    """Writes a GeoTIFF DEM as target (.npy) plus the .json sidecar used by load_dem."""
+    import rasterio
+
+    with rasterio.open(source) as ds:
+        if ds.transform.b != 0 or ds.transform.d != 0 or ds.transform.e >= 0:
+            raise ValueError("DEM-en må være nord-opp uten rotasjon.")
+        out = np.lib.format.open_memmap(target, mode="w+", dtype=np.float32, shape=(ds.height, ds.width))
+        # Block rows at a time, so the raster is never held in memory as a whole
+        for _, win in ds.block_windows(1):
+            out[win.row_off:win.row_off + win.height, win.col_off:win.col_off + win.width] = \
+                ds.read(1, window=win, out_dtype="float32")
+        out.flush()
+        meta = {"origo": [ds.transform.c, ds.transform.f], "celle": ds.res[0], "nodata": ds.nodata,
+                "crs": ds.crs.to_string() if ds.crs else None}
+    with open(os.path.splitext(target)[0] + ".json", "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Konverter en DEM (GeoTIFF) til minnemappbar .npy.")
+    parser.add_argument("kilde", help="GeoTIFF, nord-opp, EPSG:32633")
+    parser.add_argument("maal", help="Utfil (.npy); en .json med origo og cellestørrelse skrives ved siden av")
+    args = parser.parse_args()
+    convert_geotiff(args.kilde, args.maal)
+    print(f"Skrev {args.maal}")
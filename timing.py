@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 23 09:48:12 2026
+Tidsmåling per steg i beregningskjeden (spans).
+
+    with timing.span("classify", rows_in=len(gdf)) as s:
+        gdf = classify_buildings(gdf)
+        s.rows_out = len(gdf)
+
+Hvert span logges som én JSON-linje (varighet, rader inn/ut, bytes) og samles per
+kjøring, slik at de kan vises i sidepanelet. Hver side som lager spans starter en
+kjøring med start_run; arbeid som sendes til trådpooler pakkes med bind(), slik at
+spans i pooltrådene havner i kjøringen som startet dem. Spans uten aktiv kjøring
+forkastes.
+Måling slås på med FOXTROT_TIMING=1; når den er av returnerer span() et felles
+tomt objekt, så kostnaden er ett funksjonskall og én if.
+"""
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from functools import wraps
+
+_enabled = os.environ.get("FOXTROT_TIMING", "0") == "1"
+LOG_PATH = os.environ.get("FOXTROT_TIMING_LOG", "timing.jsonl")
+
+_current_run = contextvars.ContextVar("foxtrot_timing_run", default=None)
+_log_lock = threading.Lock()
+
+
+def enabled():
+    return _enabled
+
+
+def set_enabled(value):
+    global _enabled
+    _enabled = bool(value)
+
+
+class Span:
+    __slots__ = ("name", "rows_in", "rows_out", "bytes", "attrs", "start", "ms", "_t0")
+
+    def __init__(self, name, rows_in=None, **attrs):
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.bytes = None
+        self.attrs = attrs
+
+    def __enter__(self):
+        self.start = time.time()
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.ms = (time.perf_counter() - self._t0) * 1000
+        _record(self, error=exc_type.__name__ if exc_type else None)
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+    name = rows_in = rows_out = bytes = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def __setattr__(self, key, value):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+def span(name, rows_in=None, **attrs):
+    """Context manager timing one stage; set rows_out and bytes on it inside the block."""
+    if not _enabled:
+        return _NOOP
+    return Span(name, rows_in, **attrs)
+
+
+def traced(name):
+    """
+    Decorator timing every call of a function as a span. rows_in and rows_out are
+    the row counts of the first argument and the result when they are tables or arrays.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with Span(name, _rows(args[0]) if args else None) as s:
+                out = fn(*args, **kwargs)
+                s.rows_out = _rows(out)
+                return out
+        return wrapper
+    return decorator
+
+
+def _rows(obj):
+    shape = getattr(obj, "shape", None)
+    return int(shape[0]) if shape else None
+
+
+class Run:
+    """Spans recorded in one script run of a page."""
+
+    def __init__(self, side):
+        self.id = uuid.uuid4().hex[:8]
+        self.side = side
+        self.spans = []
+        self.start = time.time()
+        self._t0 = time.perf_counter()
+
+
+def start_run(side):
+    """
+    Starts collecting spans for this page run. Call it at the top of every page that
+    emits spans: Streamlit reuses script threads, so without it a page would inherit
+    the run of whatever page ran before it in the thread.
+    """
+    run = Run(side) if _enabled else None
+    _current_run.set(run)
+    return run
+
+
+def bind(fn):
+    """
+    fn wrapped to run under the caller's current run, for work submitted to a thread
+    pool (pool threads do not inherit the caller's context). Returns fn unchanged when
+    timing is disabled or no run is active.
+    """
+    run = _current_run.get()
+    if not _enabled or run is None:
+        return fn
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        token = _current_run.set(run)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _current_run.reset(token)
+    return wrapper
+
+
+def _record(s, error=None):
+    run = _current_run.get()
+    if run is None:
+        return  # no page run to attribute it to (e.g. the analysis service or an unbound pool thread)
+    row = {
+        "run": run.id,
+        "side": run.side,
+        "span": s.name,
+        "start": round(s.start, 3),
+        "ms": round(s.ms, 3),
+        "rows_in": s.rows_in,
+        "rows_out": s.rows_out,
+        "bytes": s.bytes,
+        "thread": threading.current_thread().name,
+    }
+    if error:
+        row["error"] = error
+    if s.attrs:
+        row.update(s.attrs)
+    run.spans.append(row)
+    line = json.dumps(row, ensure_ascii=False, default=str)
+    with _log_lock:
+        with open(LOG_PATH, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+def render_panel(run=None):
+    """Shows the spans of the current run in the sidebar; does nothing when timing is disabled."""
+    run = run or _current_run.get()
+    if not _enabled or run is None:
+        return
+    import streamlit as st
+    import pandas as pd
+
+    total_ms = (time.perf_counter() - run._t0) * 1000
+    with st.sidebar.expander(f"Ytelse ({total_ms:.0f} ms)", expanded=False):
+        if not run.spans:
+            st.caption("Ingen målte steg i denne kjøringen.")
+            return
+        df = pd.DataFrame(run.spans)[["span", "ms", "rows_in", "rows_out", "bytes"]]
+        st.dataframe(df, hide_index=True, width="stretch")
+        st.caption(f"Kjøring {run.id}, logget til {LOG_PATH}")
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Oct 21 09:31:45 2026
+Risiko for trafikanter på vegsegmenter fra NVDB (ÅDT og fartsgrense).
+
+Vegsegmentene deles i korte biter, og avstand, trykk og dødssannsynlighet for
+hver bit regnes vektorisert for alle biter og scenarier. Forventet antall
+kjøretøy på en bit er ÅDT x lengde / fart.
+"""
+import numpy as np
+import shapely
+
+from blast_model import incident_pressure_array, incident_impulse_array
+from qra import PROBITS, DEFAULT_PROBIT, fatality_probability
+from road_exposure import numeric_column, DEFAULT_SPEED
+import timing
+
+DEFAULT_PIECE_LENGTH = 10.0  # m
+PERSONER_PER_KJORETOY = 1.5
+
+
+def discretize_segments(geoms, piece_length=DEFAULT_PIECE_LENGTH):
+    """
+    Splits line geometries into pieces of at most piece_length, without a loop per segment.
+    Returns:
+      (segment index, midpoint of each piece, piece length)
+    """
+    geoms = np.asarray(geoms)
+    lengths = shapely.length(geoms)
+    n = np.maximum(np.ceil(lengths / piece_length).astype(np.int64), 1)
+    seg = np.repeat(np.arange(len(geoms)), n)
+    k = np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)  # piece number within its segment
+    midpoints = shapely.line_interpolate_point(geoms[seg], (k + 0.5) / n[seg], normalized=True)
+    return seg, midpoints, lengths[seg] / n[seg]
+
+
+@timing.traced("traffic_risk")
+def traffic_risk(veg_gdf, scenarios, probit=DEFAULT_PROBIT, piece_length=DEFAULT_PIECE_LENGTH,
+                 personer_per_kjoretoy=PERSONER_PER_KJORETOY, max_elements=4_000_000):
+    """
+    Fatality risk for road users.
+    Args:
+      veg_gdf      : road segments from get_veg_data (ÅDT_total, Fartsgrense)
+      scenarios    : (S, 4) array with columns x, y, NEI, frekvens (EPSG:32633)
+      probit       : name in PROBITS or a probit dict
+      piece_length : length (m) of the road pieces
+    Returns:
+      (pieces, N, summary)
+      pieces  : GeoDataFrame of piece midpoints with vehicles present, location-specific
+                IR (per year) and expected fatalities per year
+      N       : (S,) expected road-user fatalities per scenario (for F–N)
+      summary : dict with maks_IR and PLL for road users
+    """
+    import geopandas as gpd  # not needed to import the page that calls this
+
+    if isinstance(probit, str):
+        probit = PROBITS[probit]
+    scenarios = np.asarray(scenarios, dtype=float)
+
+    if veg_gdf is None or veg_gdf.empty:
+        return gpd.GeoDataFrame(), np.zeros(len(scenarios)), {"maks_IR": 0.0, "PLL": 0.0}
+    if veg_gdf.crs is not None and veg_gdf.crs.to_epsg() != 32633:
+        veg_gdf = veg_gdf.to_crs(epsg=32633)
+
+    adt = numeric_column(veg_gdf, "ÅDT_total", 0)
+    fart = numeric_column(veg_gdf, "Fartsgrense", DEFAULT_SPEED)
+    seg, midpoints, piece_len = discretize_segments(np.asarray(veg_gdf.geometry.array), piece_length)
+    xy = shapely.get_coordinates(midpoints)
+
+    kjoretoy = adt[seg] * (piece_len / 1000) / fart[seg] / 24  # expected vehicles on the piece
+    personer = kjoretoy * personer_per_kjoretoy
+
+    ir = np.zeros(len(xy))
+    N = np.zeros(len(scenarios))
+    batch = max(1, max_elements // max(len(xy), 1))
+    for s0 in range(0, len(scenarios), batch):
+        sc = scenarios[s0:s0 + batch]
+        D = np.hypot(xy[None, :, 0] - sc[:, 0, None], xy[None, :, 1] - sc[:, 1, None])
+        NEI = sc[:, 2, None]
+        p = fatality_probability(incident_pressure_array(D, NEI) * 1000, incident_impulse_array(D, NEI), probit)
+        N[s0:s0 + batch] = p @ personer
+        ir += sc[:, 3] @ p
+
+    pieces = gpd.GeoDataFrame(
+        {
+            "Vegobj_id": veg_gdf["Vegobj_id"].to_numpy()[seg] if "Vegobj_id" in veg_gdf else seg,
+            "lengde_m": piece_len,
+            "kjøretøy": kjoretoy,
+            "IR": ir,
+        },
+        geometry=midpoints,
+        crs="EPSG:32633",
+    )
+    pieces["PLL"] = pieces["IR"] * personer
+    summary = {"maks_IR": float(ir.max()) if len(ir) else 0.0, "PLL": float(N @ scenarios[:, 3])}
+    return pieces, N, summary
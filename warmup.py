@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 25 09:40:18 2026
+Oppvarming av tunge moduler i bakgrunnen.
+
+Sidene importerer geopandas, folium, pyproj og henterne først der de brukes, slik
+at første side vises raskt. Inngangsskriptet starter samtidig en tråd som
+importerer dem på forhånd (og lager én pyproj-transformasjon, som laster
+PROJ-databasen). Når brukeren trykker Submit eller et kart skal tegnes, er
+modulene som regel allerede lastet.
+"""
+import importlib
+import threading
+import time
+
+# Roughly in dependency order, so each import finds its dependencies loaded
+HEAVY_MODULES = (
+    "numpy",
+    "pandas",
+    "shapely",
+    "pyproj",
+    "geopandas",
+    "requests",
+    "folium",
+    "streamlit_folium",
+    "area_cache",
+    "pressure_overlay",
+)
+
+_started = False
+_lock = threading.Lock()
+_done = threading.Event()
+import_seconds = {}  # module -> seconds spent importing it in the warm-up thread
+
+
+def _warm():
+    try:
+        for name in HEAVY_MODULES:
+            t0 = time.perf_counter()
+            try:
+                importlib.import_module(name)
+            except ImportError as err:
+                print(f"Warm-up: could not import {name}: {err}")
+                continue
+            import_seconds[name] = time.perf_counter() - t0
+        try:
+            from pressure_overlay import _transformers
+            _transformers()
+        except Exception as err:
+            print("Warm-up: could not create pyproj transformers:", err)
+    finally:
+        _done.set()
+
+
+def start_warmup():
+    """Starts the warm-up thread once per process; returns immediately."""
+    global _started
+    if _started:
+        return
+    with _lock:
+        if _started:
+            return
+        _started = True
+        threading.Thread(target=_warm, daemon=True, name="warmup").start()
+
+
+def wait(timeout=None):
+    """Blocks until the warm-up has finished (or timeout s); True if it has."""
+    return _done.wait(timeout)